@@ -1,28 +1,47 @@
 from django.contrib.auth.backends import ModelBackend
 from django.contrib.auth import get_user_model
+from django.core.exceptions import PermissionDenied
+from django.db.models import Q
+from django.db.models.functions import Lower
+from .user_cache import get_cached_user
 
 UserModel = get_user_model()
 
 
 class EmailOrIdBackend(ModelBackend):
     def authenticate(self, request, username=None, password=None, **kwargs):
-        try:
-            # Try to fetch the user by email (case-insensitive)
-            user = UserModel.objects.get(email__iexact=username)
-        except UserModel.DoesNotExist:
-            try:
-                # Try to fetch the user by unique_id (case-sensitive)
-                user = UserModel.objects.get(unique_id=username)
-            except UserModel.DoesNotExist:
-                # Neither email nor unique_id matched
-                return None
+        if username is None:
+            # The login form passes the identifier as "email"
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+
+        # Email (case-insensitive, via the lower(email) index) or unique_id
+        # (case-sensitive) in a single query.
+        candidates = list(
+            UserModel.objects.alias(email_lower=Lower("email"))
+            .filter(Q(email_lower=username.lower()) | Q(unique_id=username))
+            .select_related("branch")[:2]
+        )
+        # An email match wins over a unique_id that happens to look the same
+        user = next(
+            (c for c in candidates if c.email.lower() == username.lower()),
+            candidates[0] if candidates else None,
+        )
 
-        if user.check_password(password):
+        if user is None:
+            # Run the password hasher once anyway so a miss takes as long as
+            # a wrong password and does not reveal which accounts exist.
+            UserModel().set_password(password)
+            raise PermissionDenied
+
+        if user.check_password(password) and self.user_can_authenticate(user):
             return user
-        return None
+        # This backend is authoritative for logins: stop authenticate() before
+        # ModelBackend (kept only for older sessions) hashes the password again
+        raise PermissionDenied
 
     def get_user(self, user_id):
-        try:
-            return UserModel.objects.get(pk=user_id)
-        except UserModel.DoesNotExist:
-            return None
+        # Loaded with its branch and cached for the session lifetime
+        user = get_cached_user(user_id)
+        return user if self.user_can_authenticate(user) else None
@@ -0,0 +1,82 @@
+import statistics
+import time
+
+from django.contrib.auth import authenticate
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from accounts.models import CustomUser
+
+PASSWORD = "benchmark-password"
+
+
+class Command(BaseCommand):
+    help = (
+        "Time authenticate() for email, unique_id and failed logins against a "
+        "throwaway set of users (rolled back afterwards)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--users", type=int, default=1000, help="Users to create for the run"
+        )
+        parser.add_argument(
+            "--attempts", type=int, default=20, help="Logins timed per scenario"
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            users = self._create_users(options["users"])
+            step = max(len(users) // options["attempts"], 1)
+            sample = users[::step][: options["attempts"]]
+
+            scenarios = {
+                "email": [(u.email, PASSWORD) for u in sample],
+                "email (mixed case)": [(u.email.upper(), PASSWORD) for u in sample],
+                "unique_id": [(u.unique_id, PASSWORD) for u in sample],
+                "wrong password": [(u.email, "not-the-password") for u in sample],
+                "unknown user": [
+                    (f"nobody{i}@benchmark.invalid", PASSWORD)
+                    for i in range(len(sample))
+                ],
+            }
+
+            self.stdout.write(
+                f"{'scenario':<20} {'ok':>5} {'queries':>8} "
+                f"{'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9}"
+            )
+            for name, attempts in scenarios.items():
+                self._run(name, attempts)
+
+            transaction.set_rollback(True)
+
+    def _create_users(self, count):
+        password = make_password(PASSWORD)
+        CustomUser.objects.bulk_create(
+            CustomUser(
+                email=f"bench{i}@benchmark.invalid",
+                full_name=f"Benchmark User {i}",
+                password=password,
+            )
+            for i in range(count)
+        )
+        return list(CustomUser.objects.filter(email__endswith="@benchmark.invalid"))
+
+    def _run(self, name, attempts):
+        timings = []
+        succeeded = 0
+        with CaptureQueriesContext(connection) as queries:
+            for identifier, password in attempts:
+                start = time.perf_counter()
+                user = authenticate(None, email=identifier, password=password)
+                timings.append((time.perf_counter() - start) * 1000)
+                succeeded += user is not None
+
+        timings.sort()
+        p95 = timings[min(int(len(timings) * 0.95), len(timings) - 1)]
+        self.stdout.write(
+            f"{name:<20} {succeeded:>5} {len(queries) / len(attempts):>8.1f} "
+            f"{statistics.mean(timings):>9.1f} {statistics.median(timings):>9.1f} "
+            f"{p95:>9.1f}"
+        )
@@ -0,0 +1,37 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY
+
+
+class SessionRefreshMiddleware:
+    """
+    Keeps sessions rolling without saving them on every request.
+
+    Instead of SESSION_SAVE_EVERY_REQUEST, the session of a logged-in user is
+    only marked as modified (so SessionMiddleware saves it and re-issues the
+    cookie with a fresh expiry) once its last refresh is older than
+    SESSION_REFRESH_FRACTION of SESSION_COOKIE_AGE. Must be listed after
+    SessionMiddleware so it runs before the session is saved.
+    """
+
+    REFRESH_KEY = "_refreshed_at"
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.refresh_after = (
+            settings.SESSION_COOKIE_AGE * settings.SESSION_REFRESH_FRACTION
+        )
+
+    def __call__(self, request):
+        response = self.get_response(request)
+
+        session = getattr(request, "session", None)
+        if session is None or session.is_empty() or SESSION_KEY not in session:
+            return response
+
+        now = int(time.time())
+        last_refresh = session.get(self.REFRESH_KEY, 0)
+        if session.modified or now - last_refresh >= self.refresh_after:
+            session[self.REFRESH_KEY] = now
+        return response
@@ -1,6 +1,7 @@
 import uuid
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager
 from django.db import models
+from django.db.models.functions import Lower
 from django.urls import reverse
 
 
@@ -65,9 +66,20 @@ class CustomUser(AbstractBaseUser):
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = ["full_name"]
 
+    class Meta:
+        indexes = [
+            # Case-insensitive login lookups (see EmailOrIdBackend)
+            models.Index(Lower("email"), name="customuser_email_lower_idx"),
+        ]
+
     def __str__(self):
         return self.full_name
 
+    def get_session_auth_hash(self):
+        # Users from accounts.user_cache carry this hash instead of the password
+        cached = getattr(self, "cached_session_auth_hash", None)
+        return cached or super().get_session_auth_hash()
+
     def has_perm(self, perm, obj=None):
         return self.is_superuser
 
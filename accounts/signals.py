@@ -0,0 +1,17 @@
+from django.db.models.signals import post_save, post_delete, pre_delete
+from django.dispatch import receiver
+from .models import CustomUser, Branch
+from .user_cache import invalidate_user, invalidate_branch_users
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def invalidate_cached_user(sender, instance, **kwargs):
+    invalidate_user(instance.pk)
+
+
+@receiver(post_save, sender=Branch)
+@receiver(pre_delete, sender=Branch)
+def invalidate_cached_branch_users(sender, instance, **kwargs):
+    # pre_delete: the users' branch is set to NULL before post_delete fires
+    invalidate_branch_users(instance.pk)
@@ -1,3 +1,240 @@
-from django.test import TestCase
+import pickle
+import time
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import authenticate
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from accounts.middleware import SessionRefreshMiddleware
+from accounts.models import CustomUser
+from accounts.user_cache import get_cached_user
+from home.testing import QueryBudgetTestCase
+
+TEST_SETTINGS = {
+    "CACHES": {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+    "METRICS_ENABLED": False,
+    "PASSWORD_HASHERS": ["django.contrib.auth.hashers.MD5PasswordHasher"],
+}
+
+
+class AccountsQueryBudgetTests(QueryBudgetTestCase):
+    def test_login_form(self):
+        self.assertBudget(reverse("accounts:login"), 2)
+
+    def test_login(self):
+        self.assertBudget(
+            reverse("accounts:login"),
+            12,
+            method="post",
+            data={"email": "sales@portal.test", "password": self.data.password},
+            status=302,
+        )
+
+    def test_logout(self):
+        self.login("sales")
+        self.assertBudget(reverse("accounts:logout"), 5, status=302)
+
+    def test_add_staff_form(self):
+        self.login("admin")
+        self.assertBudget(reverse("accounts:add_staff"), 8)
+
+    def test_add_staff(self):
+        self.login("manager")
+        self.assertBudget(
+            reverse("accounts:add_staff"),
+            9,
+            method="post",
+            data={
+                "full_name": "New Staff",
+                "email": "new.staff@portal.test",
+                "phone": "08031111111",
+                "access_level": "sales",
+                "password": "a-new-pass-123",
+                "confirm_password": "a-new-pass-123",
+            },
+            status=302,
+        )
+
+    def test_edit_staff_form(self):
+        self.login("admin")
+        self.assertBudget(
+            reverse("accounts:edit_staff", args=[self.data.staff[0].pk]),
+            8,
+            label="GET /staffs/edit/<pk>/",
+        )
+
+    def test_delete_staff(self):
+        self.login("admin")
+        self.assertBudget(
+            reverse("accounts:delete_staff", args=[self.data.staff[0].pk]),
+            12,
+            status=302,
+            label="GET /staffs/delete/<pk>/",
+        )
+
+
+@override_settings(**TEST_SETTINGS)
+class SessionRefreshMiddlewareTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            "refresh@portal.test",
+            "a-pass-123",
+            full_name="Refresh User",
+            access_level="admin",
+        )
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        self.started = time.time()
+
+    def get_at(self, seconds_later):
+        """Request a page as if ``seconds_later`` seconds had passed."""
+        with mock.patch(
+            "accounts.middleware.time.time", return_value=self.started + seconds_later
+        ), CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("home:dashboard"))
+        self.assertEqual(response.status_code, 200)
+        session_writes = [
+            query["sql"]
+            for query in queries.captured_queries
+            if "django_session" in query["sql"]
+            and query["sql"].lstrip().upper().startswith(("UPDATE", "INSERT"))
+        ]
+        return response, session_writes
+
+    def test_session_not_saved_again_soon_after_refresh(self):
+        response, writes = self.get_at(0)
+        self.assertIn(settings.SESSION_COOKIE_NAME, response.cookies)
+        self.assertTrue(writes)
+
+        response, writes = self.get_at(60)
+        self.assertNotIn(settings.SESSION_COOKIE_NAME, response.cookies)
+        self.assertEqual(writes, [])
+
+    def test_session_refreshed_after_threshold(self):
+        self.get_at(0)
+        refresh_after = settings.SESSION_COOKIE_AGE * settings.SESSION_REFRESH_FRACTION
+
+        response, writes = self.get_at(refresh_after + 1)
+        self.assertTrue(writes)
+        cookie = response.cookies[settings.SESSION_COOKIE_NAME]
+        self.assertEqual(cookie["max-age"], settings.SESSION_COOKIE_AGE)
+        self.assertEqual(
+            self.client.session[SessionRefreshMiddleware.REFRESH_KEY],
+            int(self.started + refresh_after + 1),
+        )
+
+
+@override_settings(**TEST_SETTINGS)
+class UserCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            "cached@portal.test", "a-pass-123", full_name="Cached User"
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_password_hash_is_not_cached(self):
+        get_cached_user(self.user.pk)
+        cached = cache.get(f"accounts:user:{self.user.pk}")
+
+        self.assertIn("password", cached.get_deferred_fields())
+        self.assertNotIn(self.user.password.encode(), pickle.dumps(cached))
+        self.assertEqual(
+            cached.get_session_auth_hash(), self.user.get_session_auth_hash()
+        )
+
+    def test_session_verified_from_cached_user(self):
+        self.client.force_login(self.user)
+        for _ in range(2):
+            response = self.client.get(reverse("home:dashboard"))
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.wsgi_request.user.pk, self.user.pk)
+
+    def test_saving_cached_user_keeps_password(self):
+        get_cached_user(self.user.pk)
+        cached = get_cached_user(self.user.pk)
+        cached.full_name = "Renamed"
+        cached.save()
+
+        user = CustomUser.objects.get(pk=self.user.pk)
+        self.assertEqual(user.full_name, "Renamed")
+        self.assertTrue(user.check_password("a-pass-123"))
+        self.assertTrue(cached.check_password("a-pass-123"))
+
+
+@override_settings(**TEST_SETTINGS)
+class EmailOrIdBackendTests(TestCase):
+    password = "a-pass-123"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            "Login.User@Portal.test", cls.password, full_name="Login User"
+        )
+
+    def test_login_by_email_is_case_insensitive(self):
+        for email in ["login.user@portal.test", "LOGIN.USER@PORTAL.TEST"]:
+            self.assertEqual(
+                authenticate(None, email=email, password=self.password), self.user
+            )
+
+    def test_login_by_unique_id(self):
+        self.assertEqual(
+            authenticate(None, email=self.user.unique_id, password=self.password),
+            self.user,
+        )
+        # unique_id is matched exactly
+        self.assertIsNone(
+            authenticate(
+                None, email=self.user.unique_id.upper() + "x", password=self.password
+            )
+        )
+
+    def test_email_wins_over_matching_unique_id(self):
+        CustomUser.objects.filter(pk=self.user.pk).update(unique_id="b@p.test")
+        other = CustomUser.objects.create_user(
+            "b@p.test", self.password, full_name="Other"
+        )
+
+        self.assertEqual(
+            authenticate(None, email="b@p.test", password=self.password), other
+        )
+
+    def test_wrong_password(self):
+        with mock.patch.object(ModelBackend, "authenticate") as model_backend:
+            self.assertIsNone(
+                authenticate(None, email=self.user.email, password="wrong-pass")
+            )
+        # Kept only for old sessions, it never checks the password a second time
+        model_backend.assert_not_called()
+
+    def test_inactive_user(self):
+        CustomUser.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertIsNone(
+            authenticate(None, email=self.user.email, password=self.password)
+        )
+
+    def test_unknown_user_still_hashes_password(self):
+        with mock.patch.object(CustomUser, "set_password") as set_password:
+            self.assertIsNone(
+                authenticate(None, email="nobody@portal.test", password=self.password)
+            )
+        set_password.assert_called_once_with(self.password)
+
+    def test_session_from_model_backend_stays_logged_in(self):
+        self.client.force_login(
+            self.user, backend="django.contrib.auth.backends.ModelBackend"
+        )
+        response = self.client.get(reverse("home:dashboard"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.wsgi_request.user.pk, self.user.pk)
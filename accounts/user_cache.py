@@ -0,0 +1,55 @@
+"""
+Cache of authenticated users, loaded together with their branch.
+
+Views read ``request.user.branch`` and ``request.user.access_level`` on nearly
+every request, so the user and branch are fetched with one query and kept in
+the cache for the lifetime of a session. Entries are dropped whenever the
+user or their branch changes; see accounts.signals.
+
+The password hash is never written to the cache. Cached users carry their
+session auth hash instead, which is all a request needs to verify the
+session; the password itself is a deferred field that is loaded from the
+database only if something asks for it.
+"""
+
+import copy
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+
+UserModel = get_user_model()
+
+
+def _cache_key(user_id):
+    return f"accounts:user:{user_id}"
+
+
+def get_cached_user(user_id):
+    key = _cache_key(user_id)
+    user = cache.get(key)
+    if user is None:
+        user = UserModel.objects.select_related("branch").filter(pk=user_id).first()
+        if user is not None:
+            user = _without_password(user)
+            cache.set(key, user, settings.SESSION_COOKIE_AGE)
+    return user
+
+
+def _without_password(user):
+    cached = copy.copy(user)
+    cached.cached_session_auth_hash = user.get_session_auth_hash()
+    # Deferred from here on: saving the copy leaves the stored hash alone
+    del cached.__dict__["password"]
+    return cached
+
+
+def invalidate_user(user_id):
+    cache.delete(_cache_key(user_id))
+
+
+def invalidate_branch_users(branch_id):
+    user_ids = UserModel.objects.filter(branch_id=branch_id).values_list(
+        "pk", flat=True
+    )
+    cache.delete_many([_cache_key(user_id) for user_id in user_ids])
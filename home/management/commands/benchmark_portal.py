@@ -0,0 +1,231 @@
+import json
+import platform
+import time
+from pathlib import Path
+
+import django
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.test import Client, override_settings
+from django.test.utils import (
+    CaptureQueriesContext,
+    setup_test_environment,
+    teardown_test_environment,
+)
+from django.urls import reverse
+from django.utils import timezone
+
+from home.seeding import seed_portal
+from user_activity.reports import percentile
+
+VOLUME_OPTIONS = (
+    "branches",
+    "stock_per_branch",
+    "sales_per_branch",
+    "items_per_sale",
+    "vehicles_per_branch",
+    "return_visit_ratio",
+    "parts_per_estimate",
+    "activity_logs",
+)
+
+STOCK_EXPORT = (
+    "?export=1&fields_to_export=name&fields_to_export=quantity&fields_to_export=branch"
+)
+SALES_EXPORT = (
+    "?export=1&fields_to_export=customer_name&fields_to_export=branch"
+    "&fields_to_export=stock_item_name&fields_to_export=quantity_sold"
+)
+WORKSHOP_EXPORT = (
+    "?export=1&fields_to_export=customer_name&fields_to_export=chasis_no"
+    "&fields_to_export=branch&fields_to_export=job_sheet_service_advisor"
+    "&fields_to_export=estimate_grand_total&fields_to_export=estimate_parts_details"
+)
+
+
+def benchmark_views(data):
+    """(name, url) of every view timed, addressed through the seeded data."""
+    vehicle = data.vehicles[0]
+    return [
+        ("dashboard", reverse("home:dashboard")),
+        ("workshop list", reverse("home:workshop")),
+        ("workshop search", reverse("home:workshop") + "?q=toyota"),
+        (
+            "chasis lookup",
+            reverse("home:find_vehicle_by_chasis") + f"?chasis_no={vehicle.chasis_no}",
+        ),
+        ("vehicle detail", reverse("home:vehicle_detail", args=[vehicle.pk])),
+        ("stock list", reverse("store:stock_list")),
+        ("sales overview", reverse("store:sales_dashboard")),
+        ("sales list", reverse("store:sales_list_by_branch")),
+        ("activity log", reverse("user_activity:log_view")),
+        ("stock export", reverse("store:stock_export") + STOCK_EXPORT),
+        ("sales export", reverse("store:sales_export") + SALES_EXPORT),
+        ("workshop export", reverse("workshop:workshop_export") + WORKSHOP_EXPORT),
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a throwaway test database with synthetic data at the given volumes "
+        "and time the main views, writing a JSON or markdown report"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--branches", type=int, default=4)
+        parser.add_argument("--stock-per-branch", type=int, default=600)
+        parser.add_argument("--sales-per-branch", type=int, default=150)
+        parser.add_argument("--items-per-sale", type=int, default=3)
+        parser.add_argument("--vehicles-per-branch", type=int, default=120)
+        parser.add_argument("--return-visit-ratio", type=float, default=0.3)
+        parser.add_argument("--parts-per-estimate", type=int, default=6)
+        parser.add_argument("--activity-logs", type=int, default=3000)
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=5,
+            help="Requests per view; the first runs with a cold cache",
+        )
+        parser.add_argument(
+            "--format", choices=["markdown", "json"], default="markdown"
+        )
+        parser.add_argument("--output", help="Write the report here instead of stdout")
+        parser.add_argument(
+            "--compare", help="Earlier JSON report to show p50 changes against"
+        )
+        parser.add_argument(
+            "--label", default="", help="Free text stored in the report"
+        )
+
+    def handle(self, *args, **options):
+        volumes = {name: options[name] for name in VOLUME_OPTIONS}
+        repeat = max(options["repeat"], 1)
+
+        # Never touch the real database or cache: seed a fresh test database
+        # and keep cache entries in memory for the duration of the run
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+        # As under "manage.py test", the reports alias mirrors the test database
+        for alias in connections:
+            if alias != connection.alias:
+                connections[alias].creation.set_as_test_mirror(connection.settings_dict)
+        try:
+            with override_settings(
+                CACHES={
+                    "default": {
+                        "BACKEND": "django.core.cache.backends.locmem.LocMemCache"
+                    }
+                },
+                METRICS_ENABLED=False,
+            ):
+                started = time.perf_counter()
+                data = seed_portal(**volumes)
+                seed_seconds = time.perf_counter() - started
+                self.stderr.write(f"Seeded in {seed_seconds:.1f} s")
+
+                client = Client()
+                client.force_login(data.users["admin"])
+                results = [
+                    self.time_view(client, name, url, repeat)
+                    for name, url in benchmark_views(data)
+                ]
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        report = {
+            "label": options["label"],
+            "generated_at": timezone.now().isoformat(),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "database": connection.vendor,
+            "volumes": volumes,
+            "repeat": repeat,
+            "seed_seconds": round(seed_seconds, 2),
+            "views": results,
+        }
+        previous = None
+        if options["compare"]:
+            with open(options["compare"], encoding="utf-8") as previous_file:
+                previous = json.load(previous_file)
+
+        if options["format"] == "json":
+            output = json.dumps(report, indent=2)
+        else:
+            output = self.markdown(report, previous)
+
+        if options["output"]:
+            Path(options["output"]).write_text(output + "\n", encoding="utf-8")
+            self.stderr.write(f"Report written to {options['output']}")
+        else:
+            self.stdout.write(output)
+
+    def time_view(self, client, name, url, repeat):
+        cache.clear()
+        timings = []
+        query_counts = []
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                response = client.get(url)
+                timings.append((time.perf_counter() - started) * 1000)
+            query_counts.append(len(queries))
+
+        warm = sorted(timings[1:] or timings)
+        return {
+            "view": name,
+            "url": url,
+            "status": response.status_code,
+            "bytes": len(response.content),
+            "cold_queries": query_counts[0],
+            "warm_queries": query_counts[-1],
+            "cold_ms": round(timings[0], 1),
+            "p50_ms": round(percentile(warm, 0.5), 1),
+            "p95_ms": round(percentile(warm, 0.95), 1),
+            "max_ms": round(max(timings), 1),
+        }
+
+    def markdown(self, report, previous=None):
+        volumes = ", ".join(
+            f"{name}={value}" for name, value in report["volumes"].items()
+        )
+        lines = [
+            f"# Portal benchmark {report['label']}".rstrip(),
+            "",
+            f"{report['generated_at']} · Python {report['python']} · "
+            f"Django {report['django']} · {report['database']}",
+            "",
+            f"Volumes: {volumes}; seeded in {report['seed_seconds']} s; "
+            f"{report['repeat']} requests per view.",
+            "",
+        ]
+        header = (
+            "| view | status | queries (cold/warm) | cold ms "
+            "| p50 ms | p95 ms | max ms |"
+        )
+        divider = "|---|---|---|---|---|---|---|"
+        before = {}
+        if previous:
+            header += " p50 vs previous |"
+            divider += "---|"
+            before = {row["view"]: row for row in previous["views"]}
+        lines += [header, divider]
+
+        for row in report["views"]:
+            line = (
+                f"| {row['view']} | {row['status']} | "
+                f"{row['cold_queries']}/{row['warm_queries']} | {row['cold_ms']} | "
+                f"{row['p50_ms']} | {row['p95_ms']} | {row['max_ms']} |"
+            )
+            if previous:
+                old = before.get(row["view"])
+                if old and old["p50_ms"]:
+                    change = (row["p50_ms"] - old["p50_ms"]) / old["p50_ms"] * 100
+                    line += f" {change:+.0f}% |"
+                else:
+                    line += " – |"
+            lines.append(line)
+        return "\n".join(lines)
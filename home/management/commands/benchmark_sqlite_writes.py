@@ -0,0 +1,156 @@
+import random
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connections, transaction
+from django.test import override_settings
+
+from lsm_portal.db import is_locked_error, retry_on_locked
+from user_activity.reports import percentile
+
+SCHEMA = [
+    "CREATE TABLE bench_stock (id INTEGER PRIMARY KEY, quantity INTEGER NOT NULL)",
+    "CREATE TABLE bench_sale (id INTEGER PRIMARY KEY, stock_id INTEGER NOT NULL,"
+    " quantity INTEGER NOT NULL, created REAL NOT NULL)",
+    "CREATE TABLE bench_log (id INTEGER PRIMARY KEY, action TEXT NOT NULL,"
+    " created REAL NOT NULL)",
+]
+STOCK_ROWS = 200
+
+
+def record_sale(cursor, stock_id):
+    """The shape of a sale: read the stock level, insert the sale, deduct stock."""
+    cursor.execute("SELECT quantity FROM bench_stock WHERE id = %s", [stock_id])
+    quantity = cursor.fetchone()[0]
+    cursor.execute(
+        "INSERT INTO bench_sale (stock_id, quantity, created) VALUES (%s, 1, %s)",
+        [stock_id, time.time()],
+    )
+    cursor.execute(
+        "UPDATE bench_stock SET quantity = %s WHERE id = %s", [quantity - 1, stock_id]
+    )
+    cursor.execute(
+        "INSERT INTO bench_log (action, created)"
+        " VALUES ('store:create_sales_record', %s)",
+        [time.time()],
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare concurrent write throughput of SQLite with default connection "
+        "settings against settings.SQLITE_OPTIONS, on scratch files"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=8, help="Concurrent writers")
+        parser.add_argument(
+            "--transactions", type=int, default=200, help="Sales written per thread"
+        )
+
+    def handle(self, *args, **options):
+        configurations = [
+            # Rollback journal, deferred transactions, 5 s busy timeout, no retry
+            ("default", {}, False),
+            ("tuned", dict(settings.SQLITE_OPTIONS), True),
+        ]
+        self.stdout.write(
+            f"{options['threads']} threads x {options['transactions']} transactions\n"
+        )
+        self.stdout.write(
+            f"{'settings':<10} {'committed':>9} {'locked':>7} {'retries':>8} "
+            f"{'tx/s':>8} {'p50 ms':>8} {'p95 ms':>8}"
+        )
+        # Retry metrics from a benchmark would pollute the real spool
+        with override_settings(METRICS_ENABLED=False):
+            for label, db_options, retry in configurations:
+                self.run(label, db_options, retry, options)
+
+    def run(self, label, db_options, retry, options):
+        workdir = tempfile.mkdtemp(prefix="portal-writes-")
+        alias = f"write_benchmark_{label}"
+        connections.settings[alias] = {
+            **connections["default"].settings_dict,
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": str(Path(workdir, "bench.sqlite3")),
+            "OPTIONS": db_options,
+        }
+        try:
+            with connections[alias].cursor() as cursor:
+                for statement in SCHEMA:
+                    cursor.execute(statement)
+                cursor.executemany(
+                    "INSERT INTO bench_stock (id, quantity) VALUES (%s, %s)",
+                    [(i, 10**6) for i in range(1, STOCK_ROWS + 1)],
+                )
+            connections[alias].close()
+
+            lock = threading.Lock()
+            latencies = []
+            counts = {"locked": 0, "retries": 0}
+
+            def writer(index):
+                rng = random.Random(index)
+                connection = connections[alias]
+                attempts = 0
+
+                def sale(stock_id):
+                    nonlocal attempts
+                    attempts += 1
+                    with connection.cursor() as cursor:
+                        record_sale(cursor, stock_id)
+
+                if retry:
+                    write = retry_on_locked(sale, using=alias)
+                else:
+                    write = transaction.atomic(using=alias)(sale)
+
+                committed = []
+                locked = 0
+                try:
+                    for _ in range(options["transactions"]):
+                        started = time.perf_counter()
+                        try:
+                            write(rng.randint(1, STOCK_ROWS))
+                        except OperationalError as error:
+                            if not is_locked_error(error):
+                                raise
+                            locked += 1
+                            continue
+                        committed.append((time.perf_counter() - started) * 1000)
+                finally:
+                    connection.close()
+                    with lock:
+                        latencies.extend(committed)
+                        counts["locked"] += locked
+                        counts["retries"] += attempts - options["transactions"]
+
+            threads = [
+                threading.Thread(target=writer, args=(index,))
+                for index in range(options["threads"])
+            ]
+            started = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - started
+        finally:
+            connections[alias].close()
+            del connections.settings[alias]
+            shutil.rmtree(workdir, ignore_errors=True)
+
+        latencies.sort()
+        p50 = percentile(latencies, 0.5) if latencies else 0
+        p95 = percentile(latencies, 0.95) if latencies else 0
+        self.stdout.write(
+            f"{label:<10} {len(latencies):>9} {counts['locked']:>7} "
+            f"{counts['retries']:>8} {len(latencies) / elapsed:>8.0f} "
+            f"{p50:>8.1f} {p95:>8.1f}"
+        )
@@ -0,0 +1,171 @@
+import time
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.core.serializers import sort_dependencies
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+SOURCE_ALIAS = "sqlite_source"
+
+
+def copied_models():
+    """Every table Django manages, parents before the models that refer to them."""
+    app_list = [
+        (config, [model for model in config.get_models(include_auto_created=True)])
+        for config in apps.get_app_configs()
+    ]
+    ordered = sort_dependencies(app_list, allow_cycles=True)
+    # sort_dependencies leaves out auto-created many-to-many tables
+    ordered += [
+        model
+        for model in apps.get_models(include_auto_created=True)
+        if model not in ordered
+    ]
+    return [model for model in ordered if model._meta.managed and not model._meta.proxy]
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy every table of a SQLite database into the (PostgreSQL) target "
+        "database in batches, then verify row counts and reset sequences. "
+        "Create the target schema first with 'migrate --run-syncdb'."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "source",
+            nargs="?",
+            default=str(settings.BASE_DIR / "db.sqlite3"),
+            help="SQLite file to copy from (default: db.sqlite3)",
+        )
+        parser.add_argument(
+            "--database",
+            default=DEFAULT_DB_ALIAS,
+            help="Target database alias (default: default)",
+        )
+        parser.add_argument("--batch-size", type=int, default=2000)
+        parser.add_argument(
+            "--noinput",
+            "--no-input",
+            action="store_false",
+            dest="interactive",
+            help="Do not ask before emptying the target tables",
+        )
+
+    def handle(self, *args, **options):
+        target = connections[options["database"]]
+        if target.vendor != "postgresql":
+            raise CommandError(
+                f"Target database {options['database']!r} is {target.vendor}, "
+                "not PostgreSQL. Set DATABASE_ENGINE=postgresql."
+            )
+
+        if not Path(options["source"]).is_file():
+            raise CommandError(f"No SQLite database at {options['source']}")
+
+        connections.settings[SOURCE_ALIAS] = {
+            **target.settings_dict,
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": options["source"],
+            "OPTIONS": {},
+        }
+        source = connections[SOURCE_ALIAS]
+        models = copied_models()
+        try:
+            missing = set(m._meta.db_table for m in models) - set(
+                source.introspection.table_names()
+            )
+            if missing:
+                raise CommandError(
+                    f"{options['source']} lacks tables: {', '.join(sorted(missing))}"
+                )
+
+            if options["interactive"]:
+                answer = input(
+                    f"This empties {len(models)} tables in "
+                    f"{target.settings_dict['NAME']!r} on the target and replaces "
+                    "them with the SQLite data. "
+                    "Type 'yes' to continue: "
+                )
+                if answer != "yes":
+                    raise CommandError("Copy cancelled.")
+
+            with transaction.atomic(using=target.alias):
+                # Foreign keys on PostgreSQL are deferred to commit, so
+                # self-references and cycles load in any order
+                target.ops.execute_sql_flush(
+                    target.ops.sql_flush(
+                        no_style(),
+                        [model._meta.db_table for model in models],
+                        allow_cascade=True,
+                    )
+                )
+                for model in models:
+                    self.copy(model, source, target, options["batch_size"])
+                self.verify(models, source, target)
+
+                with target.cursor() as cursor:
+                    for statement in target.ops.sequence_reset_sql(no_style(), models):
+                        cursor.execute(statement)
+        finally:
+            source.close()
+            del connections.settings[SOURCE_ALIAS]
+
+        self.stdout.write(self.style.SUCCESS(f"Copied {len(models)} tables."))
+
+    def copy(self, model, source, target, batch_size):
+        fields = model._meta.concrete_fields
+        columns = ", ".join(target.ops.quote_name(field.column) for field in fields)
+        placeholders = ", ".join(["%s"] * len(fields))
+        insert = (
+            f"INSERT INTO {target.ops.quote_name(model._meta.db_table)} "
+            f"({columns}) VALUES ({placeholders})"
+        )
+
+        # Raw rows rather than bulk_create(), which would overwrite
+        # auto_now/auto_now_add timestamps with the time of the copy
+        rows = (
+            model._base_manager.using(source.alias)
+            .order_by(model._meta.pk.attname)
+            .values_list(*[field.attname for field in fields])
+            .iterator(chunk_size=batch_size)
+        )
+        started = time.perf_counter()
+        copied = 0
+        batch = []
+        with target.cursor() as cursor:
+            for row in rows:
+                batch.append(
+                    [
+                        field.get_db_prep_save(value, connection=target)
+                        for field, value in zip(fields, row)
+                    ]
+                )
+                if len(batch) >= batch_size:
+                    cursor.executemany(insert, batch)
+                    copied += len(batch)
+                    batch = []
+            if batch:
+                cursor.executemany(insert, batch)
+                copied += len(batch)
+        self.stdout.write(
+            f"{model._meta.label:<40} {copied:>9} rows  "
+            f"{time.perf_counter() - started:>6.1f} s"
+        )
+
+    def verify(self, models, source, target):
+        mismatched = []
+        for model in models:
+            expected = model._base_manager.using(source.alias).count()
+            actual = model._base_manager.using(target.alias).count()
+            if expected != actual:
+                mismatched.append(
+                    f"{model._meta.label}: {expected} in SQLite, {actual} copied"
+                )
+        if mismatched:
+            # Raised inside the transaction, so nothing is committed
+            raise CommandError("Row counts differ:\n  " + "\n  ".join(mismatched))
+        self.stdout.write("Row counts verified.")
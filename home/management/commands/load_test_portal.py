@@ -0,0 +1,400 @@
+import json
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from http.cookiejar import CookieJar
+from pathlib import Path
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlencode
+from urllib.request import (
+    HTTPCookieProcessor,
+    HTTPRedirectHandler,
+    Request,
+    build_opener,
+)
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.servers.basehttp import (
+    ThreadedWSGIServer,
+    WSGIRequestHandler,
+    get_internal_wsgi_application,
+)
+from django.core.signals import got_request_exception
+from django.db import OperationalError, connection, connections
+from django.test import override_settings
+from django.urls import reverse
+
+from home.seeding import seed_portal
+from user_activity.reports import percentile
+
+SCENARIO_HEADER = "X-Load-Scenario"
+LOCKED_MESSAGE = "database is locked"
+DEFAULT_MIX = "login=1,browse=4,sale=2,export=1"
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+class NoRedirect(HTTPRedirectHandler):
+    # A redirect is the response being measured, not something to follow
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class ServerErrors:
+    """``got_request_exception`` receiver counting failures per scenario."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.errors = Counter()
+        self.locked = Counter()
+
+    def __call__(self, sender, request=None, **kwargs):
+        error = sys.exc_info()[1]
+        scenario = request.headers.get(SCENARIO_HEADER, "") if request else ""
+        with self.lock:
+            self.errors[scenario] += 1
+            if isinstance(error, OperationalError) and LOCKED_MESSAGE in str(error):
+                self.locked[scenario] += 1
+
+
+class Results:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+        self.failures = Counter()
+
+    def record(self, scenario, status, elapsed_ms):
+        with self.lock:
+            self.latencies[scenario].append(elapsed_ms)
+            self.statuses[scenario][status] += 1
+            if status == 0 or status >= 500:
+                self.failures[scenario] += 1
+
+
+class SimulatedUser:
+    """One browser session: a cookie jar, a CSRF token and a login."""
+
+    def __init__(self, base_url, results):
+        self.base_url = base_url
+        self.results = results
+        self.cookies = CookieJar()
+        self.opener = build_opener(HTTPCookieProcessor(self.cookies), NoRedirect)
+
+    def csrf_token(self):
+        for cookie in self.cookies:
+            if cookie.name == "csrftoken":
+                return cookie.value
+        return ""
+
+    def request(self, scenario, path, data=None):
+        headers = {SCENARIO_HEADER: scenario}
+        body = None
+        if data is not None:
+            headers["X-CSRFToken"] = self.csrf_token()
+            body = urlencode(data, doseq=True).encode()
+        started = time.perf_counter()
+        try:
+            with self.opener.open(
+                Request(self.base_url + path, data=body, headers=headers), timeout=120
+            ) as response:
+                response.read()
+                status = response.status
+        except HTTPError as error:
+            error.read()
+            status = error.code
+        except (URLError, OSError):
+            status = 0
+        self.results.record(scenario, status, (time.perf_counter() - started) * 1000)
+        return status
+
+    def login(self, scenario, email, password):
+        self.request(scenario, reverse("accounts:login"))
+        return self.request(
+            scenario, reverse("accounts:login"), {"email": email, "password": password}
+        )
+
+
+class Scenarios:
+    """The simulated user journeys, each a few requests against the seeded data."""
+
+    def __init__(self, data):
+        self.data = data
+        self.vehicle_ids = [vehicle.pk for vehicle in data.vehicles]
+        sales_branch = data.users["sales"].branch_id
+        self.sale_items = [
+            item
+            for item in data.stock
+            if item.branch_id == sales_branch and item.quantity >= 25
+        ]
+
+    def login(self, sessions, rng):
+        user = SimulatedUser(sessions["admin"].base_url, sessions["admin"].results)
+        role = rng.choice(["admin", "sales", "workshop"])
+        user.login("login", self.data.users[role].email, self.data.password)
+
+    def browse(self, sessions, rng):
+        user = sessions["workshop"]
+        user.request("browse", reverse("home:workshop"))
+        user.request(
+            "browse",
+            reverse("home:workshop") + "?q=" + rng.choice(["toyota", "camry", "lexus"]),
+        )
+        user.request(
+            "browse",
+            reverse("home:vehicle_detail", args=[rng.choice(self.vehicle_ids)]),
+        )
+
+    def sale(self, sessions, rng):
+        user = sessions["sales"]
+        user.request("sale", reverse("store:create_sales_record"))
+        item = rng.choice(self.sale_items)
+        user.request(
+            "sale",
+            reverse("store:create_sales_record"),
+            {
+                "customer_name": f"Load test {rng.randrange(10**6)}",
+                "customer_contact": "0801",
+                "marketer": "Ada",
+                "amount_paid_cash": str(item.unit_value),
+                "credit_owed": "0",
+                "bank_paid": "GTBank",
+                "items-TOTAL_FORMS": "1",
+                "items-INITIAL_FORMS": "0",
+                "items-MIN_NUM_FORMS": "0",
+                "items-MAX_NUM_FORMS": "1000",
+                "items-0-stock_item": item.pk,
+                "items-0-quantity_sold": "1",
+                "items-0-price_at_sale": str(item.unit_value),
+            },
+        )
+
+    def export(self, sessions, rng):
+        sessions["admin"].request(
+            "export",
+            reverse("store:stock_export")
+            + "?export=1&fields_to_export=name&fields_to_export=quantity"
+            + "&fields_to_export=branch",
+        )
+
+
+def parse_mix(value):
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if not hasattr(Scenarios, name) or name.startswith("_"):
+            raise CommandError(f"Unknown scenario {name!r}")
+        try:
+            mix[name] = float(weight or 1)
+        except ValueError:
+            raise CommandError(f"Invalid weight for {name!r}: {weight!r}")
+    return mix
+
+
+class Command(BaseCommand):
+    help = (
+        "Serve the portal from a seeded throwaway SQLite file and drive it with "
+        "concurrent simulated users, reporting throughput, latency percentiles "
+        "and 'database is locked' failures per scenario"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--users", type=int, default=8, help="Concurrent simulated users"
+        )
+        parser.add_argument("--duration", type=float, default=30, help="Seconds to run")
+        parser.add_argument(
+            "--mix",
+            default=DEFAULT_MIX,
+            help="Scenario weights, e.g. login=1,browse=4,sale=2,export=1",
+        )
+        parser.add_argument("--branches", type=int, default=2)
+        parser.add_argument("--stock-per-branch", type=int, default=300)
+        parser.add_argument("--sales-per-branch", type=int, default=100)
+        parser.add_argument("--vehicles-per-branch", type=int, default=100)
+        parser.add_argument("--seed", type=int, default=1234)
+        parser.add_argument(
+            "--format", choices=["markdown", "json"], default="markdown"
+        )
+        parser.add_argument("--output", help="Write the report here instead of stdout")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "sqlite":
+            raise CommandError("The load test seeds a throwaway SQLite database")
+        mix = parse_mix(options["mix"])
+
+        # A file, not the in-memory test database, so that concurrent requests
+        # contend for the database lock as they do in production
+        workdir = tempfile.mkdtemp(prefix="portal-load-")
+        connection.settings_dict.setdefault("TEST", {})["NAME"] = str(
+            Path(workdir, "load_test.sqlite3")
+        )
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+        # As under "manage.py test", the reports alias mirrors the test database
+        for alias in connections:
+            if alias != connection.alias:
+                connections[alias].creation.set_as_test_mirror(connection.settings_dict)
+        server = None
+        errors = ServerErrors()
+        got_request_exception.connect(errors, weak=False)
+        caches = {
+            "default": {
+                "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+                "LOCATION": str(Path(workdir, "cache")),
+            }
+        }
+        try:
+            with override_settings(
+                CACHES=caches,
+                METRICS_ENABLED=False,
+                DEBUG=False,
+                # The local server speaks plain HTTP
+                SESSION_COOKIE_SECURE=False,
+                CSRF_COOKIE_SECURE=False,
+            ):
+                data = seed_portal(
+                    branches=options["branches"],
+                    stock_per_branch=options["stock_per_branch"],
+                    sales_per_branch=options["sales_per_branch"],
+                    vehicles_per_branch=options["vehicles_per_branch"],
+                    seed=options["seed"],
+                )
+                connection.close()
+
+                server = ThreadedWSGIServer(("127.0.0.1", 0), QuietRequestHandler)
+                server.set_app(get_internal_wsgi_application())
+                threading.Thread(target=server.serve_forever, daemon=True).start()
+                base_url = f"http://127.0.0.1:{server.server_port}"
+                self.stderr.write(
+                    f"Serving {base_url}; {options['users']} users for "
+                    f"{options['duration']:.0f} s"
+                )
+
+                results = Results()
+                elapsed = self.run_users(data, base_url, results, mix, options)
+        finally:
+            got_request_exception.disconnect(errors)
+            if server is not None:
+                server.shutdown()
+                server.server_close()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            shutil.rmtree(workdir, ignore_errors=True)
+
+        report = self.report(results, errors, elapsed, mix, options)
+        if options["format"] == "json":
+            output = json.dumps(report, indent=2)
+        else:
+            output = self.markdown(report)
+        if options["output"]:
+            Path(options["output"]).write_text(output + "\n", encoding="utf-8")
+            self.stderr.write(f"Report written to {options['output']}")
+        else:
+            self.stdout.write(output)
+
+    def run_users(self, data, base_url, results, mix, options):
+        scenarios = Scenarios(data)
+        names = list(mix)
+        weights = [mix[name] for name in names]
+
+        # Sign every user in before the clock starts; only the "login"
+        # scenario measures logins
+        setup = Results()
+        sessions = []
+        for _ in range(options["users"]):
+            roles = {}
+            for role in ("admin", "sales", "workshop"):
+                user = SimulatedUser(base_url, setup)
+                user.login("setup", data.users[role].email, data.password)
+                user.results = results
+                roles[role] = user
+            sessions.append(roles)
+
+        deadline = time.monotonic() + options["duration"]
+
+        def simulate(index):
+            rng = random.Random(options["seed"] + index)
+            while time.monotonic() < deadline:
+                name = rng.choices(names, weights)[0]
+                getattr(scenarios, name)(sessions[index], rng)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options["users"]) as pool:
+            list(pool.map(simulate, range(options["users"])))
+        return time.perf_counter() - started
+
+    def report(self, results, errors, elapsed, mix, options):
+        rows = []
+        for name in list(mix) + ["total"]:
+            if name == "total":
+                latencies = sorted(
+                    value for values in results.latencies.values() for value in values
+                )
+                failures = sum(results.failures.values())
+                statuses = sum(results.statuses.values(), Counter())
+                locked = sum(
+                    count
+                    for scenario, count in errors.locked.items()
+                    if scenario in mix
+                )
+            else:
+                latencies = sorted(results.latencies.get(name, []))
+                failures = results.failures[name]
+                statuses = results.statuses[name]
+                locked = errors.locked[name]
+            if not latencies:
+                continue
+            rows.append(
+                {
+                    "scenario": name,
+                    "requests": len(latencies),
+                    "per_second": round(len(latencies) / elapsed, 1),
+                    "p50_ms": round(percentile(latencies, 0.5), 1),
+                    "p95_ms": round(percentile(latencies, 0.95), 1),
+                    "p99_ms": round(percentile(latencies, 0.99), 1),
+                    "failed": failures,
+                    "locked": locked,
+                    "locked_rate": round(locked / len(latencies), 4),
+                    "statuses": {
+                        str(code): count for code, count in sorted(statuses.items())
+                    },
+                }
+            )
+        return {
+            "users": options["users"],
+            "duration_seconds": round(elapsed, 1),
+            "mix": mix,
+            "scenarios": rows,
+        }
+
+    def markdown(self, report):
+        mix = ", ".join(f"{name}={weight:g}" for name, weight in report["mix"].items())
+        lines = [
+            f"# Portal load test: {report['users']} users, "
+            f"{report['duration_seconds']} s ({mix})",
+            "",
+            "| scenario | requests | req/s | p50 ms | p95 ms | p99 ms | 5xx | locked "
+            "| locked % | statuses |",
+            "|---|---|---|---|---|---|---|---|---|---|",
+        ]
+        for row in report["scenarios"]:
+            statuses = " ".join(
+                f"{code}×{count}" for code, count in row["statuses"].items()
+            )
+            lines.append(
+                f"| {row['scenario']} | {row['requests']} | {row['per_second']} | "
+                f"{row['p50_ms']} | {row['p95_ms']} | {row['p99_ms']} | "
+                f"{row['failed']} | {row['locked']} | "
+                f"{row['locked_rate'] * 100:.1f} | {statuses} |"
+            )
+        return "\n".join(lines)
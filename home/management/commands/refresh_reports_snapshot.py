@@ -0,0 +1,54 @@
+import os
+import sqlite3
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from lsm_portal.routers import REPORTS_ALIAS
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy the SQLite database to the reports snapshot with the online backup "
+        "API. Run it from cron more often than REPORTS_MAX_STALENESS."
+    )
+
+    def handle(self, *args, **options):
+        source = settings.DATABASES[DEFAULT_DB_ALIAS]
+        target = settings.DATABASES.get(REPORTS_ALIAS)
+        if target is None or not all(
+            database["ENGINE"].endswith("sqlite3") for database in (source, target)
+        ):
+            raise CommandError(
+                "Snapshots are for SQLite only; on PostgreSQL the reports "
+                "database is a replica (DATABASE_REPLICA_HOST)."
+            )
+
+        path = Path(target["NAME"])
+        partial = path.with_name(path.name + ".partial")
+        partial.unlink(missing_ok=True)
+
+        started = time.time()
+        source_db = sqlite3.connect(source["NAME"], timeout=15)
+        snapshot_db = sqlite3.connect(partial)
+        try:
+            # One read transaction: under WAL it does not block writers
+            source_db.backup(snapshot_db)
+            # Readers of the snapshot then need no -wal/-shm files
+            snapshot_db.execute("PRAGMA journal_mode=DELETE")
+        finally:
+            snapshot_db.close()
+            source_db.close()
+
+        # The file's mtime is how the router measures staleness: the moment the
+        # data was read, not when the copy finished
+        os.utime(partial, (started, started))
+        # Atomic swap; open readers keep the old file until they close it
+        os.replace(partial, path)
+        self.stdout.write(
+            f"Snapshot of {path.stat().st_size / 1024 / 1024:.1f} MB written to "
+            f"{path} in {time.time() - started:.1f} s"
+        )
@@ -0,0 +1,32 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.utils.functional import cached_property
+
+
+class CachedCountPaginator(Paginator):
+    """
+    Paginator that caches the total row count of a queryset for a short time.
+
+    The count is keyed on the SQL and parameters of the filtered queryset, so
+    every filter combination gets its own entry. Within the TTL
+    (PAGINATOR_COUNT_CACHE_TIMEOUT) the page count can lag behind newly added
+    rows; that only affects how many page links are shown.
+    """
+
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, "query", None)
+        if query is None:
+            return super().count
+
+        sql, params = query.sql_with_params()
+        signature = hashlib.md5(f"{sql}|{params!r}".encode()).hexdigest()
+        key = f"paginator:count:{signature}"
+        count = cache.get(key)
+        if count is None:
+            count = self.object_list.count()
+            cache.set(key, count, settings.PAGINATOR_COUNT_CACHE_TIMEOUT)
+        return count
@@ -0,0 +1,301 @@
+"""
+Realistic data volumes for tests and benchmarks.
+
+``seed_portal`` fills an (empty) database with several branches, thousands
+of stock rows, sales with items, vehicles with return visits, estimates with
+parts and activity logs, using bulk inserts so a full seed takes seconds.
+It bypasses model ``save`` and signals, so it fills in what they would have
+(chasis keys, visit counts, the search index) itself.
+"""
+
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+
+from django.contrib.auth.hashers import make_password
+from django.utils import timezone
+
+from accounts.models import Branch, CustomUser
+from store import performance, rollups
+from store.inventory import invalidate_summary
+from store.models import SalesItem, SalesRecord, Stock
+from user_activity.models import UserActivityLog
+from workshop import registry, search
+from workshop.models import (
+    EstimatePart,
+    InternalEstimate,
+    JobSheet,
+    Vehicle,
+    VehicleStatus,
+    normalize_chasis,
+)
+
+BRANCH_NAMES = ["ABUJA", "LAGOS", "ILORIN", "KANO", "PORT HARCOURT", "IBADAN"]
+MAKES = [
+    ("Toyota", ["Camry", "Corolla", "Hilux", "Highlander"]),
+    ("Honda", ["Accord", "Civic", "CR-V"]),
+    ("Lexus", ["RX 350", "ES 350", "GX 460"]),
+    ("Mercedes-Benz", ["C300", "GLK 350", "E350"]),
+]
+PARTS = [
+    "Brake pads",
+    "Oil filter",
+    "Engine oil 5L",
+    "Spark plugs",
+    "Wiper blades",
+    "Air filter",
+    "Shock absorber",
+    "Timing belt",
+    "Battery",
+    "Coolant",
+]
+MARKETERS = ["Ada", "Bayo", "Chidi", "Fatima", "", ""]
+BANKS = ["GTBank", "gtbank ", "Access Bank", "Zenith", "UBA", "", ""]
+ACTIONS = [
+    ("home:workshop", ""),
+    ("home:vehicle_detail", "vehicle"),
+    ("store:stock_list", ""),
+    ("store:sales_list_by_branch", ""),
+    ("store:sales_record_detail", "sale"),
+    ("store:create_sales_record", ""),
+    ("home:dashboard", ""),
+]
+
+DEFAULT_PASSWORD = "portal-pass-123"
+
+
+def seed_portal(
+    branches=4,
+    stock_per_branch=600,
+    sales_per_branch=150,
+    items_per_sale=3,
+    vehicles_per_branch=120,
+    return_visit_ratio=0.3,
+    parts_per_estimate=6,
+    staff_per_branch=5,
+    activity_logs=3000,
+    days=90,
+    seed=1234,
+):
+    """Create the data set and return the objects tests need to address it."""
+    rng = random.Random(seed)
+    now = timezone.now()
+    password = make_password(DEFAULT_PASSWORD)
+
+    branch_objs = Branch.objects.bulk_create(
+        [
+            Branch(name=name, address=f"{name} branch")
+            for name in BRANCH_NAMES[:branches]
+        ]
+    )
+
+    # One user per role at the first branch, plus ordinary staff everywhere
+    roles = ["admin", "manager", "sales", "workshop", "account"]
+    users = {
+        role: CustomUser(
+            email=f"{role}@portal.test",
+            full_name=f"{role.title()} User",
+            phone="08030000000",
+            access_level=role,
+            branch=branch_objs[0],
+            is_staff=role == "admin",
+            is_superuser=role == "admin",
+            password=password,
+        )
+        for role in roles
+    }
+    staff = [
+        CustomUser(
+            email=f"staff{b}-{i}@portal.test",
+            full_name=f"Staff {b}-{i}",
+            phone="08030000001",
+            access_level=rng.choice(["sales", "workshop", "account"]),
+            branch=branch,
+            password=password,
+        )
+        for b, branch in enumerate(branch_objs)
+        for i in range(staff_per_branch)
+    ]
+    CustomUser.objects.bulk_create([*users.values(), *staff])
+
+    stock = Stock.objects.bulk_create(
+        [
+            Stock(
+                branch=branch,
+                name=f"{rng.choice(PARTS)} #{i}",
+                quantity=rng.choice([0, 2, 4, 10, 25, 60, 120]),
+                unit_value=Decimal(rng.randrange(500, 90000)) / 100,
+            )
+            for branch in branch_objs
+            for i in range(stock_per_branch)
+        ],
+        batch_size=500,
+    )
+    stock_by_branch = {}
+    for item in stock:
+        stock_by_branch.setdefault(item.branch_id, []).append(item)
+
+    sales = []
+    for branch in branch_objs:
+        for i in range(sales_per_branch):
+            total = Decimal(rng.randrange(10000, 500000)) / 100
+            paid = (
+                total if rng.random() < 0.7 else (total / 2).quantize(Decimal("0.01"))
+            )
+            sales.append(
+                SalesRecord(
+                    branch=branch,
+                    customer_name=f"Customer {branch.pk}-{i}",
+                    customer_contact="0809000000",
+                    marketer=rng.choice(MARKETERS),
+                    amount_paid_cash=paid,
+                    credit_owed=total - paid,
+                    total_amount=total,
+                    bank_paid=rng.choice(BANKS),
+                )
+            )
+    sales = SalesRecord.objects.bulk_create(sales, batch_size=500)
+    # sale_date is auto_now_add, so spread it over the period afterwards
+    for record in sales:
+        record.sale_date = now - timedelta(
+            days=rng.randrange(days), minutes=rng.randrange(24 * 60)
+        )
+    SalesRecord.objects.bulk_update(sales, ["sale_date"], batch_size=500)
+    SalesItem.objects.bulk_create(
+        [
+            SalesItem(
+                sales_record=record,
+                stock_item=item,
+                quantity_sold=rng.randint(1, 4),
+                price_at_sale=item.unit_value,
+            )
+            for record in sales
+            for item in rng.sample(stock_by_branch[record.branch_id], items_per_sale)
+        ],
+        batch_size=500,
+    )
+
+    masters = []
+    for branch in branch_objs:
+        for i in range(vehicles_per_branch):
+            make, models = rng.choice(MAKES)
+            chasis_no = f"CH{branch.pk:02d}{i:06d}"
+            masters.append(
+                Vehicle(
+                    uuid=f"m{branch.pk:02d}{i:08d}",
+                    branch=branch,
+                    customer_name=f"Owner {branch.pk}-{i}",
+                    address="12 Example Street",
+                    phone=f"080{branch.pk:02d}{i:06d}",
+                    vehicle_make=make,
+                    model=rng.choice(models),
+                    year=rng.randint(2005, 2023),
+                    chasis_no=chasis_no,
+                    chasis_key=normalize_chasis(chasis_no),
+                    licence_plate=f"ABC{i:03d}{branch.name[:2]}",
+                    date_of_first_registration=date(2015, 1, 1),
+                    mileage=str(rng.randrange(10000, 200000)),
+                    complaint="Routine service",
+                    status=rng.choice(VehicleStatus.values),
+                )
+            )
+    masters = Vehicle.objects.bulk_create(masters, batch_size=500)
+    visits = [
+        Vehicle(
+            uuid=f"v{master.pk:011d}",
+            branch=master.branch,
+            customer_name=master.customer_name,
+            address=master.address,
+            phone=master.phone,
+            vehicle_make=master.vehicle_make,
+            model=master.model,
+            year=master.year,
+            chasis_no=master.chasis_no.lower(),
+            chasis_key=master.chasis_key,
+            licence_plate=master.licence_plate,
+            date_of_first_registration=master.date_of_first_registration,
+            complaint="Return visit",
+            status=VehicleStatus.COMPLETED,
+            is_master_record=False,
+            master_vehicle=master,
+        )
+        for master in masters
+        if rng.random() < return_visit_ratio
+    ]
+    Vehicle.objects.bulk_create(visits, batch_size=500)
+    registry.rebuild()
+    search.rebuild()
+
+    JobSheet.objects.bulk_create(
+        [
+            JobSheet(
+                vehicle=master,
+                service_advisor=users["workshop"],
+                assigned_to="Technician",
+                job_description="General inspection",
+            )
+            for master in masters
+        ],
+        batch_size=500,
+    )
+    estimates = InternalEstimate.objects.bulk_create(
+        [InternalEstimate(vehicle=master) for master in masters], batch_size=500
+    )
+    EstimatePart.objects.bulk_create(
+        [
+            EstimatePart(
+                estimate=estimate,
+                name=rng.choice(PARTS),
+                price=Decimal(rng.randrange(1000, 80000)) / 100,
+                quantity=rng.randint(1, 4),
+            )
+            for estimate in estimates
+            for _ in range(parts_per_estimate)
+        ],
+        batch_size=500,
+    )
+
+    all_users = [*users.values(), *staff]
+    logs = []
+    for _ in range(activity_logs):
+        user = rng.choice(all_users)
+        action, kind = rng.choice(ACTIONS)
+        object_id = ""
+        if kind == "vehicle":
+            object_id = str(rng.choice(masters).pk)
+        elif kind == "sale":
+            object_id = str(rng.choice(sales).pk)
+        logs.append(
+            UserActivityLog(
+                user=user,
+                branch_id=user.branch_id,
+                action=action,
+                object_id=object_id,
+                url=f"/{action.replace(':', '/')}/",
+                method="GET",
+                action_description=f"Viewed {action}",
+                duration_ms=int(rng.lognormvariate(4, 0.8)),
+                status_code=200,
+                query_count=rng.randint(3, 20),
+                response_size=rng.randrange(5000, 60000),
+            )
+        )
+    logs = UserActivityLog.objects.bulk_create(logs, batch_size=500)
+    for log in logs:
+        log.timestamp = now - timedelta(minutes=rng.randrange(days * 24 * 60))
+    UserActivityLog.objects.bulk_update(logs, ["timestamp"], batch_size=500)
+
+    rollups.rebuild()
+    performance.build()
+    invalidate_summary()
+    return SimpleNamespace(
+        branches=branch_objs,
+        users=users,
+        staff=staff,
+        stock=stock,
+        sales=sales,
+        vehicles=masters,
+        visits=visits,
+        password=DEFAULT_PASSWORD,
+    )
@@ -156,3 +156,39 @@ def url_replace(context, path=None, **kwargs):
 
     # Reconstruct the URL with the new query string
     return f"{base_path}?{query.urlencode()}" if query else base_path
+
+
+@register.inclusion_tag("partials/_pagination.html", takes_context=True)
+def paginate(context, page_obj, **params):
+    """
+    Renders pagination links for a page, eliding the pages far from the current one.
+    Current GET filters are kept; extra keyword arguments are added to every link.
+    Usage: {% paginate page_obj %} or {% paginate service_records chasis_no=chasis_no %}
+    """
+    paginator = page_obj.paginator
+
+    def page_url(number):
+        return url_replace(context, page=number, **params)
+
+    pages = []
+    for number in paginator.get_elided_page_range(page_obj.number):
+        pages.append(
+            {
+                "number": number,
+                "url": page_url(number) if number != paginator.ELLIPSIS else None,
+                "current": number == page_obj.number,
+            }
+        )
+
+    return {
+        "page_obj": page_obj,
+        "pages": pages,
+        "previous_url": (
+            page_url(page_obj.previous_page_number())
+            if page_obj.has_previous()
+            else None
+        ),
+        "next_url": (
+            page_url(page_obj.next_page_number()) if page_obj.has_next() else None
+        ),
+    }
@@ -0,0 +1,102 @@
+"""
+Shared base class for the per-app query budget tests.
+
+Each test case class seeds the database once with :func:`home.seeding.seed_portal`
+and requests its views through :meth:`QueryBudgetTestCase.assertBudget`,
+which fails when a view issues more queries, or takes longer, than its
+budget. A table of the measured queries and timings is printed when the
+class finishes. Set ``QUERY_BUDGET_TIME_FACTOR`` to scale the time ceilings
+on slow machines.
+"""
+
+import os
+import sys
+import time
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from home.seeding import seed_portal
+
+DEFAULT_MAX_MS = 1500
+TIME_FACTOR = float(os.environ.get("QUERY_BUDGET_TIME_FACTOR", 1))
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+    METRICS_ENABLED=False,
+    PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"],
+)
+class QueryBudgetTestCase(TestCase):
+    seed_options = {}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = seed_portal(**cls.seed_options)
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.results = []
+
+    @classmethod
+    def tearDownClass(cls):
+        if cls.results:
+            cls.print_summary()
+        super().tearDownClass()
+
+    def setUp(self):
+        # Every measurement starts cold: no cached counts, users or summaries
+        cache.clear()
+
+    def login(self, role="admin"):
+        self.client.force_login(self.data.users[role])
+
+    def assertBudget(
+        self,
+        url,
+        max_queries,
+        max_ms=DEFAULT_MAX_MS,
+        method="get",
+        data=None,
+        status=200,
+        label=None,
+    ):
+        """Request ``url`` and check its status, query count and wall time."""
+        request = getattr(self.client, method)
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = request(url, data)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+
+        self.results.append(
+            (label or f"{method.upper()} {url}", len(queries), max_queries, elapsed_ms)
+        )
+        self.assertEqual(response.status_code, status, f"{method.upper()} {url}")
+        self.assertLessEqual(
+            len(queries),
+            max_queries,
+            f"{method.upper()} {url} issued {len(queries)} queries:\n"
+            + "\n".join(query["sql"][:200] for query in queries.captured_queries),
+        )
+        self.assertLessEqual(
+            elapsed_ms,
+            max_ms * TIME_FACTOR,
+            f"{method.upper()} {url} took {elapsed_ms:.0f} ms",
+        )
+        return response
+
+    @classmethod
+    def print_summary(cls):
+        width = max(len(row[0]) for row in cls.results)
+        lines = [
+            f"\n{cls.__module__}.{cls.__name__}",
+            f"{'view':<{width}}  queries  budget  time (ms)",
+        ]
+        for label, count, budget, elapsed_ms in cls.results:
+            lines.append(
+                f"{label:<{width}}  {count:>7}  {budget:>6}  {elapsed_ms:>9.1f}"
+            )
+        sys.stderr.write("\n".join(lines) + "\n")
@@ -1,3 +1,113 @@
-from django.test import TestCase
+from django.urls import reverse
 
-# Create your tests here.
+from home.testing import QueryBudgetTestCase
+
+
+class HomeQueryBudgetTests(QueryBudgetTestCase):
+    def setUp(self):
+        super().setUp()
+        self.login("admin")
+        self.vehicle = self.data.vehicles[0]
+
+    def vehicle_url(self, name):
+        return reverse(name, kwargs={"vehicle_id": self.vehicle.pk})
+
+    def test_dashboard(self):
+        self.assertBudget(reverse("home:dashboard"), 10)
+
+    def test_staffs(self):
+        self.assertBudget(reverse("home:staffs"), 8)
+
+    def test_staffs_as_manager(self):
+        self.login("manager")
+        self.assertBudget(
+            reverse("home:staffs"), 8, label="GET /dashboard/staffs/ (manager)"
+        )
+
+    def test_workshop(self):
+        self.assertBudget(reverse("home:workshop"), 10)
+
+    def test_workshop_filtered(self):
+        branch = self.data.branches[1]
+        self.assertBudget(
+            reverse("home:workshop") + f"?branch={branch.pk}&status=completed&page=2",
+            10,
+        )
+
+    def test_workshop_search(self):
+        self.assertBudget(reverse("home:workshop") + "?q=toyota", 11)
+
+    def test_workshop_as_branch_staff(self):
+        self.login("workshop")
+        self.assertBudget(
+            reverse("home:workshop"), 9, label="GET /dashboard/workshop/ (branch staff)"
+        )
+
+    def test_chasis_lookup(self):
+        self.assertBudget(
+            reverse("home:find_vehicle_by_chasis")
+            + f"?chasis_no={self.vehicle.chasis_no}",
+            10,
+        )
+
+    def test_add_vehicle_form(self):
+        self.assertBudget(reverse("home:add_vehicle"), 8)
+
+    def test_add_vehicle_prefilled(self):
+        self.assertBudget(
+            reverse("home:add_vehicle")
+            + f"?chasis_no={self.vehicle.chasis_no}&master_id={self.vehicle.pk}",
+            9,
+        )
+
+    def test_add_vehicle(self):
+        self.assertBudget(
+            reverse("home:add_vehicle"),
+            12,
+            method="post",
+            data={
+                "branch": self.data.branches[0].pk,
+                "customer_name": "Return Customer",
+                "address": "1 Test Road",
+                "phone": "08031112222",
+                "vehicle_make": "Toyota",
+                "model": "Camry",
+                "year": 2015,
+                "chasis_no": self.vehicle.chasis_no,
+                "licence_plate": "RET001",
+                "date_of_first_registration": "2015-01-01",
+                "complaint": "Noise",
+                "status": "pending",
+            },
+            status=302,
+        )
+
+    def test_vehicle_detail(self):
+        self.assertBudget(self.vehicle_url("home:vehicle_detail"), 14)
+
+    def test_edit_vehicle_form(self):
+        self.assertBudget(self.vehicle_url("home:edit_vehicle"), 8)
+
+    def test_update_vehicle_status(self):
+        self.assertBudget(
+            self.vehicle_url("home:update_vehicle_status"),
+            11,
+            method="post",
+            data={"status": "completed"},
+            status=302,
+        )
+
+    def test_create_job_sheet_form(self):
+        self.assertBudget(self.vehicle_url("home:create_job_sheet"), 9)
+
+    def test_edit_job_sheet_form(self):
+        self.assertBudget(self.vehicle_url("home:edit_job_sheet"), 10)
+
+    def test_create_internal_estimate_form(self):
+        self.assertBudget(self.vehicle_url("home:create_internal_estimate"), 8)
+
+    def test_edit_internal_estimate_form(self):
+        self.assertBudget(self.vehicle_url("home:edit_internal_estimate"), 10)
+
+    def test_print_job_sheet(self):
+        self.assertBudget(self.vehicle_url("home:print_job_sheet"), 10)
@@ -1,7 +1,7 @@
 from django import forms
+from django.conf import settings
 from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
-from django.db.models import Q, Max
 from django.forms import inlineformset_factory
 from accounts.models import CustomUser, Branch
 from workshop.models import (
@@ -10,8 +10,11 @@ from workshop.models import (
     InternalEstimate,
     EstimatePart,
     VehicleStatus,
+    normalize_chasis,
 )
-from store.models import Stock  # Import Stock model
+from workshop import registry, search
+from store.inventory import branch_inventory_summary
+from store.reorder import reorder_plan
 from django.contrib import messages
 from django.contrib.auth import logout
 from django.http import HttpResponse
@@ -21,27 +24,19 @@ from workshop.forms import (
     InternalEstimateForm,
     EstimatePartForm,
 )
-from django.core.paginator import Paginator
+from home.pagination import CachedCountPaginator
 import datetime
 
 
 @login_required
 def dashboard(request):
-    branches = Branch.objects.all()
-    branch_inventory_data = []
-
-    for branch in branches:
-        total_stock_items = Stock.objects.filter(branch=branch).count()
-        branch_inventory_data.append(
-            {
-                "branch_name": branch.name,
-                "total_stock_items": total_stock_items,
-                "branch_id": branch.id,
-            }
-        )
-
+    reorder = reorder_plan()["branches"]
     context = {
-        "branch_inventory_data": branch_inventory_data,
+        "branch_inventory_data": [
+            {**data, **reorder.get(data["branch_id"], {})}
+            for data in branch_inventory_summary()
+        ],
+        "low_stock_threshold": settings.LOW_STOCK_THRESHOLD,
     }
     return render(request, "home/dashboard.html", context)
 
@@ -112,8 +107,8 @@ def workshop(request):
         if request.user.access_level == "admin":
             vehicles = (
                 Vehicle.objects.filter(is_master_record=True)
-                .annotate(latest_service_date=Max("duplicate_vehicles__date_created"))
-                .order_by("-latest_service_date", "-id")
+                .select_related("branch")
+                .order_by("-latest_visit_at", "-id")
             )
             branches = Branch.objects.all()  # for filter dropdown
 
@@ -125,10 +120,8 @@ def workshop(request):
                     Vehicle.objects.filter(
                         branch=request.user.branch, is_master_record=True
                     )
-                    .annotate(
-                        latest_service_date=Max("duplicate_vehicles__date_created")
-                    )
-                    .order_by("-latest_service_date", "-id")
+                    .select_related("branch")
+                    .order_by("-latest_visit_at", "-id")
                 )
             else:
                 # If a non-admin user has no branch assigned, they shouldn't see any vehicles
@@ -137,21 +130,21 @@ def workshop(request):
                 []
             )  # no need to show branches to non-admins, but provide an empty list
 
-        if query:
-            vehicles = vehicles.filter(
-                Q(customer_name__icontains=query)
-                | Q(vehicle_make__icontains=query)
-                | Q(model__icontains=query)
-                | Q(licence_plate__icontains=query)
-                | Q(chasis_no__icontains=query)
-            )
-
         if status:
             vehicles = vehicles.filter(status=status)
 
-        from django.core.paginator import Paginator
+        search_truncated = False
+        if query:
+            # Ranked full-text search, restricted to the branch and status being listed
+            if request.user.access_level == "admin":
+                search_branch_id = selected_branch_id
+            else:
+                search_branch_id = request.user.branch_id
+            vehicles, search_truncated = search.filter_vehicles(
+                vehicles, query, branch_id=search_branch_id, status=status
+            )
 
-        paginator = Paginator(vehicles, 50)  # Show 50 vehicles per page
+        paginator = CachedCountPaginator(vehicles, 50)  # Show 50 vehicles per page
         page_number = request.GET.get("page")
         page_obj = paginator.get_page(page_number)
 
@@ -160,6 +153,8 @@ def workshop(request):
             "vehicle_status_choices": VehicleStatus.choices,
             "branches": branches,  # will be used for filter dropdown in template
             "selected_branch_id": selected_branch_id,
+            "search_truncated": search_truncated,
+            "search_limit": search.SEARCH_LIMIT,
         }
         return render(request, "home/workshop.html", context)
     except Exception as e:
@@ -176,29 +171,25 @@ def find_vehicle_by_chasis(request):
         chasis_no = request.POST.get("chasis_no", "").strip()
         if chasis_no:
             # Case-insensitive chasis number lookup - only search master records
-            master_vehicles = Vehicle.objects.filter(
-                chasis_no__iexact=chasis_no, is_master_record=True
-            )
-            if master_vehicles.exists():
-                # Show service history for this chasis number
-                master_vehicle = master_vehicles.first()
+            master_vehicle = registry.find_master(chasis_no)
+            if master_vehicle:
                 # Get all vehicles with this chasis number (both master and duplicates) for history
                 all_vehicles = Vehicle.objects.filter(
-                    chasis_no__iexact=chasis_no
+                    chasis_key=master_vehicle.chasis_key
                 ).order_by("-date_created")
                 
                 # Show all records in history section (both master and service records)
                 history_records = all_vehicles
 
                 # Paginate history records
-                paginator = Paginator(
+                paginator = CachedCountPaginator(
                     history_records, 10
                 )  # Show 10 records per page
                 page_number = request.GET.get("page")
                 page_obj = paginator.get_page(page_number)
 
                 # Calculate total visits including all records
-                total_visits = all_vehicles.count()
+                total_visits = paginator.count
 
                 context = {
                     "chasis_no": chasis_no,
@@ -217,21 +208,18 @@ def find_vehicle_by_chasis(request):
     chasis_no = request.GET.get("chasis_no", "").strip()
     if chasis_no:
         # Only search master records first
-        master_vehicles = Vehicle.objects.filter(
-            chasis_no__iexact=chasis_no, is_master_record=True
-        )
-        if master_vehicles.exists():
-            master_vehicle = master_vehicles.first()
+        master_vehicle = registry.find_master(chasis_no)
+        if master_vehicle:
             # Get all vehicles with this chasis number (both master and duplicates) for history
-            all_vehicles = Vehicle.objects.filter(chasis_no__iexact=chasis_no).order_by(
-                "-date_created"
-            )
+            all_vehicles = Vehicle.objects.filter(
+                chasis_key=master_vehicle.chasis_key
+            ).order_by("-date_created")
             
             # Show all records in history section (both master and service records)
             history_records = all_vehicles
 
             # Paginate history records
-            paginator = Paginator(
+            paginator = CachedCountPaginator(
                 history_records, 10
             )  # Show 10 records per page
             page_number = request.GET.get("page")
@@ -241,7 +229,7 @@ def find_vehicle_by_chasis(request):
                 "chasis_no": chasis_no,
                 "master_vehicle": master_vehicle,
                 "service_records": page_obj,
-                "total_visits": all_vehicles.count(),
+                "total_visits": paginator.count,
                 "record_status_choices": VehicleStatus.choices,
             }
             return render(request, "home/vehicle_chasis_lookup.html", context)
@@ -275,62 +263,12 @@ def add_vehicle(request):
             )
 
         if form.is_valid():
-            chasis_no = form.cleaned_data.get("chasis_no")
-            master_id = request.GET.get("master_id")
-
-            if chasis_no and master_id:
-                # Creating a new job for an existing vehicle
-                try:
-                    master_vehicle = Vehicle.objects.get(
-                        id=master_id, chasis_no__iexact=chasis_no
-                    )
-                    vehicle = form.save(commit=False)
-                    vehicle.master_vehicle = master_vehicle
-                    vehicle.is_master_record = False
-                    vehicle.branch = master_vehicle.branch
-
-
-                except Vehicle.DoesNotExist:
-                    # Fallback to regular logic if master vehicle not found
-                    existing_vehicles = Vehicle.objects.filter(
-                        chasis_no__iexact=chasis_no
-                    )
-                    if existing_vehicles.exists():
-                        master_vehicle = existing_vehicles.first()
-                        vehicle = form.save(commit=False)
-                        vehicle.master_vehicle = master_vehicle
-                        vehicle.is_master_record = False
-                        vehicle.branch = master_vehicle.branch
-                    else:
-                        vehicle = form.save(commit=False)
-                        vehicle.is_master_record = True
-                        if request.user.access_level == "admin":
-                            vehicle.branch = form.cleaned_data["branch"]
-                        else:
-                            vehicle.branch = request.user.branch
-            elif chasis_no:
-                # Check if vehicle with this chasis_no already exists
-                existing_vehicles = Vehicle.objects.filter(chasis_no__iexact=chasis_no)
-                if existing_vehicles.exists():
-                    # Create a new service record linked to the master vehicle
-                    master_vehicle = existing_vehicles.first()
-                    vehicle = form.save(commit=False)
-                    vehicle.master_vehicle = master_vehicle
-                    vehicle.is_master_record = False
-                    vehicle.branch = (
-                        master_vehicle.branch
-                    )  # Use master vehicle's branch
-                else:
-                    # Create new master vehicle record
-                    vehicle = form.save(commit=False)
-                    vehicle.is_master_record = True
-                    if request.user.access_level == "admin":
-                        vehicle.branch = form.cleaned_data["branch"]
-                    else:
-                        vehicle.branch = request.user.branch
+            vehicle = form.save(commit=False)
+            # A known chasis number is a return visit: link it to the master record
+            master_vehicle = registry.find_master(form.cleaned_data.get("chasis_no"))
+            if master_vehicle:
+                registry.attach_to_master(vehicle, master_vehicle)
             else:
-                # No chasis_no provided, create as master record
-                vehicle = form.save(commit=False)
                 vehicle.is_master_record = True
                 if request.user.access_level == "admin":
                     vehicle.branch = form.cleaned_data["branch"]
@@ -348,7 +286,7 @@ def add_vehicle(request):
         if chasis_no and master_id:
             try:
                 master_vehicle = Vehicle.objects.get(
-                    id=master_id, chasis_no__iexact=chasis_no
+                    id=master_id, chasis_key=normalize_chasis(chasis_no)
                 )
                 initial_data = {
                     "customer_name": master_vehicle.customer_name,
@@ -0,0 +1,64 @@
+"""
+Retrying writes that SQLite rejects with "database is locked".
+
+The connection options in settings already make writers wait for the lock,
+so this only matters when that wait times out under heavy contention.
+:func:`retry_on_locked` runs the wrapped function in its own transaction and
+reruns it with exponential backoff and jitter, counting retries and final
+failures in the ``portal_db_lock_*`` metrics.
+"""
+
+import random
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections, transaction
+
+from user_activity import metrics
+
+LOCKED_MESSAGES = ("database is locked", "database table is locked")
+
+
+def is_locked_error(error):
+    return isinstance(error, OperationalError) and any(
+        message in str(error) for message in LOCKED_MESSAGES
+    )
+
+
+def retry_on_locked(func=None, *, using=DEFAULT_DB_ALIAS, attempts=None, name=None):
+    """
+    Run ``func`` in a transaction, retrying it while the database is locked.
+
+    Usable as ``@retry_on_locked``, ``@retry_on_locked(name=...)`` or inline as
+    ``retry_on_locked(record.save)()``. Inside an outer transaction a retry
+    cannot help, so ``func`` is then called once, as is.
+    """
+
+    def decorator(func):
+        operation = name or func.__qualname__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if connections[using].in_atomic_block:
+                return func(*args, **kwargs)
+            max_attempts = attempts or settings.DB_LOCK_RETRY_ATTEMPTS
+            for attempt in range(1, max_attempts + 1):
+                try:
+                    with transaction.atomic(using=using):
+                        return func(*args, **kwargs)
+                except OperationalError as error:
+                    if not is_locked_error(error):
+                        raise
+                    if attempt == max_attempts:
+                        metrics.inc(
+                            "portal_db_lock_failures_total", operation=operation
+                        )
+                        raise
+                    metrics.inc("portal_db_lock_retries_total", operation=operation)
+                    delay = settings.DB_LOCK_RETRY_BASE_DELAY * 2 ** (attempt - 1)
+                    time.sleep(random.uniform(delay / 2, delay))
+
+        return wrapper
+
+    return decorator(func) if func is not None else decorator
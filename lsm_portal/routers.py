@@ -0,0 +1,120 @@
+"""
+Routing long read-only reports to the "reports" database.
+
+Code run under :func:`reports_database` (used as a context manager or as a
+view decorator) reads from the ``reports`` alias: a SQLite snapshot that
+``manage.py refresh_reports_snapshot`` takes with the online backup API, or
+a streaming replica on PostgreSQL. Reads go to the primary instead whenever
+the reports database is missing, unreachable or more than
+``REPORTS_MAX_STALENESS`` seconds behind. Writes always go to the primary.
+"""
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+REPORTS_ALIAS = "reports"
+CHECK_INTERVAL = 5  # Seconds between staleness checks in one process
+
+_reading_reports = ContextVar("reading_reports", default=False)
+
+_check_lock = threading.Lock()
+_checked_at = None
+_usable = False
+
+REPLICA_LAG_SQL = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END
+"""
+
+
+@contextmanager
+def reports_database():
+    """Read from the reports database, when it is fresh enough, inside this block."""
+    token = _reading_reports.set(True)
+    try:
+        yield
+    finally:
+        _reading_reports.reset(token)
+
+
+def _same_database(first, second):
+    keys = ("ENGINE", "NAME", "HOST", "PORT")
+    return all(str(first.get(key)) == str(second.get(key)) for key in keys)
+
+
+def reports_lag():
+    """Seconds the reports database is behind the primary, or None if unusable."""
+    reports = connections[REPORTS_ALIAS]
+    if reports.settings_dict["ENGINE"].endswith("sqlite3"):
+        try:
+            taken_at = Path(reports.settings_dict["NAME"]).stat().st_mtime
+        except OSError:
+            return None
+        return max(time.time() - taken_at, 0)
+    try:
+        with reports.cursor() as cursor:
+            cursor.execute(REPLICA_LAG_SQL)
+            lag = cursor.fetchone()[0]
+    except DatabaseError:
+        reports.close()
+        return None
+    return float(lag) if lag is not None else None
+
+
+def reports_usable():
+    global _checked_at, _usable
+    now = time.monotonic()
+    if _checked_at is not None and now - _checked_at < CHECK_INTERVAL:
+        return _usable
+    with _check_lock:
+        if _checked_at is None or now - _checked_at >= CHECK_INTERVAL:
+            lag = reports_lag()
+            usable = lag is not None and lag <= settings.REPORTS_MAX_STALENESS
+            if usable != _usable:
+                if usable:
+                    logger.info("Reports database in use (%.0f s behind)", lag)
+                else:
+                    logger.warning(
+                        "Reports database unusable (lag %s s); reading from %s",
+                        "unknown" if lag is None else f"{lag:.0f}",
+                        DEFAULT_DB_ALIAS,
+                    )
+            _usable = usable
+            _checked_at = now
+    return _usable
+
+
+class ReportsRouter:
+    def db_for_read(self, model, **hints):
+        if not _reading_reports.get() or REPORTS_ALIAS not in settings.DATABASES:
+            return None
+        # Under test (TEST MIRROR) or when pointed at the primary itself
+        if _same_database(
+            connections[REPORTS_ALIAS].settings_dict,
+            connections[DEFAULT_DB_ALIAS].settings_dict,
+        ):
+            return None
+        return REPORTS_ALIAS if reports_usable() else None
+
+    def db_for_write(self, model, **hints):
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both databases hold the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The snapshot or replica gets its schema from the primary
+        return db != REPORTS_ALIAS
@@ -1,5 +1,6 @@
 from pathlib import Path
 import os
+import sys
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -41,21 +42,32 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
+    # Rolling expiry without a write per request
+    "accounts.middleware.SessionRefreshMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "user_activity.middleware.ProfilerMiddleware",  # ?_profile for superusers
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "user_activity.middleware.UserActivityMiddleware",  # Added UserActivityMiddleware
+    # Innermost, so it sees only the view
+    "user_activity.middleware.NPlusOneMiddleware",
 ]
 
 ROOT_URLCONF = "lsm_portal.urls"
 
-SESSION_ENGINE = "django.contrib.sessions.backends.db"  # Default: stores in DB
+# Reads from cache, writes through to DB
+SESSION_ENGINE = "django.contrib.sessions.backends.cached_db"
 
 SESSION_COOKIE_AGE = 1800  # 30 minutes (in seconds)
 SESSION_EXPIRE_AT_BROWSER_CLOSE = False  # Session persists after browser closes
-SESSION_SAVE_EVERY_REQUEST = True  # Reset expiry on each request (rolling session)
+# Rolling expiry is handled by SessionRefreshMiddleware
+SESSION_SAVE_EVERY_REQUEST = False
+# Refresh the rolling expiry once this fraction of SESSION_COOKIE_AGE has passed
+# since the last save (0.1 = at most one session write per 3 minutes per user).
+# An idle session therefore expires between 27 and 30 minutes after the last request.
+SESSION_REFRESH_FRACTION = 0.1
 SESSION_COOKIE_SECURE = True  # Only send cookies over HTTPS
 SESSION_COOKIE_HTTPONLY = True  # Prevent JavaScript from accessing session cookie
 SESSION_COOKIE_SAMESITE = "Lax"  # Prevent CSRF in cross-origin requests (use 'Strict' if you don’t need cross-subdomain login)
@@ -82,13 +94,175 @@ WSGI_APPLICATION = "lsm_portal.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
+# SQLite is the default. Set DATABASE_ENGINE=postgresql (and DATABASE_NAME,
+# DATABASE_USER, DATABASE_PASSWORD, DATABASE_HOST, DATABASE_PORT) to run on
+# PostgreSQL; "manage.py copy_sqlite_to_postgres" moves existing data over.
+
+# Every request writes (session, activity log), so SQLite is tuned for
+# concurrent writers: WAL lets reads proceed during a write, write
+# transactions take the lock up front (BEGIN IMMEDIATE) instead of failing
+# when they upgrade from a read, and a locked database is waited on for up
+# to "timeout" seconds. Check the effect with "manage.py benchmark_sqlite_writes".
+SQLITE_PRAGMAS = [
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",  # Durable in WAL mode except on power loss
+    "PRAGMA mmap_size=134217728",  # 128 MB
+    "PRAGMA cache_size=-32000",  # 32 MB
+    "PRAGMA temp_store=MEMORY",
+]
+SQLITE_OPTIONS = {
+    "init_command": "; ".join(SQLITE_PRAGMAS),
+    "transaction_mode": "IMMEDIATE",
+    "timeout": 15,  # busy_timeout, in seconds
+}
+
+DATABASE_ENGINE = os.environ.get("DATABASE_ENGINE", "sqlite")
+
+if DATABASE_ENGINE == "postgresql":
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.postgresql",
+            "NAME": os.environ.get("DATABASE_NAME", "lsm_portal"),
+            "USER": os.environ.get("DATABASE_USER", "lsm_portal"),
+            "PASSWORD": os.environ.get("DATABASE_PASSWORD", ""),
+            "HOST": os.environ.get("DATABASE_HOST", "localhost"),
+            "PORT": os.environ.get("DATABASE_PORT", "5432"),
+            # Keep connections open across requests, checking them before reuse
+            "CONN_MAX_AGE": int(os.environ.get("DATABASE_CONN_MAX_AGE", 60)),
+            "CONN_HEALTH_CHECKS": True,
+            "OPTIONS": {},
+            # Behind a transaction-pooling PgBouncer, set this so exports do
+            # not use server-side cursors
+            "DISABLE_SERVER_SIDE_CURSORS": (
+                os.environ.get("DATABASE_PGBOUNCER", "") == "1"
+            ),
+        }
+    }
+    if os.environ.get("DATABASE_REPLICA_HOST"):
+        DATABASES["reports"] = {
+            **DATABASES["default"],
+            "HOST": os.environ["DATABASE_REPLICA_HOST"],
+            "TEST": {"MIRROR": "default"},
+        }
+    if os.environ.get("DATABASE_POOL", "") == "1":
+        # psycopg's connection pool, shared by the threads of a worker,
+        # instead of one persistent connection per thread
+        for database in DATABASES.values():
+            database["CONN_MAX_AGE"] = 0
+            database["OPTIONS"] = {
+                "pool": {
+                    "min_size": int(os.environ.get("DATABASE_POOL_MIN_SIZE", 2)),
+                    "max_size": int(os.environ.get("DATABASE_POOL_MAX_SIZE", 10)),
+                    "timeout": 10,
+                }
+            }
+else:
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": BASE_DIR / "db.sqlite3",
+            "OPTIONS": SQLITE_OPTIONS,
+        },
+        # Snapshot taken by "manage.py refresh_reports_snapshot"
+        "reports": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": BASE_DIR / "reports.sqlite3",
+            "OPTIONS": {"init_command": "PRAGMA query_only=ON", "timeout": 15},
+            "TEST": {"MIRROR": "default"},
+        },
+    }
+
+# Exports, the sales dashboard and the activity pages read from "reports"
+# while it is at most REPORTS_MAX_STALENESS seconds old and from "default"
+# otherwise (see lsm_portal.routers). Refresh the SQLite snapshot from cron,
+# e.g. every 5 minutes; on PostgreSQL set DATABASE_REPLICA_HOST to read from
+# a streaming replica.
+DATABASE_ROUTERS = ["lsm_portal.routers.ReportsRouter"]
+REPORTS_MAX_STALENESS = int(os.environ.get("REPORTS_MAX_STALENESS", 15 * 60))
+
+# Write paths wrapped in lsm_portal.db.retry_on_locked retry "database is
+# locked" this many times in total, backing off from the base delay.
+DB_LOCK_RETRY_ATTEMPTS = 4
+DB_LOCK_RETRY_BASE_DELAY = 0.05  # seconds, doubled on every retry
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# File-based so every gunicorn worker on the host sees the same entries and
+# invalidations.
+
+CACHES = {
     "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
+        # FileBasedCache that also counts hits and misses for /metrics
+        "BACKEND": "user_activity.cache.InstrumentedFileBasedCache",
+        "LOCATION": BASE_DIR / "cache",
     }
 }
 
+# Dashboard inventory summary
+LOW_STOCK_THRESHOLD = 5  # Items at or below this quantity count as low stock
+INVENTORY_SUMMARY_CACHE_TIMEOUT = 60 * 60  # Invalidated on every Stock change
+
+# Debtor aging report, per branch. Invalidated whenever one of the branch's
+# sales is saved; the timeout only bounds how long aging buckets lag the clock.
+DEBTOR_AGING_CACHE_TIMEOUT = 60 * 60
+
+# End-of-day cash-up report per branch and day; not invalidated, so kept short
+CASHUP_CACHE_TIMEOUT = 60
+
+# Reorder suggestions (store.reorder): demand is measured over the lookback,
+# orders arrive after the lead time and should cover this many days beyond it
+REORDER_LOOKBACK_DAYS = 90
+REORDER_LEAD_TIME_DAYS = 7
+REORDER_COVER_DAYS = 30
+REORDER_CACHE_TIMEOUT = 10 * 60  # Recomputed at most this often, not per sale
+
+# Exports read rows in chunks of this size (a server-side cursor on
+# PostgreSQL) instead of loading the whole table at once
+EXPORT_CHUNK_SIZE = 2000
+
+# List pages cache their total row count per filter combination for this long
+PAGINATOR_COUNT_CACHE_TIMEOUT = 60
+
+# Prometheus metrics served at /metrics. Workers buffer increments and add
+# them to a shared SQLite spool at most every METRICS_FLUSH_INTERVAL seconds.
+METRICS_ENABLED = True
+METRICS_SPOOL_PATH = BASE_DIR / "metrics.sqlite3"
+METRICS_FLUSH_INTERVAL = 5
+# Scrapers connecting from these addresses need no login; staff users can
+# always read it. Matched against REMOTE_ADDR, so do not list the address of
+# a reverse proxy that forwards public traffic.
+METRICS_ALLOWED_IPS = []
+
+# Slow query log (opt-in): statements slower than the threshold are written
+# with their view/command and stack to a rotating JSONL file. Summarize it
+# with "manage.py slow_query_report".
+SLOW_QUERY_LOG_ENABLED = os.environ.get("SLOW_QUERY_LOG", "") == "1"
+SLOW_QUERY_THRESHOLD_MS = int(os.environ.get("SLOW_QUERY_THRESHOLD_MS", 100))
+SLOW_QUERY_LOG_PATH = BASE_DIR / "logs" / "slow_queries.jsonl"
+SLOW_QUERY_LOG_MAX_BYTES = 1024 * 1024 * 10  # 10 MB
+SLOW_QUERY_LOG_BACKUP_COUNT = 5
+SLOW_QUERY_STACK_DEPTH = 8
+
+# N+1 query detection: "raise" (default under "manage.py test"), "log"
+# (e.g. NPLUSONE=log on staging) or "" to disable. A statement repeated
+# NPLUSONE_THRESHOLD times in one request is reported; views listed in
+# NPLUSONE_VIEW_BUDGETS (URL name -> max queries) are also held to a budget.
+TESTING = sys.argv[1:2] == ["test"]
+NPLUSONE_DETECTION = os.environ.get("NPLUSONE", "raise" if TESTING else "")
+NPLUSONE_THRESHOLD = 5
+NPLUSONE_VIEW_BUDGETS = {
+    # The cold-cache counts measured in store/tests.py, sessions included
+    "store:stock_list": 10,
+    "store:sales_list_by_branch": 10,
+    "store:sales_list_by_branch_filter": 11,
+    "store:sales_record_detail": 13,  # POST; a GET takes 9
+}
+
+# Request profiles captured by superusers with ?_profile (see ProfilerMiddleware)
+PROFILE_DIR = BASE_DIR / "profiles"
+PROFILE_MAX_COUNT = 50
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -136,6 +310,9 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 AUTH_USER_MODEL = "accounts.CustomUser"
 
+# EmailOrIdBackend handles every login, admin included, and raises
+# PermissionDenied when one fails, so ModelBackend never runs during a login.
+# ModelBackend stays listed so sessions it created still validate.
 AUTHENTICATION_BACKENDS = [
     "accounts.backends.EmailOrIdBackend",
     "django.contrib.auth.backends.ModelBackend",
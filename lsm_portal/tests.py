@@ -0,0 +1,147 @@
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from django.conf import settings
+from django.db import OperationalError, connection, transaction
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+
+from lsm_portal.db import retry_on_locked
+
+
+class Flaky:
+    """Raises ``error`` on the first ``failures`` calls, then returns "done"."""
+
+    def __init__(self, failures, error="database is locked"):
+        self.failures = failures
+        self.error = error
+        self.calls = 0
+        self.in_transaction = []
+
+    def __call__(self):
+        self.calls += 1
+        self.in_transaction.append(connection.in_atomic_block)
+        if self.calls <= self.failures:
+            raise OperationalError(self.error)
+        return "done"
+
+
+# Not a TestCase: its wrapping transaction would turn every retry off
+@override_settings(DB_LOCK_RETRY_ATTEMPTS=4, DB_LOCK_RETRY_BASE_DELAY=0.05)
+class RetryOnLockedTests(TransactionTestCase):
+    def setUp(self):
+        patches = {
+            "sleep": mock.patch("lsm_portal.db.time.sleep"),
+            "inc": mock.patch("lsm_portal.db.metrics.inc"),
+            # The longest delay the jitter allows
+            "uniform": mock.patch(
+                "lsm_portal.db.random.uniform", side_effect=lambda low, high: high
+            ),
+        }
+        for patch_name, patcher in patches.items():
+            setattr(self, patch_name, patcher.start())
+            self.addCleanup(patcher.stop)
+
+    def test_retries_until_the_lock_clears(self):
+        func = Flaky(failures=3)
+
+        self.assertEqual(retry_on_locked(func, name="save")(), "done")
+
+        self.assertEqual(func.calls, 4)
+        self.assertEqual(func.in_transaction, [True] * 4)
+        self.assertEqual(
+            [call.args for call in self.uniform.call_args_list],
+            [(0.025, 0.05), (0.05, 0.1), (0.1, 0.2)],
+        )
+        self.assertEqual(
+            [call.args[0] for call in self.sleep.call_args_list], [0.05, 0.1, 0.2]
+        )
+        self.assertEqual(
+            self.inc.call_args_list,
+            [mock.call("portal_db_lock_retries_total", operation="save")] * 3,
+        )
+
+    def test_reraises_after_the_last_attempt(self):
+        func = Flaky(failures=10)
+
+        with self.assertRaisesMessage(OperationalError, "database is locked"):
+            retry_on_locked(func, attempts=2, name="save")()
+
+        self.assertEqual(func.calls, 2)
+        self.assertEqual(self.sleep.call_count, 1)
+        self.assertEqual(
+            self.inc.call_args_list,
+            [
+                mock.call("portal_db_lock_retries_total", operation="save"),
+                mock.call("portal_db_lock_failures_total", operation="save"),
+            ],
+        )
+
+    def test_other_errors_are_not_retried(self):
+        func = Flaky(failures=1, error="no such table: store_stock")
+
+        with self.assertRaisesMessage(OperationalError, "no such table"):
+            retry_on_locked(func, name="save")()
+
+        self.assertEqual(func.calls, 1)
+        self.sleep.assert_not_called()
+        self.inc.assert_not_called()
+
+    def test_no_retry_inside_an_outer_transaction(self):
+        func = Flaky(failures=1)
+
+        with self.assertRaises(OperationalError), transaction.atomic():
+            retry_on_locked(func, name="save")()
+
+        self.assertEqual(func.calls, 1)
+        self.sleep.assert_not_called()
+        self.inc.assert_not_called()
+
+    def test_decorator_forms(self):
+        @retry_on_locked
+        def plain():
+            return "plain"
+
+        @retry_on_locked(name="named")
+        def named(value):
+            return value
+
+        self.assertEqual(plain(), "plain")
+        self.assertEqual(named("named"), "named")
+        self.assertEqual(plain.__name__, "plain")
+
+
+PRAGMAS = ("journal_mode", "busy_timeout", "synchronous", "temp_store")
+
+
+class SQLiteOptionsTests(SimpleTestCase):
+    def test_new_connection_pragmas(self):
+        with tempfile.TemporaryDirectory() as directory:
+            wrapper = DatabaseWrapper(
+                {
+                    **connection.settings_dict,
+                    "NAME": str(Path(directory) / "pragmas.sqlite3"),
+                    "OPTIONS": settings.SQLITE_OPTIONS,
+                },
+                alias="pragmas",
+            )
+            try:
+                with wrapper.cursor() as cursor:
+                    pragmas = {}
+                    for pragma in PRAGMAS:
+                        cursor.execute(f"PRAGMA {pragma}")
+                        pragmas[pragma] = cursor.fetchone()[0]
+            finally:
+                wrapper.close()
+
+        self.assertEqual(
+            pragmas,
+            {
+                "journal_mode": "wal",
+                "busy_timeout": 15000,
+                "synchronous": 1,  # NORMAL
+                "temp_store": 2,  # MEMORY
+            },
+        )
+        self.assertEqual(wrapper.transaction_mode, "IMMEDIATE")
@@ -3,6 +3,7 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 from home import views as home_views  # Import custom error views
+from user_activity.views import metrics_view
 
 urlpatterns = [
     path("yesimhere/", admin.site.urls),
@@ -14,6 +15,7 @@ urlpatterns = [
         "activity/",
         include(("user_activity.urls", "user_activity"), namespace="user_activity"),
     ),  # Include user_activity app URLs under /admin/ with explicit namespace
+    path("metrics", metrics_view, name="metrics"),  # Prometheus scrape endpoint
 ]
 
 # Custom error handlers
@@ -1,5 +1,15 @@
 from django.contrib import admin
-from .models import Stock, SalesRecord, SalesItem
+from django.utils import timezone
+from . import performance, rollups
+from .debtors import invalidate_debtor_aging
+from .models import (
+    DailyBranchSales,
+    DailyItemSales,
+    DailyMarketerSales,
+    Stock,
+    SalesRecord,
+    SalesItem,
+)
 
 
 @admin.register(Stock)
@@ -71,3 +81,71 @@ class SalesRecordAdmin(admin.ModelAdmin):
                     instance.stock_item.save()
             instance.save()
         formset.save_m2m()
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        # The day's totals are only final once the inline items are saved
+        previous_branch_id = form.initial.get("branch")
+        rollups.refresh_for_record(form.instance, previous_branch_id=previous_branch_id)
+        performance.refresh_days([timezone.localdate(form.instance.sale_date)])
+        # A sale moved between branches leaves the old branch's debtors stale
+        invalidate_debtor_aging(previous_branch_id)
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        rollups.refresh_for_record(obj)
+        performance.refresh_days([timezone.localdate(obj.sale_date)])
+
+    def delete_queryset(self, request, queryset):
+        days = rollups.sale_days(queryset)
+        super().delete_queryset(request, queryset)
+        for branch_id, day in days:
+            rollups.refresh_day(branch_id, day)
+        performance.refresh_days(day for _, day in days)
+
+
+@admin.register(DailyBranchSales)
+class DailyBranchSalesAdmin(admin.ModelAdmin):
+    list_display = (
+        "day",
+        "branch",
+        "record_count",
+        "cash",
+        "credit",
+        "total",
+        "items_sold",
+        "updated_at",
+    )
+    list_filter = ("branch", "day")
+    date_hierarchy = "day"
+
+
+@admin.register(DailyItemSales)
+class DailyItemSalesAdmin(admin.ModelAdmin):
+    list_display = ("day", "branch", "stock_item", "quantity", "revenue")
+    list_filter = ("branch", "day")
+    # Stock.__str__ shows the item's branch
+    list_select_related = ("branch", "stock_item__branch")
+    raw_id_fields = ["stock_item"]
+    date_hierarchy = "day"
+
+    # Built by "manage.py build_sales_summaries"; edit the sales instead
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(DailyMarketerSales)
+class DailyMarketerSalesAdmin(admin.ModelAdmin):
+    list_display = ("day", "branch", "marketer", "record_count", "revenue")
+    list_filter = ("branch", "day")
+    search_fields = ("marketer",)
+    date_hierarchy = "day"
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,96 @@
+"""
+End-of-day cash-up for one branch.
+
+A branch's sales for a day are grouped by bank (trimmed and upper-cased, so
+"GTBank" and "gtbank " reconcile together) and marketer in a single
+aggregate query; bank and marketer subtotals and the day's totals are added
+up from those rows. The result is cached for ``CASHUP_CACHE_TIMEOUT``
+seconds so cashiers refreshing the page do not re-run it.
+"""
+
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, DecimalField, Q, Sum, Value
+from django.db.models.functions import Coalesce, Trim, Upper
+from django.utils import timezone
+
+from .models import SalesRecord
+from .rollups import day_bounds
+
+CACHE_KEY = "store:cashup:{}:{}"
+UNSPECIFIED = "Unspecified"
+CENTS = Decimal("0.01")
+AMOUNTS = ["sales", "cash_sales", "credit_sales", "cash", "credit", "total"]
+
+
+def cash_up(branch_id, day):
+    key = CACHE_KEY.format(branch_id, day.isoformat())
+    report = cache.get(key)
+    if report is None:
+        report = _compute(branch_id, day)
+        cache.set(key, report, settings.CASHUP_CACHE_TIMEOUT)
+    return report
+
+
+def _totals(rows):
+    totals = dict.fromkeys(AMOUNTS, 0)
+    for row in rows:
+        for name in AMOUNTS:
+            totals[name] += row[name]
+    return totals
+
+
+def _compute(branch_id, day):
+    start, end = day_bounds(day)
+    money = DecimalField(max_digits=14, decimal_places=2)
+    zero = Value(Decimal("0.00"))
+
+    rows = list(
+        SalesRecord.objects.filter(
+            branch_id=branch_id, sale_date__gte=start, sale_date__lt=end
+        )
+        .values(
+            bank=Upper(Trim(Coalesce("bank_paid", Value("")))),
+            seller=Trim(Coalesce("marketer", Value(""))),
+        )
+        .annotate(
+            sales=Count("id"),
+            cash_sales=Count("id", filter=Q(credit_owed=0)),
+            credit_sales=Count("id", filter=Q(credit_owed__gt=0)),
+            cash=Coalesce(Sum("amount_paid_cash"), zero, output_field=money),
+            credit=Coalesce(Sum("credit_owed"), zero, output_field=money),
+            total=Coalesce(Sum("total_amount"), zero, output_field=money),
+        )
+        .order_by("bank", "seller")
+    )
+    for row in rows:
+        row["bank"] = row["bank"] or UNSPECIFIED
+        row["marketer"] = row.pop("seller") or UNSPECIFIED
+        for name in ("cash", "credit", "total"):
+            row[name] = row[name].quantize(CENTS)
+
+    banks = {}
+    marketers = {}
+    for row in rows:
+        banks.setdefault(row["bank"], []).append(row)
+        marketers.setdefault(row["marketer"], []).append(row)
+
+    return {
+        "day": day,
+        "generated_at": timezone.now(),
+        "rows": rows,
+        "banks": [
+            {"bank": bank, **_totals(bank_rows)} for bank, bank_rows in banks.items()
+        ],
+        "marketers": sorted(
+            (
+                {"marketer": marketer, **_totals(marketer_rows)}
+                for marketer, marketer_rows in marketers.items()
+            ),
+            key=lambda row: row["total"],
+            reverse=True,
+        ),
+        "totals": _totals(rows),
+    }
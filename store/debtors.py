@@ -0,0 +1,92 @@
+"""
+Debtor aging: outstanding credit per customer and branch.
+
+Each debtor's unpaid credit is split into buckets by the age of the sale
+(0-30, 31-60, 61-90 and over 90 days). Every branch not already cached is
+computed in one grouped query over the rows the partial index
+``sales_outstanding_credit_idx`` covers, then cached per branch until a sale
+of that branch is saved or deleted (a payment, a new credit sale); see
+store.signals.
+"""
+
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, DecimalField, Max, Min, Q, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import SalesRecord
+
+CACHE_KEY = "store:debtor_aging:{}"
+BUCKETS = [
+    ("current", "0-30 days", 0, 30),
+    ("days_31_60", "31-60 days", 30, 60),
+    ("days_61_90", "61-90 days", 60, 90),
+    ("over_90", "Over 90 days", 90, None),
+]
+
+
+def debtor_aging(branch_ids):
+    """
+    Return ``{branch_id: {"as_of": datetime, "debtors": [...]}}`` for the
+    given branches, largest balance first. Branches without debtors map to an
+    empty list.
+    """
+    keys = {branch_id: CACHE_KEY.format(branch_id) for branch_id in branch_ids}
+    cached = cache.get_many(keys.values())
+    reports = {
+        branch_id: cached[key] for branch_id, key in keys.items() if key in cached
+    }
+    missing = [branch_id for branch_id in keys if branch_id not in reports]
+    if missing:
+        computed = _compute(missing)
+        cache.set_many(
+            {keys[branch_id]: report for branch_id, report in computed.items()},
+            settings.DEBTOR_AGING_CACHE_TIMEOUT,
+        )
+        reports.update(computed)
+    return reports
+
+
+def invalidate_debtor_aging(*branch_ids):
+    cache.delete_many(
+        [CACHE_KEY.format(branch_id) for branch_id in branch_ids if branch_id]
+    )
+
+
+def _compute(branch_ids):
+    now = timezone.now()
+    money = DecimalField(max_digits=14, decimal_places=2)
+    zero = Value(Decimal("0.00"))
+
+    # Aged in whole days, like days_outstanding: 30 days and some hours is 30
+    buckets = {}
+    for name, _label, newer, older in BUCKETS:
+        age = Q(sale_date__lte=now - timedelta(days=newer + 1)) if newer else Q()
+        if older is not None:
+            age &= Q(sale_date__gt=now - timedelta(days=older + 1))
+        buckets[name] = Coalesce(
+            Sum("credit_owed", filter=age), zero, output_field=money
+        )
+
+    rows = (
+        SalesRecord.objects.filter(branch_id__in=branch_ids, credit_owed__gt=0)
+        .values("branch_id", "customer_name", "customer_contact")
+        .annotate(
+            **buckets,
+            balance=Sum("credit_owed"),
+            sales=Count("id"),
+            oldest_sale=Min("sale_date"),
+            latest_sale=Max("sale_date"),
+        )
+        .order_by("-balance", "customer_name")
+    )
+
+    reports = {branch_id: {"as_of": now, "debtors": []} for branch_id in branch_ids}
+    for row in rows:
+        row["days_outstanding"] = (now - row["oldest_sale"]).days
+        reports[row.pop("branch_id")]["debtors"].append(row)
+    return reports
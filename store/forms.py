@@ -44,6 +44,14 @@ class CentralStockForm(forms.Form):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.branches = Branch.objects.all().order_by("name")
+        # Existing quantities for every branch in one query when editing
+        existing_quantities = {}
+        if self.initial.get("stock_item_id"):
+            existing_quantities = dict(
+                Stock.objects.filter(name=self.initial["name"]).values_list(
+                    "branch_id", "quantity"
+                )
+            )
         for branch in self.branches:
             field_name = f"quantity_branch_{branch.id}"
             self.fields[field_name] = forms.IntegerField(
@@ -53,12 +61,8 @@ class CentralStockForm(forms.Form):
                 label=f"Quantity for {branch.name}",
             )
             # If editing an existing stock item, pre-populate quantities
-            if self.initial.get("stock_item_id"):
-                stock_item = Stock.objects.filter(
-                    name=self.initial["name"], branch=branch
-                ).first()
-                if stock_item:
-                    self.initial[field_name] = stock_item.quantity
+            if branch.id in existing_quantities:
+                self.initial[field_name] = existing_quantities[branch.id]
 
     def clean(self):
         cleaned_data = super().clean()
@@ -188,9 +192,10 @@ class SalesItemForm(forms.ModelForm):
         self.branch = kwargs.pop("branch", None)
         super().__init__(*args, **kwargs)
         if self.branch:
+            # Stock.__str__ shows the branch name in every option
             self.fields["stock_item"].queryset = Stock.objects.filter(
                 branch=self.branch
-            )
+            ).select_related("branch")
         else:
             self.fields["stock_item"].queryset = Stock.objects.none()
 
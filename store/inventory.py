@@ -0,0 +1,72 @@
+"""
+Per-branch inventory summary shown on the dashboard.
+
+The summary for every branch is computed in a single grouped query and kept
+in the cache until stock (or the branch list) changes; see store.signals.
+"""
+
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, DecimalField, F, Q, Sum, Value
+from django.db.models.functions import Coalesce
+
+from accounts.models import Branch
+
+SUMMARY_CACHE_KEY = "store:branch_inventory_summary"
+
+
+def branch_inventory_summary():
+    """Return one dict per branch with stock counts, units, value and low stock."""
+    summary = cache.get(SUMMARY_CACHE_KEY)
+    if summary is None:
+        summary = _compute_summary()
+        cache.set(SUMMARY_CACHE_KEY, summary, settings.INVENTORY_SUMMARY_CACHE_TIMEOUT)
+    return summary
+
+
+def invalidate_summary():
+    cache.delete(SUMMARY_CACHE_KEY)
+
+
+def _compute_summary():
+    money = DecimalField(max_digits=18, decimal_places=2)
+    rows = (
+        Branch.objects.order_by("id")
+        .annotate(
+            total_stock_items=Count("stock_items"),
+            total_units=Coalesce(Sum("stock_items__quantity"), 0),
+            total_stock_value=Coalesce(
+                Sum(
+                    F("stock_items__unit_value") * F("stock_items__quantity"),
+                    output_field=money,
+                ),
+                Value(Decimal("0.00")),
+                output_field=money,
+            ),
+            low_stock_items=Count(
+                "stock_items",
+                filter=Q(stock_items__quantity__lte=settings.LOW_STOCK_THRESHOLD),
+            ),
+        )
+        .values(
+            "id",
+            "name",
+            "total_stock_items",
+            "total_units",
+            "total_stock_value",
+            "low_stock_items",
+        )
+    )
+    return [
+        {
+            "branch_id": row["id"],
+            "branch_name": row["name"],
+            "total_stock_items": row["total_stock_items"],
+            "total_units": row["total_units"],
+            "total_stock_value": row["total_stock_value"],
+            "low_stock_items": row["low_stock_items"],
+        }
+        for row in rows
+    ]
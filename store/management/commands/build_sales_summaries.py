@@ -0,0 +1,40 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from store import performance
+
+
+class Command(BaseCommand):
+    help = (
+        "Build the daily item and marketer sales summaries for closed days. "
+        "Run nightly; without options it only adds the days since the last build."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--since",
+            help="Rebuild days from this date (YYYY-MM-DD), "
+            "e.g. after editing old sales",
+        )
+        parser.add_argument(
+            "--full", action="store_true", help="Rebuild the whole history"
+        )
+
+    def handle(self, *args, **options):
+        if options["full"]:
+            since = None
+        elif options["since"]:
+            try:
+                since = datetime.strptime(options["since"], "%Y-%m-%d").date()
+            except ValueError:
+                raise CommandError("--since must be a date in YYYY-MM-DD format")
+        else:
+            # The last built day again, then every closed day after it
+            since = performance.built_through()
+        items, marketers = performance.build(since)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Built {items} item-day and {marketers} marketer-day rows."
+            )
+        )
@@ -0,0 +1,25 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from store import rollups
+
+
+class Command(BaseCommand):
+    help = "Recompute the DailyBranchSales rollup from the sales records"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--since",
+            help="Only rebuild days from this date (YYYY-MM-DD); default is all days",
+        )
+
+    def handle(self, *args, **options):
+        since = None
+        if options["since"]:
+            try:
+                since = datetime.strptime(options["since"], "%Y-%m-%d").date()
+            except ValueError:
+                raise CommandError("--since must be a date in YYYY-MM-DD format")
+        count = rollups.rebuild(since)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} branch-day rows."))
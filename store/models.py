@@ -44,6 +44,15 @@ class SalesRecord(models.Model):
 
     class Meta:
         ordering = ["-sale_date"]
+        indexes = [
+            models.Index(fields=["branch", "sale_date"], name="sales_branch_date_idx"),
+            # Only sales with credit still owed, for the debtor aging report
+            models.Index(
+                fields=["branch", "sale_date"],
+                condition=models.Q(credit_owed__gt=0),
+                name="sales_outstanding_credit_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"Sale to {self.customer_name} at {self.branch.name} on {self.sale_date.strftime('%Y-%m-%d')}"
@@ -81,3 +90,93 @@ class SalesItem(models.Model):
     @property
     def subtotal(self):
         return self.quantity_sold * self.price_at_sale
+
+
+class DailyBranchSales(models.Model):
+    """
+    Sales totals per branch and (local) day, kept current by store.rollups
+    whenever a sale is created or edited.
+    """
+
+    branch = models.ForeignKey(
+        Branch, on_delete=models.CASCADE, related_name="daily_sales"
+    )
+    day = models.DateField()
+    record_count = models.PositiveIntegerField(default=0)
+    cash = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    credit = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    items_sold = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["-day", "branch"]
+        verbose_name_plural = "Daily branch sales"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["branch", "day"], name="daily_branch_sales_unique"
+            )
+        ]
+        indexes = [models.Index(fields=["day"], name="daily_branch_sales_day_idx")]
+
+    def __str__(self):
+        return f"{self.branch.name} sales on {self.day}"
+
+
+class DailyItemSales(models.Model):
+    """
+    Units and revenue per stock item and (local) day, built nightly by
+    ``manage.py build_sales_summaries`` for the top sellers report.
+    """
+
+    branch = models.ForeignKey(
+        Branch, on_delete=models.CASCADE, related_name="daily_item_sales"
+    )
+    day = models.DateField()
+    stock_item = models.ForeignKey(
+        Stock, on_delete=models.CASCADE, null=True, blank=True
+    )
+    quantity = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        ordering = ["-day", "branch"]
+        verbose_name_plural = "Daily item sales"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["branch", "day", "stock_item"], name="daily_item_sales_unique"
+            )
+        ]
+        indexes = [models.Index(fields=["day"], name="daily_item_sales_day_idx")]
+
+    def __str__(self):
+        return f"{self.stock_item} sales on {self.day}"
+
+
+class DailyMarketerSales(models.Model):
+    """
+    Sales and revenue per marketer, branch and (local) day, built nightly
+    alongside DailyItemSales.
+    """
+
+    branch = models.ForeignKey(
+        Branch, on_delete=models.CASCADE, related_name="daily_marketer_sales"
+    )
+    day = models.DateField()
+    marketer = models.CharField(max_length=200, blank=True)  # Trimmed, "" if none
+    record_count = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        ordering = ["-day", "branch", "marketer"]
+        verbose_name_plural = "Daily marketer sales"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["branch", "day", "marketer"],
+                name="daily_marketer_sales_unique",
+            )
+        ]
+        indexes = [models.Index(fields=["day"], name="daily_marketer_sales_day_idx")]
+
+    def __str__(self):
+        return f"{self.marketer or 'Unspecified'} at {self.branch.name} on {self.day}"
@@ -0,0 +1,194 @@
+"""
+Top-selling stock items and marketer revenue.
+
+``manage.py build_sales_summaries``, run nightly, condenses each closed day
+into ``DailyItemSales`` and ``DailyMarketerSales`` rows with one grouped
+query per table. :func:`sales_performance` reads those rows for the days
+they cover and groups the raw sales live only for the days after the last
+build, normally just today. Editing or deleting a sale in the admin rebuilds
+its day with :func:`refresh_days` if that day is already built.
+"""
+
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, DecimalField, F, Max, Sum, Value
+from django.db.models.functions import Coalesce, TruncDate, Trim
+from django.utils import timezone
+
+from .models import DailyItemSales, DailyMarketerSales, SalesItem, SalesRecord
+from .rollups import day_bounds
+
+TOP_SELLERS_LIMIT = 20
+UNSPECIFIED = "Unspecified"
+CENTS = Decimal("0.01")
+
+_money = DecimalField(max_digits=14, decimal_places=2)
+_item_revenue = Sum(F("quantity_sold") * F("price_at_sale"), output_field=_money)
+_marketer = Trim(Coalesce("marketer", Value("")))
+
+
+def built_through():
+    """The last day the summary tables cover, or None before the first build."""
+    return DailyMarketerSales.objects.aggregate(day=Max("day"))["day"]
+
+
+def build(since=None, through=None):
+    """
+    Rebuild the summary rows for ``since``..``through`` (dates, inclusive).
+    ``through`` defaults to yesterday, ``since`` to the whole history.
+    Returns the number of item and marketer rows written.
+    """
+    through = through or timezone.localdate() - timedelta(days=1)
+    _, end = day_bounds(through)
+    records = SalesRecord.objects.filter(sale_date__lt=end)
+    items = SalesItem.objects.filter(sales_record__sale_date__lt=end)
+    existing_items = DailyItemSales.objects.filter(day__lte=through)
+    existing_marketers = DailyMarketerSales.objects.filter(day__lte=through)
+    if since is not None:
+        start, _ = day_bounds(since)
+        records = records.filter(sale_date__gte=start)
+        items = items.filter(sales_record__sale_date__gte=start)
+        existing_items = existing_items.filter(day__gte=since)
+        existing_marketers = existing_marketers.filter(day__gte=since)
+
+    item_rows = [
+        DailyItemSales(
+            branch_id=row["sales_record__branch_id"],
+            day=row["day"],
+            stock_item_id=row["stock_item_id"],
+            quantity=row["quantity"] or 0,
+            revenue=row["revenue"] or 0,
+        )
+        for row in items.annotate(day=TruncDate("sales_record__sale_date"))
+        .values("sales_record__branch_id", "day", "stock_item_id")
+        .annotate(quantity=Sum("quantity_sold"), revenue=_item_revenue)
+        .order_by()
+    ]
+    marketer_rows = [
+        DailyMarketerSales(
+            branch_id=row["branch_id"],
+            day=row["day"],
+            marketer=row["seller"],
+            record_count=row["record_count"],
+            revenue=row["revenue"] or 0,
+        )
+        for row in records.annotate(day=TruncDate("sale_date"), seller=_marketer)
+        .values("branch_id", "day", "seller")
+        .annotate(record_count=Count("id"), revenue=Sum("total_amount"))
+        .order_by()
+    ]
+
+    with transaction.atomic():
+        existing_items.delete()
+        existing_marketers.delete()
+        DailyItemSales.objects.bulk_create(item_rows, batch_size=1000)
+        DailyMarketerSales.objects.bulk_create(marketer_rows, batch_size=1000)
+    return len(item_rows), len(marketer_rows)
+
+
+def refresh_days(days):
+    """Rebuild the summaries of those ``days`` (dates) that have been built."""
+    last_built = built_through()
+    if last_built is None:
+        return
+    # Later days are counted live, and building one would skip the days between
+    for day in sorted(day for day in set(days) if day <= last_built):
+        build(day, day)
+
+
+def _merge(merged, rows, key_fields, sum_fields):
+    for row in rows:
+        key = tuple(row[field] for field in key_fields)
+        current = merged.get(key)
+        if current is None:
+            merged[key] = row
+        else:
+            for field in sum_fields:
+                current[field] += row[field]
+
+
+def sales_performance(branch_ids, from_date, to_date, limit=TOP_SELLERS_LIMIT):
+    """
+    Top ``limit`` stock items by revenue and every marketer's revenue for the
+    given branches over the local dates ``from_date``..``to_date`` (inclusive).
+    """
+    last_built = built_through()
+    live_from = from_date
+    items = {}
+    marketers = {}
+
+    if last_built is not None and from_date <= last_built:
+        summary_to = min(to_date, last_built)
+        live_from = summary_to + timedelta(days=1)
+        summary = {
+            "branch_id__in": branch_ids,
+            "day__gte": from_date,
+            "day__lte": summary_to,
+        }
+        _merge(
+            items,
+            DailyItemSales.objects.filter(**summary)
+            .values("branch_id", "stock_item_id", name=F("stock_item__name"))
+            .annotate(quantity=Sum("quantity"), revenue=Sum("revenue"))
+            .order_by(),
+            ("branch_id", "stock_item_id"),
+            ("quantity", "revenue"),
+        )
+        _merge(
+            marketers,
+            DailyMarketerSales.objects.filter(**summary)
+            .values("branch_id", seller=F("marketer"))
+            .annotate(record_count=Sum("record_count"), revenue=Sum("revenue"))
+            .order_by(),
+            ("branch_id", "seller"),
+            ("record_count", "revenue"),
+        )
+
+    if live_from <= to_date:
+        start, _ = day_bounds(live_from)
+        _, end = day_bounds(to_date)
+        _merge(
+            items,
+            SalesItem.objects.filter(
+                sales_record__branch_id__in=branch_ids,
+                sales_record__sale_date__gte=start,
+                sales_record__sale_date__lt=end,
+            )
+            .values(
+                "stock_item_id",
+                branch_id=F("sales_record__branch_id"),
+                name=F("stock_item__name"),
+            )
+            .annotate(quantity=Sum("quantity_sold"), revenue=_item_revenue)
+            .order_by(),
+            ("branch_id", "stock_item_id"),
+            ("quantity", "revenue"),
+        )
+        _merge(
+            marketers,
+            SalesRecord.objects.filter(
+                branch_id__in=branch_ids, sale_date__gte=start, sale_date__lt=end
+            )
+            .values("branch_id", seller=_marketer)
+            .annotate(record_count=Count("id"), revenue=Sum("total_amount"))
+            .order_by(),
+            ("branch_id", "seller"),
+            ("record_count", "revenue"),
+        )
+
+    top_items = sorted(items.values(), key=lambda row: row["revenue"], reverse=True)
+    marketer_list = sorted(
+        marketers.values(), key=lambda row: row["revenue"], reverse=True
+    )
+    for row in top_items[:limit]:
+        row["revenue"] = row["revenue"].quantize(CENTS)
+    for row in marketer_list:
+        row["revenue"] = row["revenue"].quantize(CENTS)
+        row["marketer"] = row.pop("seller") or UNSPECIFIED
+    return {
+        "items": top_items[:limit],
+        "marketers": marketer_list,
+        "built_through": last_built,
+    }
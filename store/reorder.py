@@ -0,0 +1,200 @@
+"""
+Stock velocity and reorder suggestions for the whole catalog.
+
+The last ``REORDER_LOOKBACK_DAYS`` of sales are read in one query and the
+catalog in another, both straight into pandas; everything after that is
+vectorized over all branches and items at once:
+
+* velocity: units sold per day over the item's window (the lookback, or
+  the days since the stock row was added or first sold if that is shorter);
+* safety stock: ``SERVICE_LEVEL_Z`` standard deviations of daily demand over
+  the lead time;
+* reorder point: demand over ``REORDER_LEAD_TIME_DAYS`` plus safety stock;
+* days of cover: units in stock divided by velocity;
+* suggested order: enough to reach ``REORDER_COVER_DAYS`` of demand after
+  the lead time, for items at or below their reorder point.
+
+The result is cached for ``REORDER_CACHE_TIMEOUT`` seconds for the
+dashboard and the low stock list; it is not invalidated on every sale, so
+quantities can lag by up to that long.
+"""
+
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import CharField
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+from .models import SalesItem, Stock
+
+CACHE_KEY = "store:reorder_plan"
+SERVICE_LEVEL_Z = 1.65  # About a 95% chance of not running out in the lead time
+SECONDS_PER_DAY = 86400
+
+
+def reorder_plan():
+    plan = cache.get(CACHE_KEY)
+    if plan is None:
+        plan = compute_reorder_plan()
+        cache.set(CACHE_KEY, plan, settings.REORDER_CACHE_TIMEOUT)
+    return plan
+
+
+def invalidate_reorder_plan():
+    cache.delete(CACHE_KEY)
+
+
+def _frame(queryset, columns):
+    """
+    Run a values_list() queryset and load its raw rows into a DataFrame.
+
+    Skipping the per-row converters for UUIDs and datetimes (the latter are
+    selected as text for that reason) is most of the cost saved; pandas
+    parses those columns in bulk instead.
+    """
+    sql, params = queryset.query.sql_with_params()
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(sql, params)
+        return pd.DataFrame(cursor.fetchall(), columns=columns)
+
+
+def _load(now, lookback):
+    history = _frame(
+        SalesItem.objects.filter(
+            sales_record__sale_date__gte=now - timedelta(days=lookback),
+            stock_item__isnull=False,
+        ).values_list(
+            "stock_item_id",
+            "quantity_sold",
+            Cast("sales_record__sale_date", CharField()),
+        ),
+        ["stock_id", "units", "sold_at"],
+    )
+    catalog = _frame(
+        Stock.objects.order_by().values_list(
+            "id",
+            "branch_id",
+            "name",
+            "quantity",
+            "unit_value",
+            Cast("added_on", CharField()),
+        ),
+        ["stock_id", "branch_id", "name", "quantity", "unit_value", "added_on"],
+    )
+    return history, catalog
+
+
+def compute_reorder_plan(now=None):
+    """
+    Return ``{"computed_at", "branches": {branch_id: {...}}, "items": [...]}``
+    where ``items`` holds every item to reorder, fewest days of cover first.
+    """
+    now = now or timezone.now()
+    lookback = settings.REORDER_LOOKBACK_DAYS
+    lead_time = settings.REORDER_LEAD_TIME_DAYS
+    history, catalog = _load(now, lookback)
+    now = pd.Timestamp(now)
+
+    # Units per item and day (0 = the last 24 hours), then the sums of daily
+    # units and of their squares per item for the mean and variance
+    if len(history):
+        sold_at = pd.to_datetime(history["sold_at"], utc=True, format="ISO8601")
+        history["day"] = ((now - sold_at).dt.total_seconds() // SECONDS_PER_DAY).astype(
+            "int64"
+        )
+        daily = history.groupby(["stock_id", "day"])["units"].sum()
+        squared = daily.astype("float64") ** 2
+        per_item = pd.DataFrame(
+            {
+                "sold": daily.groupby(level="stock_id").sum(),
+                "sold_sq": squared.groupby(level="stock_id").sum(),
+                "oldest_day": daily.index.get_level_values("day")
+                .to_series(index=daily.index.get_level_values("stock_id"))
+                .groupby(level=0)
+                .max(),
+            }
+        )
+    else:
+        per_item = pd.DataFrame(
+            columns=["sold", "sold_sq", "oldest_day"], dtype="float64"
+        )
+    catalog = catalog.join(per_item, on="stock_id")
+
+    sold = catalog["sold"].fillna(0).to_numpy(dtype="float64")
+    sold_sq = catalog["sold_sq"].fillna(0).to_numpy(dtype="float64")
+    quantity = catalog["quantity"].to_numpy(dtype="float64").clip(min=0)
+    unit_value = (
+        pd.to_numeric(catalog["unit_value"], errors="coerce")
+        .fillna(0)
+        .to_numpy(dtype="float64")
+    )
+    # Stock rows re-created by imports can be younger than their first sale
+    age = (
+        now - pd.to_datetime(catalog["added_on"], utc=True, format="ISO8601")
+    ).dt.total_seconds()
+    window = np.clip(
+        np.maximum(
+            np.ceil(age.to_numpy() / SECONDS_PER_DAY),
+            catalog["oldest_day"].fillna(0).to_numpy(dtype="float64") + 1,
+        ),
+        1,
+        lookback,
+    )
+
+    velocity = sold / window
+    variance = np.maximum(sold_sq / window - velocity**2, 0)
+    safety_stock = SERVICE_LEVEL_Z * np.sqrt(variance * lead_time)
+    reorder_point = velocity * lead_time + safety_stock
+    with np.errstate(divide="ignore", invalid="ignore"):
+        days_of_cover = np.where(velocity > 0, quantity / velocity, np.inf)
+    needs_reorder = (velocity > 0) & (quantity <= reorder_point)
+    target = velocity * (lead_time + settings.REORDER_COVER_DAYS) + safety_stock
+    suggested = np.where(needs_reorder, np.ceil(np.maximum(target - quantity, 0)), 0)
+
+    catalog = catalog.assign(
+        velocity=velocity.round(2),
+        days_of_cover=days_of_cover.round(1),
+        reorder_point=np.ceil(reorder_point),
+        suggested=suggested,
+        reorder_cost=(suggested * unit_value).round(2),
+        needs_reorder=needs_reorder,
+    )
+    to_reorder = catalog[needs_reorder].sort_values(
+        ["days_of_cover", "velocity"], ascending=[True, False]
+    )
+    branches = (
+        to_reorder.groupby("branch_id")
+        .agg(reorder_items=("stock_id", "size"), reorder_cost=("reorder_cost", "sum"))
+        .round(2)
+    )
+
+    items = [
+        {
+            "stock_id": row.stock_id,
+            "branch_id": row.branch_id,
+            "name": row.name,
+            "quantity": int(row.quantity),
+            "velocity": float(row.velocity),
+            "days_of_cover": float(row.days_of_cover),
+            "reorder_point": int(row.reorder_point),
+            "suggested": int(row.suggested),
+            "reorder_cost": float(row.reorder_cost),
+        }
+        for row in to_reorder.itertuples(index=False)
+    ]
+    return {
+        "computed_at": now.to_pydatetime(),
+        "branches": {
+            int(branch_id): {
+                "reorder_items": int(row.reorder_items),
+                "reorder_cost": float(row.reorder_cost),
+            }
+            for branch_id, row in branches.iterrows()
+        },
+        "items": items,
+    }
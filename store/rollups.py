@@ -0,0 +1,197 @@
+"""
+Daily per-branch sales rollup.
+
+``DailyBranchSales`` holds one row per branch and local day with the number
+of sales, cash, credit, total and items sold. Every code path that creates
+or edits a sale calls :func:`refresh_day` (or :func:`refresh_for_record`)
+in the same transaction, which locks that one row and recomputes it from the
+raw sales. store.signals refreshes the days of deleted sale lines, those
+of a deleted stock item once the delete commits. ``manage.py rebuild_daily_sales``
+recomputes them all. :func:`branch_totals`
+answers range queries from the rollup for past days and from raw rows only
+for today.
+"""
+
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import DailyBranchSales, SalesItem, SalesRecord
+
+ZERO = Decimal("0.00")
+ROLLUP_FIELDS = ["record_count", "cash", "credit", "total", "items_sold"]
+
+
+def day_bounds(day):
+    """Aware start of ``day`` and of the next day, in the current time zone."""
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    return start, start + timedelta(days=1)
+
+
+def _record_totals(records):
+    return records.aggregate(
+        record_count=Count("id"),
+        cash=Sum("amount_paid_cash"),
+        credit=Sum("credit_owed"),
+        total=Sum("total_amount"),
+    )
+
+
+def sale_days(records):
+    """The (branch id, local day) pairs a queryset of sales falls on."""
+    return set(
+        records.annotate(day=TruncDate("sale_date"))
+        .values_list("branch_id", "day")
+        .order_by()
+        .distinct()
+    )
+
+
+def _lock_row(branch_id, day):
+    rows = DailyBranchSales.objects.select_for_update().filter(
+        branch_id=branch_id, day=day
+    )
+    rollup = rows.first()
+    if rollup is None:
+        # Concurrent inserts of the same day wait on each other here
+        DailyBranchSales.objects.bulk_create(
+            [DailyBranchSales(branch_id=branch_id, day=day)], ignore_conflicts=True
+        )
+        rollup = rows.get()
+    return rollup
+
+
+def refresh_day(branch_id, day):
+    """
+    Recompute the rollup row of one branch and day from its sales.
+
+    The row is locked (created first if need be) before the sales are summed:
+    on databases with row locks, concurrent refreshes of one day then run in
+    turn and the last one counts every committed sale. SQLite has one writer
+    at a time anyway.
+    """
+    start, end = day_bounds(day)
+    records = SalesRecord.objects.filter(
+        branch_id=branch_id, sale_date__gte=start, sale_date__lt=end
+    )
+    with transaction.atomic(savepoint=False):
+        rollup = _lock_row(branch_id, day)
+        totals = _record_totals(records)
+        if not totals["record_count"]:
+            rollup.delete()
+            return
+        items_sold = SalesItem.objects.filter(sales_record__in=records).aggregate(
+            items_sold=Sum("quantity_sold")
+        )["items_sold"]
+        rollup.record_count = totals["record_count"]
+        rollup.cash = totals["cash"] or ZERO
+        rollup.credit = totals["credit"] or ZERO
+        rollup.total = totals["total"] or ZERO
+        rollup.items_sold = items_sold or 0
+        rollup.save(update_fields=[*ROLLUP_FIELDS, "updated_at"])
+
+
+def refresh_for_record(record, previous_branch_id=None):
+    """Refresh the day of ``record``, and its old branch's day if it moved."""
+    day = timezone.localdate(record.sale_date)
+    refresh_day(record.branch_id, day)
+    if previous_branch_id and previous_branch_id != record.branch_id:
+        refresh_day(previous_branch_id, day)
+
+
+def rebuild(since=None):
+    """Recompute every rollup row (from ``since``, a date, if given)."""
+    records = SalesRecord.objects.all()
+    items = SalesItem.objects.all()
+    existing = DailyBranchSales.objects.all()
+    if since is not None:
+        start, _ = day_bounds(since)
+        records = records.filter(sale_date__gte=start)
+        items = items.filter(sales_record__sale_date__gte=start)
+        existing = existing.filter(day__gte=since)
+
+    rows = {}
+    for row in (
+        records.annotate(day=TruncDate("sale_date"))
+        .values("branch_id", "day")
+        .annotate(
+            record_count=Count("id"),
+            cash=Sum("amount_paid_cash"),
+            credit=Sum("credit_owed"),
+            total=Sum("total_amount"),
+        )
+        .order_by()
+    ):
+        rows[row["branch_id"], row["day"]] = DailyBranchSales(
+            branch_id=row["branch_id"],
+            day=row["day"],
+            record_count=row["record_count"],
+            cash=row["cash"] or ZERO,
+            credit=row["credit"] or ZERO,
+            total=row["total"] or ZERO,
+        )
+    for row in (
+        items.annotate(day=TruncDate("sales_record__sale_date"))
+        .values("sales_record__branch_id", "day")
+        .annotate(items_sold=Sum("quantity_sold"))
+        .order_by()
+    ):
+        rollup = rows.get((row["sales_record__branch_id"], row["day"]))
+        if rollup is not None:
+            rollup.items_sold = row["items_sold"] or 0
+
+    with transaction.atomic():
+        existing.delete()
+        DailyBranchSales.objects.bulk_create(rows.values(), batch_size=1000)
+    return len(rows)
+
+
+def branch_totals(from_date=None, to_date=None):
+    """
+    Totals per branch id for the local dates ``from_date``..``to_date``
+    (inclusive, either open-ended): past days from the rollup, today from
+    the sales themselves.
+    """
+    today = timezone.localdate()
+    totals = {}
+
+    rollup = DailyBranchSales.objects.filter(day__lt=today)
+    if from_date:
+        rollup = rollup.filter(day__gte=from_date)
+    if to_date:
+        rollup = rollup.filter(day__lte=to_date)
+    for row in (
+        rollup.values("branch_id")
+        .annotate(
+            record_count=Sum("record_count"),
+            cash=Sum("cash"),
+            credit=Sum("credit"),
+            total=Sum("total"),
+        )
+        .order_by()
+    ):
+        totals[row["branch_id"]] = row
+
+    if (from_date is None or from_date <= today) and (
+        to_date is None or to_date >= today
+    ):
+        start, end = day_bounds(today)
+        for row in (
+            SalesRecord.objects.filter(sale_date__gte=start, sale_date__lt=end)
+            .values("branch_id")
+            .annotate(
+                record_count=Count("id"),
+                cash=Sum("amount_paid_cash"),
+                credit=Sum("credit_owed"),
+                total=Sum("total_amount"),
+            )
+            .order_by()
+        ):
+            branch_total = totals.setdefault(row["branch_id"], {})
+            for field in ("record_count", "cash", "credit", "total"):
+                branch_total[field] = (branch_total.get(field) or 0) + (row[field] or 0)
+    return totals
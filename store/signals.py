@@ -0,0 +1,66 @@
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import post_save, post_delete, pre_delete
+from django.dispatch import receiver
+from accounts.models import Branch
+from user_activity import metrics
+from . import rollups
+from .models import SalesItem, SalesRecord, Stock
+from .debtors import invalidate_debtor_aging
+from .inventory import invalidate_summary
+
+
+@receiver(post_save, sender=Stock)
+@receiver(post_delete, sender=Stock)
+@receiver(post_save, sender=Branch)
+@receiver(post_delete, sender=Branch)
+def invalidate_inventory_summary(sender, instance, **kwargs):
+    invalidate_summary()
+
+
+@receiver(post_save, sender=SalesRecord)
+def count_sales_record(sender, instance, created, **kwargs):
+    if created and not kwargs.get("raw"):
+        metrics.inc("portal_sales_records_created_total", branch=instance.branch.name)
+
+
+@receiver(post_save, sender=SalesRecord)
+@receiver(post_delete, sender=SalesRecord)
+def invalidate_branch_debtors(sender, instance, **kwargs):
+    invalidate_debtor_aging(instance.branch_id)
+
+
+@receiver(pre_delete, sender=Stock)
+def note_stock_sale_days(sender, instance, **kwargs):
+    # Deleting a stock item cascades to its sale lines
+    instance._sale_days = rollups.sale_days(
+        SalesRecord.objects.filter(items__stock_item=instance)
+    )
+
+
+@receiver(post_delete, sender=Stock)
+def refresh_stock_sale_days(sender, instance, using, **kwargs):
+    days = getattr(instance, "_sale_days", None)
+    if not days:
+        return
+
+    def refresh():
+        for branch_id, day in days:
+            rollups.refresh_day(branch_id, day)
+
+    # The stock row can go before its sale lines, so wait for the whole delete
+    transaction.on_commit(refresh, using=using)
+
+
+@receiver(post_delete, sender=SalesItem)
+def refresh_sales_item_day(sender, instance, origin=None, **kwargs):
+    # Deletes of a stock item or a sale refresh their days once, not per line
+    if not (
+        isinstance(origin, SalesItem)
+        or isinstance(origin, QuerySet)
+        and origin.model is SalesItem
+    ):
+        return
+    record = SalesRecord.objects.filter(pk=instance.sales_record_id).first()
+    if record is not None:
+        rollups.refresh_for_record(record)
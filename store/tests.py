@@ -1,3 +1,499 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import Branch
+from home.testing import QueryBudgetTestCase
+from store import debtors, performance, reorder, rollups
+from store.models import (
+    DailyBranchSales,
+    DailyItemSales,
+    DailyMarketerSales,
+    SalesItem,
+    SalesRecord,
+    Stock,
+)
+
+
+class StoreQueryBudgetTests(QueryBudgetTestCase):
+    def setUp(self):
+        super().setUp()
+        self.login("admin")
+        self.branch = self.data.branches[0]
+        self.stock_item = self.data.stock[0]
+        self.sale = self.data.sales[0]
+
+    def test_stock_list(self):
+        self.assertBudget(reverse("store:stock_list"), 10)
+
+    def test_stock_list_filtered(self):
+        self.assertBudget(
+            reverse("store:stock_list") + f"?branch={self.branch.pk}&q=oil&page=2", 10
+        )
+
+    def test_stock_detail(self):
+        self.assertBudget(
+            reverse("store:stock_detail", args=[self.stock_item.pk]),
+            9,
+            label="GET /stock/<pk>/",
+        )
+
+    def test_low_stock_list(self):
+        self.assertBudget(reverse("store:low_stock_list"), 10)
+
+    def test_low_stock_list_filtered(self):
+        self.assertBudget(
+            reverse("store:low_stock_list") + f"?branch={self.branch.pk}&page=2", 10
+        )
+
+    def test_reorder_plan(self):
+        plan = reorder.compute_reorder_plan()
+        self.assertTrue(plan["items"])
+        for item in plan["items"]:
+            self.assertGreater(item["velocity"], 0)
+            self.assertLessEqual(item["quantity"], item["reorder_point"])
+            self.assertGreater(item["suggested"], 0)
+        self.assertEqual(
+            sum(branch["reorder_items"] for branch in plan["branches"].values()),
+            len(plan["items"]),
+        )
+
+        # Items that have not sold are never suggested, however low they are
+        planned = {str(item["stock_id"]).replace("-", "") for item in plan["items"]}
+        unsold = Stock.objects.filter(quantity=0, salesitem__isnull=True)
+        self.assertTrue(unsold.exists())
+        self.assertFalse(planned & {stock.pk.hex for stock in unsold})
+
+    def test_add_stock_form(self):
+        self.assertBudget(reverse("store:add_stock"), 8)
+
+    def test_add_stock(self):
+        self.assertBudget(
+            reverse("store:add_stock"),
+            10,
+            method="post",
+            data={
+                "name": "New filter",
+                "quantity": 12,
+                "unit_value": "1500.00",
+                "branch": self.branch.pk,
+            },
+            status=302,
+        )
+
+    def test_central_add_stock_form(self):
+        self.assertBudget(reverse("store:central_add_stock"), 9)
+
+    def test_central_edit_stock_form(self):
+        self.assertBudget(
+            reverse("store:central_edit_stock", args=[self.stock_item.name]),
+            13,
+            label="GET /stock/central/edit/<name>/",
+        )
+
+    def test_stock_export_preview(self):
+        self.assertBudget(
+            reverse("store:stock_export")
+            + "?fields_to_export=name&fields_to_export=branch",
+            9,
+            label="GET /stock/export/ (preview)",
+        )
+
+    def test_stock_export_download(self):
+        self.assertBudget(
+            reverse("store:stock_export")
+            + "?export=1&fields_to_export=name&fields_to_export=quantity"
+            + "&fields_to_export=branch",
+            8,
+            max_ms=3000,
+            label="GET /stock/export/ (download)",
+        )
+
+    def test_sales_dashboard(self):
+        self.assertBudget(reverse("store:sales_dashboard"), 9)
+
+    def test_sales_dashboard_date_range(self):
+        self.assertBudget(
+            reverse("store:sales_dashboard")
+            + "?from_date=2020-01-01&to_date=2099-12-31",
+            9,
+        )
+
+    def test_sales_list(self):
+        self.assertBudget(reverse("store:sales_list_by_branch"), 10)
+
+    def test_sales_list_for_branch(self):
+        self.assertBudget(
+            reverse("store:sales_list_by_branch_filter", args=[self.branch.pk])
+            + "?category=credit",
+            11,
+        )
+
+    def test_sales_list_as_sales_staff(self):
+        self.login("sales")
+        self.assertBudget(
+            reverse("store:sales_list_by_branch"),
+            9,
+            label="GET /sales/list/ (sales staff)",
+        )
+
+    def test_sales_record_detail(self):
+        self.assertBudget(
+            reverse("store:sales_record_detail", args=[self.sale.pk]),
+            9,
+            label="GET /sales/<pk>/",
+        )
+
+    def test_mark_sales_record_paid(self):
+        self.assertBudget(
+            reverse("store:sales_record_detail", args=[self.sale.pk]),
+            13,
+            method="post",
+            data={
+                "amount_paid_cash": self.sale.total_amount,
+                "credit_owed": "0",
+                "mark_as_paid": "1",
+            },
+            status=302,
+            label="POST /sales/<pk>/ (mark as paid)",
+        )
+
+    def test_debtor_aging(self):
+        self.assertBudget(reverse("store:debtor_aging"), 9)
+
+    def test_debtor_aging_for_branch(self):
+        self.assertBudget(
+            reverse("store:debtor_aging") + f"?branch={self.branch.pk}", 9
+        )
+
+    def test_debtor_aging_as_sales_staff(self):
+        self.login("sales")
+        self.assertBudget(
+            reverse("store:debtor_aging"), 8, label="GET /sales/debtors/ (sales staff)"
+        )
+
+    def test_debtor_aging_refreshed_by_payment(self):
+        record = next(sale for sale in self.data.sales if sale.credit_owed > 0)
+        url = reverse("store:debtor_aging") + f"?branch={record.branch_id}"
+
+        def owed(response):
+            report = response.context["branch_reports"][0]
+            return report["totals"]["balance"]
+
+        before = owed(self.client.get(url))
+        self.client.post(
+            reverse("store:sales_record_detail", args=[record.pk]),
+            {
+                "amount_paid_cash": record.total_amount,
+                "credit_owed": "0",
+                "mark_as_paid": "1",
+            },
+        )
+        self.assertEqual(owed(self.client.get(url)), before - record.credit_owed)
+
+    def test_cash_up(self):
+        self.assertBudget(reverse("store:cash_up"), 9)
+
+    def test_cash_up_for_branch_and_day(self):
+        day = timezone.localdate(self.sale.sale_date)
+        response = self.assertBudget(
+            reverse("store:cash_up") + f"?branch={self.sale.branch_id}&date={day}",
+            9,
+            label="GET /sales/cash-up/?branch=<pk>&date=<day>",
+        )
+        banks = [row["bank"] for row in response.context["report"]["banks"]]
+        self.assertEqual(len(banks), len(set(banks)))
+        self.assertNotIn("GTBank", banks)
+
+    def test_cash_up_csv(self):
+        day = timezone.localdate(self.sale.sale_date)
+        response = self.assertBudget(
+            reverse("store:cash_up")
+            + f"?branch={self.sale.branch_id}&date={day}&export=csv",
+            9,
+            label="GET /sales/cash-up/ (csv)",
+        )
+        self.assertEqual(response["Content-Type"], "text/csv")
+        self.assertTrue(response.content.decode().startswith("Bank,Marketer,"))
+
+    def test_cash_up_as_sales_staff(self):
+        self.login("sales")
+        self.assertBudget(
+            reverse("store:cash_up"), 8, label="GET /sales/cash-up/ (sales staff)"
+        )
+
+    def test_sales_performance(self):
+        self.assertBudget(reverse("store:sales_performance"), 13)
+
+    def test_sales_performance_for_branch(self):
+        self.assertBudget(
+            reverse("store:sales_performance")
+            + f"?branch={self.branch.pk}&from_date=2020-01-01&to_date=2099-12-31",
+            13,
+            label="GET /sales/performance/?branch=<pk>&from_date=...",
+        )
+
+    def test_sales_performance_as_sales_staff(self):
+        self.login("sales")
+        self.assertBudget(
+            reverse("store:sales_performance"),
+            12,
+            label="GET /sales/performance/ (sales staff)",
+        )
+
+    def test_sales_performance_summaries_match_live(self):
+        branch_ids = [branch.pk for branch in self.data.branches]
+        to_date = timezone.localdate()
+        from_date = to_date - timedelta(days=120)
+        summarised = performance.sales_performance(branch_ids, from_date, to_date)
+        self.assertIsNotNone(summarised["built_through"])
+
+        DailyItemSales.objects.all().delete()
+        DailyMarketerSales.objects.all().delete()
+        live = performance.sales_performance(branch_ids, from_date, to_date)
+        self.assertEqual(summarised["items"], live["items"])
+        self.assertEqual(summarised["marketers"], live["marketers"])
+
+    def test_create_sales_record_form(self):
+        self.login("sales")
+        self.assertBudget(reverse("store:create_sales_record"), 9)
+
+    def test_create_sales_record(self):
+        self.login("sales")
+        item = next(
+            stock
+            for stock in self.data.stock
+            if stock.branch_id == self.branch.pk and stock.quantity >= 10
+        )
+        self.assertBudget(
+            reverse("store:create_sales_record"),
+            17,
+            method="post",
+            data={
+                "customer_name": "Walk-in",
+                "customer_contact": "0801",
+                "marketer": "Ada",
+                "amount_paid_cash": "3000.00",
+                "credit_owed": "0",
+                "bank_paid": "GTBank",
+                "items-TOTAL_FORMS": "1",
+                "items-INITIAL_FORMS": "0",
+                "items-MIN_NUM_FORMS": "0",
+                "items-MAX_NUM_FORMS": "1000",
+                "items-0-stock_item": item.pk,
+                "items-0-quantity_sold": "2",
+                "items-0-price_at_sale": "1500.00",
+            },
+            status=302,
+        )
+
+    def test_sales_export_preview(self):
+        self.assertBudget(
+            reverse("store:sales_export")
+            + "?fields_to_export=customer_name&fields_to_export=branch"
+            + "&fields_to_export=stock_item_name&fields_to_export=quantity_sold",
+            10,
+            label="GET /sales/export/ (preview)",
+        )
+
+    def test_sales_export_download(self):
+        self.assertBudget(
+            reverse("store:sales_export")
+            + "?export=1&fields_to_export=customer_name&fields_to_export=branch"
+            + "&fields_to_export=stock_item_name&fields_to_export=quantity_sold",
+            9,
+            max_ms=3000,
+            label="GET /sales/export/ (download)",
+        )
+
+
+class DebtorAgingTests(TestCase):
+    def test_bucket_edges(self):
+        branch = Branch.objects.create(name="AGING")
+        now = timezone.now()
+        expected = {
+            30: "current",
+            31: "days_31_60",
+            60: "days_31_60",
+            61: "days_61_90",
+            90: "days_61_90",
+            91: "over_90",
+        }
+        for days in expected:
+            record = SalesRecord.objects.create(
+                branch=branch,
+                customer_name=f"Aged {days}",
+                credit_owed=100,
+                total_amount=100,
+            )
+            # sale_date is auto_now_add, so backdated afterwards
+            SalesRecord.objects.filter(pk=record.pk).update(
+                sale_date=now - timedelta(days=days)
+            )
+
+        with mock.patch("store.debtors.timezone.now", return_value=now):
+            report = debtors.debtor_aging([branch.pk])[branch.pk]
+
+        self.assertEqual(
+            {
+                row["customer_name"]: [
+                    name for name, *_ in debtors.BUCKETS if row[name]
+                ]
+                for row in report["debtors"]
+            },
+            {f"Aged {days}": [bucket] for days, bucket in expected.items()},
+        )
+        self.assertEqual(
+            sorted(row["days_outstanding"] for row in report["debtors"]),
+            sorted(expected),
+        )
+
+
+class DailyBranchSalesTests(QueryBudgetTestCase):
+    def assertRollupMatchesSales(self):
+        expected = {
+            (row.pop("branch_id"), row.pop("day")): {**row, "items_sold": 0}
+            for row in SalesRecord.objects.annotate(day=TruncDate("sale_date"))
+            .values("branch_id", "day")
+            .annotate(
+                record_count=Count("id"),
+                cash=Sum("amount_paid_cash"),
+                credit=Sum("credit_owed"),
+                total=Sum("total_amount"),
+            )
+            .order_by()
+        }
+        for row in (
+            SalesItem.objects.annotate(day=TruncDate("sales_record__sale_date"))
+            .values("sales_record__branch_id", "day")
+            .annotate(items_sold=Sum("quantity_sold"))
+            .order_by()
+        ):
+            expected[row["sales_record__branch_id"], row["day"]]["items_sold"] = row[
+                "items_sold"
+            ]
+        rollup = {
+            (row.pop("branch_id"), row.pop("day")): row
+            for row in DailyBranchSales.objects.values(
+                "branch_id",
+                "day",
+                "record_count",
+                "cash",
+                "credit",
+                "total",
+                "items_sold",
+            )
+        }
+        self.assertEqual(rollup, expected)
+
+    def test_rollup_follows_sales(self):
+        self.assertRollupMatchesSales()
+        branch = self.data.branches[0]
+        item = next(
+            stock
+            for stock in self.data.stock
+            if stock.branch_id == branch.pk and stock.quantity >= 10
+        )
+
+        self.login("sales")
+        self.client.post(
+            reverse("store:create_sales_record"),
+            {
+                "customer_name": "Rollup Customer",
+                "customer_contact": "0801",
+                "marketer": "Ada",
+                "amount_paid_cash": "3000.00",
+                "credit_owed": "0",
+                "bank_paid": "GTBank",
+                "items-TOTAL_FORMS": "1",
+                "items-INITIAL_FORMS": "0",
+                "items-MIN_NUM_FORMS": "0",
+                "items-MAX_NUM_FORMS": "1000",
+                "items-0-stock_item": item.pk,
+                "items-0-quantity_sold": "2",
+                "items-0-price_at_sale": "1500.00",
+            },
+        )
+        record = SalesRecord.objects.get(customer_name="Rollup Customer")
+        self.assertRollupMatchesSales()
+
+        self.client.post(
+            reverse("store:sales_record_detail", args=[record.pk]),
+            {"amount_paid_cash": "1000.00", "credit_owed": "2000.00"},
+        )
+        record.refresh_from_db()
+        self.assertEqual(record.credit_owed, 2000)
+        self.assertRollupMatchesSales()
+
+        # Sale lines removed on their own or with their stock item
+        SalesItem.objects.exclude(sales_record=record).first().delete()
+        self.assertRollupMatchesSales()
+        stock = (
+            Stock.objects.filter(salesitem__isnull=False).exclude(pk=item.pk).first()
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            stock.delete()
+        self.assertRollupMatchesSales()
+
+        self.login("admin")
+        self.client.post(
+            reverse("admin:store_salesrecord_delete", args=[record.pk]), {"post": "yes"}
+        )
+        self.assertFalse(SalesRecord.objects.filter(pk=record.pk).exists())
+        self.assertRollupMatchesSales()
+
+
+class SalesSummaryAdminTests(QueryBudgetTestCase):
+    def test_summaries_are_read_only(self):
+        self.login("admin")
+        for model in ("dailyitemsales", "dailymarketersales"):
+            with self.subTest(model=model):
+                changelist = self.client.get(reverse(f"admin:store_{model}_changelist"))
+                self.assertEqual(changelist.status_code, 200)
+                self.assertEqual(
+                    self.client.get(reverse(f"admin:store_{model}_add")).status_code,
+                    403,
+                )
+
+    def test_admin_delete_rebuilds_the_day(self):
+        built = performance.built_through()
+        record = next(
+            sale
+            for sale in self.data.sales
+            if timezone.localdate(sale.sale_date) <= built and sale.total_amount
+        )
+        day = timezone.localdate(record.sale_date)
+        start, end = rollups.day_bounds(day)
+
+        def summarised():
+            return (
+                DailyMarketerSales.objects.filter(day=day).aggregate(
+                    records=Sum("record_count"), revenue=Sum("revenue")
+                ),
+                DailyItemSales.objects.filter(day=day).aggregate(units=Sum("quantity")),
+            )
+
+        def live():
+            return (
+                SalesRecord.objects.filter(
+                    sale_date__gte=start, sale_date__lt=end
+                ).aggregate(records=Count("id"), revenue=Sum("total_amount")),
+                SalesItem.objects.filter(
+                    sales_record__sale_date__gte=start, sales_record__sale_date__lt=end
+                ).aggregate(units=Sum("quantity_sold")),
+            )
+
+        self.assertEqual(summarised(), live())
+        self.login("admin")
+        self.client.post(
+            reverse("admin:store_salesrecord_delete", args=[record.pk]), {"post": "yes"}
+        )
 
-# Create your tests here.
+        self.assertFalse(SalesRecord.objects.filter(pk=record.pk).exists())
+        self.assertEqual(summarised(), live())
+        self.assertEqual(performance.built_through(), built)
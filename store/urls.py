@@ -7,6 +7,7 @@ urlpatterns = [
     path("stock/add/", views.add_stock, name="add_stock"),
     path("stock/", views.stock_list, name="stock_list"),
     path("stock/export/", views.StockExportView.as_view(), name="stock_export"),
+    path("stock/low/", views.low_stock_list, name="low_stock_list"),
     path("stock/<str:pk>/", views.stock_detail, name="stock_detail"),
     path("sales/", views.sales_dashboard, name="sales_dashboard"),
     path("sales/list/", views.sales_list_by_branch, name="sales_list_by_branch"),
@@ -15,13 +16,20 @@ urlpatterns = [
         views.sales_list_by_branch,
         name="sales_list_by_branch_filter",
     ),
+    path("sales/debtors/", views.debtor_aging_report, name="debtor_aging"),
+    path("sales/cash-up/", views.cash_up_report, name="cash_up"),
+    path(
+        "sales/performance/",
+        views.sales_performance_report,
+        name="sales_performance",
+    ),
     path("sales/create/", views.create_sales_record, name="create_sales_record"),
+    path("sales/export/", views.SalesExportView.as_view(), name="sales_export"),
     path(
         "sales/<str:pk>/",
         views.SalesRecordDetailView.as_view(),
         name="sales_record_detail",
     ),
-    path("sales/export/", views.SalesExportView.as_view(), name="sales_export"),
     path("stock/central/add/", views.central_add_stock_view, name="central_add_stock"),
     path(
         "stock/central/edit/<str:stock_name>/",
@@ -1,6 +1,11 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
+from . import performance, rollups
+from .cashup import cash_up
+from .debtors import BUCKETS, debtor_aging
+from .reorder import reorder_plan
 from .models import Stock, SalesRecord, SalesItem
 from .forms import (
     StockForm,
@@ -11,17 +16,52 @@ from .forms import (
 )  # Import CentralStockForm and SaleRecordUpdateForm
 from .export_forms import StockExportForm, SalesExportForm
 from accounts.models import Branch
-from django.db.models import Q, Sum
+from django.db.models import Prefetch, Q
 from django.contrib import messages
 from django.http import HttpResponse, JsonResponse
+from contextlib import nullcontext
 from datetime import datetime, timedelta
 from django.utils import timezone
 from openpyxl import Workbook
 from openpyxl.styles import Font, Border, Side, Alignment
+from django.utils.decorators import method_decorator
 from django.views import View
+from django.core.paginator import Paginator
+from home.pagination import CachedCountPaginator
+from lsm_portal.db import retry_on_locked
+from lsm_portal.routers import reports_database
 from django.urls import reverse_lazy
 from django.contrib.auth.mixins import AccessMixin
 from decimal import Decimal  # Import Decimal for precise calculations
+from user_activity import metrics
+import csv
+import time
+
+
+# Export pages preview at most this many rows, server-paged
+EXPORT_PREVIEW_LIMIT = 500
+EXPORT_PREVIEW_PAGE_SIZE = 25
+
+
+def build_export_preview(queryset, fields_to_export, page_number):
+    """
+    Page through a capped values() projection of the selected export columns.
+
+    Foreign keys are shown by name. Returns the page object and the rows of the
+    current page as lists of cell values; ``page_obj.paginator.count`` is the
+    number of rows previewed, which is at most EXPORT_PREVIEW_LIMIT.
+    """
+    model = queryset.model
+    columns = []
+    for field_name in fields_to_export:
+        field = model._meta.get_field(field_name)
+        columns.append(f"{field_name}__name" if field.is_relation else field_name)
+
+    preview = queryset.values(*columns)[:EXPORT_PREVIEW_LIMIT]
+    paginator = Paginator(preview, EXPORT_PREVIEW_PAGE_SIZE)
+    page_obj = paginator.get_page(page_number)
+    rows = [[row[column] for column in columns] for row in page_obj]
+    return page_obj, rows
 
 
 @login_required
@@ -71,7 +111,7 @@ def central_add_stock_view(request, stock_name=None):
 
             # Pre-populate branch quantities
             for stock_item in existing_stock_items:
-                field_name = f"quantity_branch_{stock_item.branch.id}"
+                field_name = f"quantity_branch_{stock_item.branch_id}"
                 initial_data[field_name] = stock_item.quantity
         else:
             messages.warning(
@@ -141,7 +181,7 @@ def stock_detail(request, pk):
 
 @login_required
 def stock_list(request):
-    stock_items = Stock.objects.all()
+    stock_items = Stock.objects.select_related("branch")
     branch_filter = request.GET.get("branch")
     query = request.GET.get("q")
 
@@ -155,9 +195,7 @@ def stock_list(request):
     # Show all branches to everyone for filtering purposes
     branches = Branch.objects.all()
 
-    from django.core.paginator import Paginator
-
-    paginator = Paginator(stock_items, 50)  # Show 50 stock items per page
+    paginator = CachedCountPaginator(stock_items, 50)  # Show 50 stock items per page
     page_number = request.GET.get("page")
     page_obj = paginator.get_page(page_number)
 
@@ -170,20 +208,43 @@ def stock_list(request):
 
 
 @login_required
+def low_stock_list(request):
+    plan = reorder_plan()
+    branch_filter = request.GET.get("branch")
+    items = plan["items"]
+    if branch_filter:
+        items = [item for item in items if str(item["branch_id"]) == branch_filter]
+
+    # Show all branches to everyone for filtering purposes, as on the stock list
+    branches = list(Branch.objects.all())
+    branch_names = {branch.pk: branch.name for branch in branches}
+
+    paginator = Paginator(items, 50)
+    page_obj = paginator.get_page(request.GET.get("page"))
+    for item in page_obj:
+        item["branch_name"] = branch_names.get(item["branch_id"], "")
+
+    context = {
+        "page_obj": page_obj,
+        "branches": branches,
+        "selected_branch": branch_filter,
+        "computed_at": plan["computed_at"],
+        "lead_time_days": settings.REORDER_LEAD_TIME_DAYS,
+        "cover_days": settings.REORDER_COVER_DAYS,
+    }
+    return render(request, "store/low_stock_list.html", context)
+
+
+@login_required
+@reports_database()
 def sales_dashboard(request):
     from_date_str = request.GET.get("from_date")
     to_date_str = request.GET.get("to_date")
-
-    sales_records_queryset = SalesRecord.objects.all()
+    from_date = to_date = None
 
     if from_date_str:
         try:
-            from_date = timezone.make_aware(
-                datetime.strptime(from_date_str, "%Y-%m-%d")
-            )
-            sales_records_queryset = sales_records_queryset.filter(
-                sale_date__gte=from_date
-            )
+            from_date = datetime.strptime(from_date_str, "%Y-%m-%d").date()
         except ValueError:
             messages.error(
                 request, "Invalid 'from date' format. Please use YYYY-MM-DD."
@@ -191,45 +252,26 @@ def sales_dashboard(request):
 
     if to_date_str:
         try:
-            to_date = (
-                timezone.make_aware(datetime.strptime(to_date_str, "%Y-%m-%d"))
-                + timedelta(days=1)
-                - timedelta(microseconds=1)
-            )
-            sales_records_queryset = sales_records_queryset.filter(
-                sale_date__lte=to_date
-            )
+            to_date = datetime.strptime(to_date_str, "%Y-%m-%d").date()
         except ValueError:
             messages.error(request, "Invalid 'to date' format. Please use YYYY-MM-DD.")
 
     if request.user.access_level in ["admin", "manager"]:
         # Admin and Manager see an overview of all branches
         branches = Branch.objects.all()
+        # Past days come from the daily rollup, only today from raw sales
+        totals_by_branch = rollups.branch_totals(from_date, to_date)
         branch_sales_summary = []
 
         for branch in branches:
-            branch_sales_qs = sales_records_queryset.filter(branch=branch)
-            total_sales_records = branch_sales_qs.count()
-            total_cash_sales = (
-                branch_sales_qs.aggregate(Sum("amount_paid_cash"))[
-                    "amount_paid_cash__sum"
-                ]
-                or 0
-            )
-            total_credit_sales = (
-                branch_sales_qs.aggregate(Sum("credit_owed"))["credit_owed__sum"] or 0
-            )
-            total_overall_sales = (
-                branch_sales_qs.aggregate(Sum("total_amount"))["total_amount__sum"] or 0
-            )
-
+            totals = totals_by_branch.get(branch.pk, {})
             branch_sales_summary.append(
                 {
                     "branch": branch,
-                    "total_sales_records": total_sales_records,
-                    "total_cash_sales": total_cash_sales,
-                    "total_credit_sales": total_credit_sales,
-                    "total_overall_sales": total_overall_sales,
+                    "total_sales_records": totals.get("record_count") or 0,
+                    "total_cash_sales": totals.get("cash") or 0,
+                    "total_credit_sales": totals.get("credit") or 0,
+                    "total_overall_sales": totals.get("total") or 0,
                 }
             )
         context = {
@@ -246,7 +288,7 @@ def sales_dashboard(request):
 
 @login_required
 def sales_list_by_branch(request, branch_pk=None):
-    sales_records_queryset = SalesRecord.objects.all()
+    sales_records_queryset = SalesRecord.objects.select_related("branch")
     branch = None
 
     if request.user.access_level in ["admin", "manager"]:
@@ -274,9 +316,8 @@ def sales_list_by_branch(request, branch_pk=None):
 
     sales_records = sales_records_queryset.order_by("-sale_date")
 
-    from django.core.paginator import Paginator
-
-    paginator = Paginator(sales_records, 20)  # Show 20 sales records per page
+    # Show 20 sales records per page
+    paginator = CachedCountPaginator(sales_records, 20)
     page_number = request.GET.get("page")
     page_obj = paginator.get_page(page_number)
 
@@ -295,6 +336,186 @@ def sales_list_by_branch(request, branch_pk=None):
     return render(request, "store/sales_list.html", context)
 
 
+@login_required
+def debtor_aging_report(request):
+    # Read from the primary: a stale snapshot would be cached right after the
+    # payment that invalidated it
+    is_admin_or_manager = request.user.access_level in ["admin", "manager"]
+    selected_branch = None
+    if is_admin_or_manager:
+        all_branches = list(Branch.objects.order_by("name"))
+        branches = all_branches
+        selected_branch = request.GET.get("branch")
+        if selected_branch:
+            branches = [b for b in all_branches if str(b.pk) == selected_branch]
+    else:
+        if not request.user.branch:
+            messages.error(request, "You are not assigned to any branch.")
+            return redirect("home:dashboard")
+        all_branches = []
+        branches = [request.user.branch]
+
+    reports = debtor_aging([branch.pk for branch in branches])
+    branch_reports = []
+    grand_totals = dict.fromkeys(["balance", *(name for name, *_ in BUCKETS)], 0)
+    for branch in branches:
+        report = reports[branch.pk]
+        totals = dict.fromkeys(grand_totals, 0)
+        for debtor in report["debtors"]:
+            for key in totals:
+                totals[key] += debtor[key]
+        for key in grand_totals:
+            grand_totals[key] += totals[key]
+        branch_reports.append(
+            {
+                "branch": branch,
+                "as_of": report["as_of"],
+                "debtors": report["debtors"],
+                "totals": totals,
+            }
+        )
+
+    context = {
+        "branch_reports": branch_reports,
+        "grand_totals": grand_totals,
+        "buckets": [(name, label) for name, label, *_ in BUCKETS],
+        "is_admin_or_manager": is_admin_or_manager,
+        "branches": all_branches,  # For the branch filter dropdown
+        "selected_branch": selected_branch,
+    }
+    return render(request, "store/debtor_aging.html", context)
+
+
+@login_required
+def cash_up_report(request):
+    is_admin_or_manager = request.user.access_level in ["admin", "manager"]
+    branches = []
+    if is_admin_or_manager:
+        branches = list(Branch.objects.order_by("name"))
+        branch = next(
+            (b for b in branches if str(b.pk) == request.GET.get("branch")),
+            request.user.branch or (branches[0] if branches else None),
+        )
+    else:
+        branch = request.user.branch
+    if branch is None:
+        messages.error(request, "You are not assigned to any branch.")
+        return redirect("home:dashboard")
+
+    today = timezone.localdate()
+    day = today
+    if request.GET.get("date"):
+        try:
+            day = datetime.strptime(request.GET["date"], "%Y-%m-%d").date()
+        except ValueError:
+            messages.error(request, "Invalid date format. Please use YYYY-MM-DD.")
+
+    # Closed days can come from the reports database; today must be current
+    with reports_database() if day < today else nullcontext():
+        report = cash_up(branch.pk, day)
+
+    if request.GET.get("export") == "csv":
+        response = HttpResponse(content_type="text/csv")
+        response["Content-Disposition"] = (
+            f'attachment; filename="cash_up_{branch.name}_{day.isoformat()}.csv"'
+        )
+        writer = csv.writer(response)
+        writer.writerow(
+            [
+                "Bank",
+                "Marketer",
+                "Sales",
+                "Cash Sales",
+                "Credit Sales",
+                "Cash Received",
+                "Credit Owed",
+                "Total",
+            ]
+        )
+        for row in report["rows"]:
+            writer.writerow(
+                [
+                    row["bank"],
+                    row["marketer"],
+                    row["sales"],
+                    row["cash_sales"],
+                    row["credit_sales"],
+                    row["cash"],
+                    row["credit"],
+                    row["total"],
+                ]
+            )
+        totals = report["totals"]
+        writer.writerow(
+            [
+                "Total",
+                "",
+                totals["sales"],
+                totals["cash_sales"],
+                totals["credit_sales"],
+                totals["cash"],
+                totals["credit"],
+                totals["total"],
+            ]
+        )
+        return response
+
+    context = {
+        "report": report,
+        "branch": branch,
+        "branches": branches,  # For the branch selector
+        "day": day,
+        "is_admin_or_manager": is_admin_or_manager,
+    }
+    return render(request, "store/cash_up.html", context)
+
+
+@login_required
+@reports_database()
+def sales_performance_report(request):
+    is_admin_or_manager = request.user.access_level in ["admin", "manager"]
+    selected_branch = None
+    if is_admin_or_manager:
+        all_branches = list(Branch.objects.order_by("name"))
+        branches = all_branches
+        selected_branch = request.GET.get("branch")
+        if selected_branch:
+            branches = [b for b in all_branches if str(b.pk) == selected_branch]
+    else:
+        if not request.user.branch:
+            messages.error(request, "You are not assigned to any branch.")
+            return redirect("home:dashboard")
+        all_branches = []
+        branches = [request.user.branch]
+
+    to_date = timezone.localdate()
+    from_date = to_date - timedelta(days=29)
+    try:
+        if request.GET.get("from_date"):
+            from_date = datetime.strptime(request.GET["from_date"], "%Y-%m-%d").date()
+        if request.GET.get("to_date"):
+            to_date = datetime.strptime(request.GET["to_date"], "%Y-%m-%d").date()
+    except ValueError:
+        messages.error(request, "Invalid date format. Please use YYYY-MM-DD.")
+
+    report = performance.sales_performance(
+        [branch.pk for branch in branches], from_date, to_date
+    )
+    branch_names = {branch.pk: branch.name for branch in branches}
+    for row in report["items"] + report["marketers"]:
+        row["branch_name"] = branch_names[row["branch_id"]]
+
+    context = {
+        "report": report,
+        "from_date": from_date,
+        "to_date": to_date,
+        "is_admin_or_manager": is_admin_or_manager,
+        "branches": all_branches,  # For the branch filter dropdown
+        "selected_branch": selected_branch,
+    }
+    return render(request, "store/sales_performance.html", context)
+
+
 class SalesRecordDetailView(LoginRequiredMixin, AccessMixin, View):
     template_name = "store/sales_record_detail.html"
 
@@ -303,8 +524,19 @@ class SalesRecordDetailView(LoginRequiredMixin, AccessMixin, View):
             return self.handle_no_permission()
         return super().dispatch(request, *args, **kwargs)
 
+    def get_sales_record(self, pk):
+        # The template lists every item with its stock name
+        return get_object_or_404(
+            SalesRecord.objects.select_related("branch").prefetch_related(
+                Prefetch(
+                    "items", queryset=SalesItem.objects.select_related("stock_item")
+                )
+            ),
+            pk=pk,
+        )
+
     def get(self, request, pk):
-        sales_record = get_object_or_404(SalesRecord, pk=pk)
+        sales_record = self.get_sales_record(pk)
         form = SaleRecordUpdateForm(instance=sales_record)
         context = {
             "sales_record": sales_record,
@@ -314,7 +546,7 @@ class SalesRecordDetailView(LoginRequiredMixin, AccessMixin, View):
         return render(request, self.template_name, context)
 
     def post(self, request, pk):
-        sales_record = get_object_or_404(SalesRecord, pk=pk)
+        sales_record = self.get_sales_record(pk)
 
         # Access control for editing
         if request.user.access_level not in ["admin", "manager", "sales"]:
@@ -354,7 +586,7 @@ class SalesRecordDetailView(LoginRequiredMixin, AccessMixin, View):
                 )
                 messages.success(request, "Sales record updated successfully.")
 
-            sales_record.save()
+            update_sales_record(sales_record)
             return redirect("store:sales_record_detail", pk=pk)
         else:
             messages.error(request, "Please correct the errors below.")
@@ -367,6 +599,37 @@ class SalesRecordDetailView(LoginRequiredMixin, AccessMixin, View):
         return render(request, self.template_name, context)
 
 
+@retry_on_locked(name="create_sales_record")
+def save_sales_record(form, formset, branch):
+    """Save a new sale with its items and stock deductions in one transaction."""
+    sales_record = form.save(commit=False)
+    sales_record.pk = None  # A retried attempt inserts afresh
+    sales_record.branch = branch
+    sales_record.save()
+
+    total_amount = 0
+    for item_form in formset:
+        if item_form.cleaned_data and not item_form.cleaned_data.get("DELETE"):
+            sales_item = item_form.save(commit=False)
+            sales_item.pk = None
+            sales_item.sales_record = sales_record
+            # Deduct from the quantity as it is now, under the write lock
+            sales_item.stock_item.refresh_from_db(fields=["quantity"])
+            sales_item.save()
+            total_amount += sales_item.price_at_sale * sales_item.quantity_sold
+
+    sales_record.total_amount = total_amount
+    sales_record.save()
+    rollups.refresh_for_record(sales_record)
+    return sales_record
+
+
+@retry_on_locked(name="update_sales_record")
+def update_sales_record(sales_record):
+    sales_record.save()
+    rollups.refresh_for_record(sales_record)
+
+
 @login_required
 def create_sales_record(request):
     # Only sales staff can create sales records
@@ -382,43 +645,23 @@ def create_sales_record(request):
             form_kwargs={"branch": request.user.branch},
         )
         if form.is_valid() and formset.is_valid():
-            sales_record = form.save(commit=False)
-            sales_record.branch = request.user.branch
-            sales_record.save()
-
-            total_amount = 0
-            for item_form in formset:
-                if item_form.cleaned_data and not item_form.cleaned_data.get("DELETE"):
-                    try:
-                        sales_item = item_form.save(commit=False)
-                        sales_item.sales_record = sales_record
-                        sales_item.save()
-                        total_amount += (
-                            sales_item.price_at_sale * sales_item.quantity_sold
-                        )
-                    except ValueError as e:
-                        messages.error(request, f"Error processing sale: {e}")
-                        # If there's a stock error, delete the sales record and return
-                        sales_record.delete()
-                        return render(
-                            request,
-                            "store/create_sales_record.html",
-                            {"form": form, "formset": formset},
-                        )
-                    except Exception as e:
-                        messages.error(
-                            request,
-                            f"Error processing sale for item: {e}",
-                        )
-                        sales_record.delete()
-                        return render(
-                            request,
-                            "store/create_sales_record.html",
-                            {"form": form, "formset": formset},
-                        )
-
-            sales_record.total_amount = total_amount
-            sales_record.save()
+            try:
+                save_sales_record(form, formset, request.user.branch)
+            except ValueError as e:
+                # Nothing was saved: the whole sale is one transaction
+                messages.error(request, f"Error processing sale: {e}")
+                return render(
+                    request,
+                    "store/create_sales_record.html",
+                    {"form": form, "formset": formset},
+                )
+            except Exception as e:
+                messages.error(request, f"Error processing sale for item: {e}")
+                return render(
+                    request,
+                    "store/create_sales_record.html",
+                    {"form": form, "formset": formset},
+                )
 
             messages.success(request, "Sales record created successfully.")
             return redirect("store:sales_dashboard")
@@ -438,6 +681,7 @@ def create_sales_record(request):
     return render(request, "store/create_sales_record.html", context)
 
 
+@method_decorator(reports_database(), name="get")
 class StockExportView(LoginRequiredMixin, UserPassesTestMixin, View):
     raise_exception = True  # Raise 403 if test_func returns False
 
@@ -446,7 +690,7 @@ class StockExportView(LoginRequiredMixin, UserPassesTestMixin, View):
 
     def get(self, request):
         form = StockExportForm(request.GET)
-        stock_items = Stock.objects.all()
+        stock_items = Stock.objects.select_related("branch")
 
         if form.is_valid():
             start_date = form.cleaned_data.get("start_date")
@@ -459,6 +703,7 @@ class StockExportView(LoginRequiredMixin, UserPassesTestMixin, View):
                 stock_items = stock_items.filter(added_on__lte=end_date)
 
             if "export" in request.GET:
+                started = time.perf_counter()
                 response = HttpResponse(
                     content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
                 )
@@ -492,7 +737,9 @@ class StockExportView(LoginRequiredMixin, UserPassesTestMixin, View):
                     worksheet.cell(row=1, column=col).alignment = center_aligned_text
 
                 # Write data
-                for item in stock_items:
+                for row, item in enumerate(
+                    stock_items.iterator(chunk_size=settings.EXPORT_CHUNK_SIZE), start=2
+                ):
                     row_data = []
                     for field_name in fields_to_export:
                         value = getattr(item, field_name)
@@ -509,27 +756,37 @@ class StockExportView(LoginRequiredMixin, UserPassesTestMixin, View):
                             row_data.append(value)
                     worksheet.append(row_data)
                     for col in range(1, len(row_data) + 1):
-                        worksheet.cell(row=worksheet.max_row, column=col).border = (
-                            thin_border
-                        )
+                        worksheet.cell(row=row, column=col).border = thin_border
 
                 workbook.save(response)
+                metrics.observe(
+                    "portal_job_duration_seconds",
+                    time.perf_counter() - started,
+                    job="stock_export",
+                )
                 return response
 
-        # Prepare headers for template preview
+        # Prepare headers and a bounded, paged sample for the template preview
         template_headers = []
+        preview_page = preview_rows = None
         if form.is_valid() and fields_to_export:
             for field_name in fields_to_export:
                 template_headers.append(Stock._meta.get_field(field_name).verbose_name)
+            preview_page, preview_rows = build_export_preview(
+                stock_items, fields_to_export, request.GET.get("page")
+            )
 
         context = {
             "form": form,
-            "stock_items": stock_items,
             "template_headers": template_headers,
+            "preview_page": preview_page,
+            "preview_rows": preview_rows,
+            "preview_limit": EXPORT_PREVIEW_LIMIT,
         }
         return render(request, "store/stock_export.html", context)
 
 
+@method_decorator(reports_database(), name="get")
 class SalesExportView(LoginRequiredMixin, UserPassesTestMixin, View):
     raise_exception = True  # Raise 403 if test_func returns False
 
@@ -538,7 +795,7 @@ class SalesExportView(LoginRequiredMixin, UserPassesTestMixin, View):
 
     def get(self, request):
         form = SalesExportForm(request.GET)
-        sales_records = SalesRecord.objects.all()
+        sales_records = SalesRecord.objects.select_related("branch")
 
         if form.is_valid():
             start_date = form.cleaned_data.get("start_date")
@@ -551,6 +808,7 @@ class SalesExportView(LoginRequiredMixin, UserPassesTestMixin, View):
                 sales_records = sales_records.filter(sale_date__lte=end_date)
 
             if "export" in request.GET:
+                started = time.perf_counter()
                 response = HttpResponse(
                     content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
                 )
@@ -591,12 +849,20 @@ class SalesExportView(LoginRequiredMixin, UserPassesTestMixin, View):
                     worksheet.cell(row=1, column=col).border = thin_border
                     worksheet.cell(row=1, column=col).alignment = center_aligned_text
 
-                # Write data
-                for record in sales_records:
+                # Write data, loading every record's items in one query
+                sales_records = sales_records.prefetch_related(
+                    Prefetch(
+                        "items", queryset=SalesItem.objects.select_related("stock_item")
+                    )
+                )
+                for row, record in enumerate(
+                    sales_records.iterator(chunk_size=settings.EXPORT_CHUNK_SIZE),
+                    start=2,
+                ):
                     row_data = []
                     for field_name in fields_to_export:
                         if field_name == "stock_item_name":
-                            sales_items = SalesItem.objects.filter(sales_record=record)
+                            sales_items = record.items.all()
                             stock_names = ", ".join(
                                 [
                                     f"{item.stock_item.name} (x{item.quantity_sold})"
@@ -605,7 +871,7 @@ class SalesExportView(LoginRequiredMixin, UserPassesTestMixin, View):
                             )
                             row_data.append(stock_names)
                         elif field_name == "quantity_sold":
-                            sales_items = SalesItem.objects.filter(sales_record=record)
+                            sales_items = record.items.all()
                             total_quantity_sold = sum(
                                 [item.quantity_sold for item in sales_items]
                             )
@@ -627,15 +893,19 @@ class SalesExportView(LoginRequiredMixin, UserPassesTestMixin, View):
                                 row_data.append(value)
                     worksheet.append(row_data)
                     for col in range(1, len(row_data) + 1):
-                        worksheet.cell(row=worksheet.max_row, column=col).border = (
-                            thin_border
-                        )
+                        worksheet.cell(row=row, column=col).border = thin_border
 
                 workbook.save(response)
+                metrics.observe(
+                    "portal_job_duration_seconds",
+                    time.perf_counter() - started,
+                    job="sales_export",
+                )
                 return response
 
-        # Prepare headers for template preview
+        # Prepare headers and a bounded, paged sample for the template preview
         template_headers = []
+        preview_page = preview_rows = None
         if form.is_valid() and fields_to_export:
             for field_name in fields_to_export:
                 if field_name == "stock_item_name":
@@ -647,9 +917,37 @@ class SalesExportView(LoginRequiredMixin, UserPassesTestMixin, View):
                         SalesRecord._meta.get_field(field_name).verbose_name
                     )
 
+            # Item columns come from SalesItem: project the record columns plus
+            # the id, then fill the item columns for the current page only.
+            item_fields = {"stock_item_name", "quantity_sold"}
+            record_fields = ["id"] + [
+                f for f in fields_to_export if f not in item_fields and f != "id"
+            ]
+            preview_page, record_rows = build_export_preview(
+                sales_records, record_fields, request.GET.get("page")
+            )
+            items_by_record = {}
+            for item in SalesItem.objects.filter(
+                sales_record_id__in=[row[0] for row in record_rows]
+            ).values("sales_record_id", "stock_item__name", "quantity_sold"):
+                items_by_record.setdefault(item["sales_record_id"], []).append(item)
+
+            preview_rows = []
+            for row in record_rows:
+                values = dict(zip(record_fields, row))
+                items = items_by_record.get(values["id"], [])
+                values["stock_item_name"] = ", ".join(
+                    f"{item['stock_item__name']} (x{item['quantity_sold']})"
+                    for item in items
+                )
+                values["quantity_sold"] = sum(item["quantity_sold"] for item in items)
+                preview_rows.append([values[f] for f in fields_to_export])
+
         context = {
             "form": form,
-            "sales_records": sales_records,
             "template_headers": template_headers,
+            "preview_page": preview_page,
+            "preview_rows": preview_rows,
+            "preview_limit": EXPORT_PREVIEW_LIMIT,
         }
         return render(request, "store/sales_export.html", context)
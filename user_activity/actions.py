@@ -0,0 +1,53 @@
+"""
+Action codes for activity logs.
+
+An action is the namespaced URL name a request resolved to (for example
+``home:vehicle_detail``), which is short, stable across URL changes and can
+be filtered on exactly.
+"""
+
+from functools import lru_cache
+
+from django.urls import URLPattern, URLResolver, get_resolver
+
+# Namespaces whose pages are never logged by UserActivityMiddleware
+EXCLUDED_NAMESPACES = ("admin", "user_activity")
+# Set by backfill_activity_actions on old logs whose URL no longer resolves
+UNRESOLVED_ACTION = "unresolved"
+
+
+def resolve_action(request):
+    """Return ``(action, object_id)`` for a request that has been routed."""
+    match = getattr(request, "resolver_match", None)
+    if match is None or not match.url_name:
+        return "", ""
+    object_id = next(iter(match.kwargs.values()), "")
+    return match.view_name, str(object_id)[:64]
+
+
+def _collect(patterns, namespace=""):
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            child = namespace
+            if pattern.namespace:
+                child = f"{namespace}{pattern.namespace}:"
+            yield from _collect(pattern.url_patterns, child)
+        elif isinstance(pattern, URLPattern) and pattern.name:
+            yield f"{namespace}{pattern.name}"
+
+
+def action_label(action):
+    namespace, _, name = action.rpartition(":")
+    label = name.replace("_", " ").capitalize()
+    return f"{namespace.title()} - {label}" if namespace else label
+
+
+@lru_cache(maxsize=None)
+def action_choices():
+    """All loggable actions as ``(code, label)`` pairs, sorted by code."""
+    actions = {
+        action
+        for action in _collect(get_resolver().url_patterns)
+        if action.split(":", 1)[0] not in EXCLUDED_NAMESPACES
+    }
+    return [(action, action_label(action)) for action in sorted(actions)]
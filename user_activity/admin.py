@@ -3,10 +3,34 @@ from .models import UserActivityLog
 
 
 class UserActivityLogAdmin(admin.ModelAdmin):
-    list_display = ("user", "url", "method", "timestamp", "action_description")
-    list_filter = ("user", "method", "timestamp")
+    list_display = (
+        "user",
+        "branch",
+        "action",
+        "object_id",
+        "method",
+        "status_code",
+        "duration_ms",
+        "timestamp",
+        "action_description",
+    )
+    list_filter = ("branch", "method", "timestamp")
+    list_select_related = ("user", "branch")
     search_fields = ("user__email", "url", "action_description")
-    readonly_fields = ("user", "url", "method", "action_description", "timestamp")
+    readonly_fields = (
+        "user",
+        "branch",
+        "action",
+        "object_id",
+        "url",
+        "method",
+        "action_description",
+        "timestamp",
+        "duration_ms",
+        "status_code",
+        "query_count",
+        "response_size",
+    )
 
     def has_add_permission(self, request):
         return False
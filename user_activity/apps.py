@@ -1,6 +1,14 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.db.backends.signals import connection_created
 
 
 class UserActivityConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "user_activity"
+
+    def ready(self):
+        if settings.SLOW_QUERY_LOG_ENABLED:
+            from .slow_queries import install
+
+            connection_created.connect(install)
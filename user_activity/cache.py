@@ -0,0 +1,26 @@
+from django.core.cache.backends.filebased import FileBasedCache
+
+from . import metrics
+
+_MISSING = object()
+
+
+def key_prefix(key):
+    """Low-cardinality label for a cache key: its "app:" prefix."""
+    if key.startswith("django.contrib.sessions"):
+        return "sessions"
+    prefix, sep, _ = key.partition(":")
+    return prefix if sep else "other"
+
+
+class InstrumentedFileBasedCache(FileBasedCache):
+    """FileBasedCache that counts hits and misses of ``get`` in the portal metrics."""
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _MISSING, version)
+        metrics.inc(
+            "portal_cache_requests_total",
+            prefix=key_prefix(key),
+            result="miss" if value is _MISSING else "hit",
+        )
+        return default if value is _MISSING else value
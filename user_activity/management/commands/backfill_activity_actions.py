@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand
+from django.urls import Resolver404, resolve
+from user_activity.actions import UNRESOLVED_ACTION
+from user_activity.models import UserActivityLog
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill in action codes, object ids and branches for activity logs "
+        "written before they were recorded"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        logs = (
+            UserActivityLog.objects.filter(action="")
+            .select_related("user")
+            .only("id", "url", "user__branch_id")
+            .order_by("id")
+        )
+        updated = 0
+        batch = []
+        for log in logs.iterator(chunk_size=batch_size):
+            try:
+                match = resolve(log.url)
+            except Resolver404:
+                # Marked so later runs do not select the row again
+                log.action = UNRESOLVED_ACTION
+            else:
+                log.action = match.view_name
+                log.object_id = str(next(iter(match.kwargs.values()), ""))[:64]
+            # The user's current branch is the best available approximation
+            log.branch_id = log.user.branch_id if log.user else None
+            batch.append(log)
+            if len(batch) >= batch_size:
+                UserActivityLog.objects.bulk_update(
+                    batch, ["action", "object_id", "branch"]
+                )
+                updated += len(batch)
+                batch = []
+        if batch:
+            UserActivityLog.objects.bulk_update(
+                batch, ["action", "object_id", "branch"]
+            )
+            updated += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(f"Backfilled {updated} activity logs"))
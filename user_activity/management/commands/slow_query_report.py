@@ -0,0 +1,85 @@
+import json
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from user_activity.slow_queries import fingerprint
+
+
+class Command(BaseCommand):
+    help = "Summarize the slow query log by normalized SQL, worst total time first"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--limit", type=int, default=15, help="Number of fingerprints to show"
+        )
+        parser.add_argument(
+            "--path",
+            default=str(settings.SLOW_QUERY_LOG_PATH),
+            help="Log file to read; rotated backups (.1, .2, ...) are included",
+        )
+
+    def log_files(self, path):
+        path = Path(path)
+        backups = sorted(
+            path.parent.glob(f"{path.name}.*"),
+            key=lambda p: int(p.suffix[1:]) if p.suffix[1:].isdigit() else 0,
+            reverse=True,
+        )
+        return [p for p in backups + [path] if p.exists()]
+
+    def handle(self, *args, **options):
+        files = self.log_files(options["path"])
+        if not files:
+            self.stdout.write(
+                self.style.WARNING(f"No slow query log at {options['path']}")
+            )
+            return
+
+        groups = {}
+        for log_file in files:
+            with open(log_file, encoding="utf-8") as lines:
+                for line in lines:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    key = fingerprint(entry["sql"])
+                    group = groups.setdefault(
+                        key,
+                        {
+                            "durations": [],
+                            "sources": Counter(),
+                            "stack": entry["stack"],
+                        },
+                    )
+                    group["durations"].append(entry["duration_ms"])
+                    group["sources"][entry["source"]] += 1
+
+        ranked = sorted(
+            groups.items(), key=lambda item: sum(item[1]["durations"]), reverse=True
+        )
+        total = sum(len(group["durations"]) for group in groups.values())
+        self.stdout.write(
+            f"{total} slow queries, {len(groups)} distinct statements "
+            f"(threshold {settings.SLOW_QUERY_THRESHOLD_MS} ms)\n"
+        )
+        for rank, (sql, group) in enumerate(ranked[: options["limit"]], start=1):
+            durations = sorted(group["durations"])
+            self.stdout.write(
+                self.style.MIGRATE_HEADING(
+                    f"#{rank}  {len(durations)}x  total {sum(durations):.0f} ms  "
+                    f"avg {sum(durations) / len(durations):.1f} ms  "
+                    f"max {durations[-1]:.1f} ms"
+                )
+            )
+            self.stdout.write(f"  {sql[:300]}")
+            sources = ", ".join(
+                f"{source} ({count})"
+                for source, count in group["sources"].most_common(3)
+            )
+            self.stdout.write(f"  from: {sources}")
+            for frame in group["stack"][-3:]:
+                self.stdout.write(f"    {frame}")
+            self.stdout.write("")
@@ -0,0 +1,218 @@
+"""
+Process-safe Prometheus metrics for the portal.
+
+Each process (gunicorn worker, management command) buffers counter and
+histogram increments in memory and periodically adds them to a shared SQLite
+spool file, so the ``/metrics`` endpoint served by any worker reports totals
+for all of them. Values are stored already rendered as Prometheus samples:
+histogram buckets are cumulative and every sample is a monotonically
+increasing counter, which keeps flushing to a single upsert per sample.
+"""
+
+import atexit
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+# name -> (type, help)
+METRICS = {
+    "portal_http_requests_total": (
+        "counter",
+        "HTTP requests by URL name, method and status code.",
+    ),
+    "portal_http_request_duration_seconds": (
+        "histogram",
+        "HTTP request wall time by URL name.",
+    ),
+    "portal_db_queries_total": (
+        "counter",
+        "Database queries issued while handling requests, by URL name.",
+    ),
+    "portal_db_query_duration_seconds_total": (
+        "counter",
+        "Time spent in database queries while handling requests, by URL name.",
+    ),
+    "portal_cache_requests_total": (
+        "counter",
+        "Cache lookups by key prefix and result (hit or miss).",
+    ),
+    "portal_job_duration_seconds": (
+        "histogram",
+        "Duration of export downloads and import commands, by job.",
+    ),
+    "portal_sales_records_created_total": (
+        "counter",
+        "Sales records created, by branch.",
+    ),
+    "portal_vehicles_created_total": (
+        "counter",
+        "Vehicle records created, by branch.",
+    ),
+    "portal_db_lock_retries_total": (
+        "counter",
+        "Writes retried after SQLite reported the database locked, by operation.",
+    ),
+    "portal_db_lock_failures_total": (
+        "counter",
+        "Writes that still found the database locked after every retry, by operation.",
+    ),
+}
+
+_lock = threading.Lock()
+_pending = {}  # (sample name, rendered labels) -> increment
+_last_flush = time.monotonic()
+
+
+def enabled():
+    return settings.METRICS_ENABLED
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels):
+    return ",".join(
+        f'{key}="{_escape(value)}"' for key, value in sorted(labels.items())
+    )
+
+
+def _add(samples):
+    global _last_flush
+    with _lock:
+        for key, amount in samples:
+            _pending[key] = _pending.get(key, 0) + amount
+        due = time.monotonic() - _last_flush >= settings.METRICS_FLUSH_INTERVAL
+    if due:
+        flush()
+
+
+def inc(name, amount=1, **labels):
+    """Increment counter ``name``."""
+    if enabled():
+        _add([((name, _labels(labels)), amount)])
+
+
+def observe(name, value, **labels):
+    """Record ``value`` in histogram ``name``."""
+    if not enabled():
+        return
+    samples = [
+        ((f"{name}_bucket", _labels({**labels, "le": bound})), 1)
+        for bound in LATENCY_BUCKETS
+        if value <= bound
+    ]
+    samples += [
+        ((f"{name}_bucket", _labels({**labels, "le": "+Inf"})), 1),
+        ((f"{name}_sum", _labels(labels)), value),
+        ((f"{name}_count", _labels(labels)), 1),
+    ]
+    _add(samples)
+
+
+@contextmanager
+def timed(name, **labels):
+    """Observe the wall time of the ``with`` block in histogram ``name``."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - started, **labels)
+
+
+def _connect():
+    conn = sqlite3.connect(settings.METRICS_SPOOL_PATH, timeout=5)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS samples ("
+        "name TEXT NOT NULL, labels TEXT NOT NULL, value REAL NOT NULL, "
+        "PRIMARY KEY (name, labels))"
+    )
+    return conn
+
+
+def flush():
+    """Add this process's buffered increments to the shared spool."""
+    global _last_flush
+    with _lock:
+        batch = list(_pending.items())
+        _pending.clear()
+        _last_flush = time.monotonic()
+    if not batch:
+        return
+    try:
+        conn = _connect()
+        try:
+            with conn:
+                conn.executemany(
+                    "INSERT INTO samples (name, labels, value) VALUES (?, ?, ?) "
+                    "ON CONFLICT (name, labels) DO UPDATE "
+                    "SET value = value + excluded.value",
+                    [(name, labels, amount) for (name, labels), amount in batch],
+                )
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        # Keep the increments for the next flush rather than losing them
+        with _lock:
+            for key, amount in batch:
+                _pending[key] = _pending.get(key, 0) + amount
+
+
+atexit.register(flush)
+
+
+def _family(sample_name):
+    for suffix in ("_bucket", "_sum", "_count"):
+        base = sample_name[: -len(suffix)]
+        if sample_name.endswith(suffix) and METRICS.get(base, ("",))[0] == "histogram":
+            return base
+    return sample_name
+
+
+def _bucket_order(labels):
+    # Sort "+Inf" after the numeric bounds of the same series
+    if 'le="+Inf"' in labels:
+        return (labels.replace('le="+Inf"', ""), float("inf"))
+    head, sep, tail = labels.partition('le="')
+    if not sep:
+        return (labels, 0.0)
+    bound, _, rest = tail.partition('"')
+    return (head + rest, float(bound))
+
+
+def _format(value):
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def render():
+    """All spooled metrics in the Prometheus text exposition format."""
+    flush()
+    conn = _connect()
+    try:
+        rows = conn.execute("SELECT name, labels, value FROM samples").fetchall()
+    finally:
+        conn.close()
+
+    families = {}
+    for name, labels, value in rows:
+        families.setdefault(_family(name), []).append((name, labels, value))
+
+    lines = []
+    for family in sorted(families):
+        kind, help_text = METRICS.get(family, ("untyped", ""))
+        lines.append(f"# HELP {family} {help_text}")
+        lines.append(f"# TYPE {family} {kind}")
+        samples = sorted(
+            families[family], key=lambda row: (row[0], _bucket_order(row[1]))
+        )
+        for name, labels, value in samples:
+            series = f"{name}{{{labels}}}" if labels else name
+            lines.append(f"{series} {_format(value)}")
+    return "\n".join(lines) + "\n"
@@ -1,7 +1,48 @@
+from . import metrics
+from .actions import EXCLUDED_NAMESPACES, resolve_action
 from .models import UserActivityLog
-from django.urls import reverse
+from .nplusone import QueryRecorder, report
+from .permissions import is_admin
+from .profiling import requested_mode, save_profile
+from .slow_queries import current_source
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
 from django.utils import timezone
+from lsm_portal.db import retry_on_locked
+from pathlib import Path
+import cProfile
 import re
+import time
+import tracemalloc
+
+
+class QueryCounter:
+    """``execute_wrapper`` hook counting and timing the queries a request issues."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+
+
+def response_size(response):
+    """Body size in bytes, or None for streamed responses of unknown length."""
+    if response.has_header("Content-Length"):
+        try:
+            return int(response["Content-Length"])
+        except ValueError:
+            return None
+    if getattr(response, "streaming", False):
+        return None
+    return len(response.content)
 
 
 class UserActivityMiddleware:
@@ -9,13 +50,27 @@ class UserActivityMiddleware:
         self.get_response = get_response
 
     def __call__(self, request):
-        response = self.get_response(request)
+        # Attribute slow queries to this request until the view is resolved
+        source = current_source.set(f"path:{request.path}")
+        try:
+            return self.handle(request)
+        finally:
+            current_source.reset(source)
 
-        # Log activity for authenticated users, excluding static/media files and admin logs page itself
+    def handle(self, request):
+        counter = QueryCounter()
+        started = time.perf_counter()
+        with connection.execute_wrapper(counter):
+            response = self.get_response(request)
+        duration = time.perf_counter() - started
+        duration_ms = round(duration * 1000)
+        action, object_id = resolve_action(request)
+        self.record_metrics(request, response, action, duration, counter)
+
+        # Log activity for authenticated users, excluding static/media files, the admin and the activity pages themselves
         if (
             request.user.is_authenticated
-            and not request.path.startswith(reverse("admin:index"))
-            and not request.path.startswith(reverse("user_activity:log_view"))
+            and action.split(":", 1)[0] not in EXCLUDED_NAMESPACES
         ):
             # Exclude static and media files
             if not (
@@ -24,16 +79,44 @@ class UserActivityMiddleware:
             ):
                 # Generate human-readable description
                 description = self.generate_description(request)
-                
-                UserActivityLog.objects.create(
+
+                # Retried rather than failing a request that already succeeded
+                retry_on_locked(UserActivityLog.objects.create, name="activity_log")(
                     user=request.user,
+                    branch_id=request.user.branch_id,
+                    action=action,
+                    object_id=object_id,
                     url=request.path,
                     method=request.method,
                     timestamp=timezone.now(),
-                    action_description=description
+                    action_description=description,
+                    duration_ms=duration_ms,
+                    status_code=response.status_code,
+                    query_count=counter.count,
+                    response_size=response_size(response),
                 )
         return response
 
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # ...and to the resolved view from here on
+        current_source.set(f"view:{request.resolver_match.view_name}")
+
+    def record_metrics(self, request, response, action, duration, counter):
+        # Unrouted paths (404s, static files) share one label to bound cardinality
+        view = action or "unresolved"
+        metrics.inc(
+            "portal_http_requests_total",
+            view=view,
+            method=request.method,
+            status=response.status_code,
+        )
+        metrics.observe("portal_http_request_duration_seconds", duration, view=view)
+        if counter.count:
+            metrics.inc("portal_db_queries_total", counter.count, view=view)
+            metrics.inc(
+                "portal_db_query_duration_seconds_total", counter.duration, view=view
+            )
+
     def generate_description(self, request):
         """Generate human-readable descriptions for different URL patterns"""
         path = request.path
@@ -143,3 +226,78 @@ class UserActivityMiddleware:
         
         # If no match found, return the first part capitalized
         return parts[0].replace('-', ' ').title()
+
+
+class ProfilerMiddleware:
+    """
+    Profile a single request for superusers, the users who may read profiles
+    (``permissions.is_admin``).
+
+    Triggered by a ``_profile`` query parameter or an ``X-Profile`` header;
+    the value ``memory`` also traces allocations with tracemalloc. Other
+    requests pass straight through. The profile id is returned in the
+    ``X-Profile-Id`` response header.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        mode = requested_mode(request)
+        if mode is None or not is_admin(request.user):
+            return self.get_response(request)
+        return self.profile(request, mode)
+
+    def profile(self, request, mode):
+        counter = QueryCounter()
+        profiler = cProfile.Profile()
+        if mode == "memory":
+            tracemalloc.start()
+        started = time.perf_counter()
+        profiler.enable()
+        try:
+            with connection.execute_wrapper(counter):
+                response = self.get_response(request)
+        finally:
+            profiler.disable()
+            duration = time.perf_counter() - started
+            memory = self.memory_summary() if mode == "memory" else None
+
+        profile_id = save_profile(
+            request, response, profiler, duration, counter, memory
+        )
+        response["X-Profile-Id"] = profile_id
+        return response
+
+    def memory_summary(self, limit=15):
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        top = []
+        for stat in snapshot.statistics("lineno")[:limit]:
+            frame = stat.traceback[0]
+            top.append(
+                {
+                    "location": f"{Path(frame.filename).name}:{frame.lineno}",
+                    "size_kb": round(stat.size / 1024, 1),
+                    "count": stat.count,
+                }
+            )
+        return {"peak_kb": round(peak / 1024, 1), "top": top}
+
+
+class NPlusOneMiddleware:
+    """Report repeated queries and query budget overruns (see nplusone.py)."""
+
+    def __init__(self, get_response):
+        if not settings.NPLUSONE_DETECTION:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            response = self.get_response(request)
+        match = request.resolver_match
+        report(match.view_name if match else "", recorder)
+        return response
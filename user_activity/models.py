@@ -1,5 +1,6 @@
 from django.db import models
 from django.conf import settings
+from accounts.models import Branch
 
 
 class UserActivityLog(models.Model):
@@ -10,15 +11,48 @@ class UserActivityLog(models.Model):
         blank=True,
         db_index=True,
     )
+    # Branch of the user at the time of the request, so audits stay accurate
+    # after staff move between branches
+    branch = models.ForeignKey(
+        Branch,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="activity_logs",
+    )
+    # Resolved URL name, e.g. "store:sales_record_detail"
+    action = models.CharField(max_length=100, blank=True, default="")
+    # First captured URL argument (vehicle id, stock pk, ...), if any
+    object_id = models.CharField(max_length=64, blank=True, default="")
     url = models.CharField(max_length=255)
     method = models.CharField(max_length=10)
     action_description = models.TextField(blank=True, null=True)
     timestamp = models.DateTimeField(auto_now_add=True, db_index=True)
+    # Request metrics, measured by UserActivityMiddleware
+    duration_ms = models.PositiveIntegerField(null=True, blank=True)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    query_count = models.PositiveIntegerField(null=True, blank=True)
+    response_size = models.PositiveIntegerField(null=True, blank=True)
 
     class Meta:
         ordering = ["-timestamp"]
         verbose_name = "User Activity Log"
         verbose_name_plural = "User Activity Logs"
+        indexes = [
+            models.Index(
+                fields=["action", "object_id", "-timestamp"],
+                name="activity_action_object_idx",
+            ),
+            models.Index(
+                fields=["branch", "-timestamp"], name="activity_branch_time_idx"
+            ),
+            models.Index(fields=["user", "-timestamp"], name="activity_user_time_idx"),
+            # Latency report: a time range grouped by action and branch
+            models.Index(
+                fields=["timestamp", "action", "branch"],
+                name="activity_time_action_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.user.email} - {self.method} {self.url} at {self.timestamp.strftime('%Y-%m-%d %H:%M:%S')}"
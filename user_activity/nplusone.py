@@ -0,0 +1,115 @@
+"""
+N+1 query detection.
+
+``NPlusOneMiddleware`` fingerprints every query a view issues. A statement
+repeated ``NPLUSONE_THRESHOLD`` or more times in one request is reported as
+an N+1 together with where it came from: the template name and line when it
+was triggered while rendering a template node, otherwise the innermost
+project frame. Views listed in ``NPLUSONE_VIEW_BUDGETS`` are also held to a
+maximum total query count.
+
+``NPLUSONE_DETECTION`` selects what happens to a finding: "log" writes a
+warning to the ``lsm_portal.nplusone`` logger, "raise" raises
+:class:`NPlusOneError` (used by the test suite), and "" disables the
+middleware entirely.
+"""
+
+import logging
+import sys
+from pathlib import Path
+
+from django.conf import settings
+
+from .slow_queries import fingerprint
+
+logger = logging.getLogger("lsm_portal.nplusone")
+
+# Frames of the detector itself are never the culprit
+_OWN_FILES = (__file__, str(Path(__file__).with_name("middleware.py")))
+
+
+class NPlusOneError(Exception):
+    pass
+
+
+def template_location(frame):
+    """Template name and line of the innermost node being rendered, if any."""
+    while frame is not None:
+        code = frame.f_code
+        if code.co_name == "render_annotated" and code.co_filename.endswith(
+            str(Path("django", "template", "base.py"))
+        ):
+            node = frame.f_locals.get("self")
+            origin = getattr(node, "origin", None)
+            token = getattr(node, "token", None)
+            if origin is not None and token is not None:
+                return f"{origin.template_name or origin.name}:{token.lineno}"
+        frame = frame.f_back
+    return None
+
+
+def code_location(frame):
+    """File, line and function of the innermost project frame."""
+    base_dir = str(settings.BASE_DIR)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if (
+            filename.startswith(base_dir)
+            and "site-packages" not in filename
+            and filename not in _OWN_FILES
+        ):
+            relative = Path(filename).relative_to(base_dir)
+            return f"{relative}:{frame.f_lineno} in {frame.f_code.co_name}"
+        frame = frame.f_back
+    return "unknown"
+
+
+class QueryRecorder:
+    """``execute_wrapper`` hook grouping a request's queries by fingerprint."""
+
+    def __init__(self):
+        self.total = 0
+        self.counts = {}
+        self.locations = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        self.total += 1
+        key = fingerprint(sql)
+        count = self.counts.get(key, 0) + 1
+        self.counts[key] = count
+        if count == 2:
+            # Locate on the first repeat only; single queries are never reported
+            frame = sys._getframe(1)
+            self.locations[key] = template_location(frame) or code_location(frame)
+        return execute(sql, params, many, context)
+
+    def repeated(self, threshold):
+        return [
+            (sql, count, self.locations[sql])
+            for sql, count in sorted(
+                self.counts.items(), key=lambda item: item[1], reverse=True
+            )
+            if count >= threshold
+        ]
+
+
+def report(view_name, recorder):
+    """Log or raise for the N+1 patterns and budget overrun of one request."""
+    problems = [
+        f"{count}x at {location}: {sql[:200]}"
+        for sql, count, location in recorder.repeated(settings.NPLUSONE_THRESHOLD)
+    ]
+    budget = settings.NPLUSONE_VIEW_BUDGETS.get(view_name)
+    if budget is not None and recorder.total > budget:
+        problems.insert(
+            0, f"{recorder.total} queries exceed the budget of {budget} for this view"
+        )
+    if not problems:
+        return
+
+    message = f"N+1 queries in {view_name or 'unresolved view'}:\n  " + "\n  ".join(
+        problems
+    )
+    if settings.NPLUSONE_DETECTION == "raise":
+        raise NPlusOneError(message)
+    logger.warning(message)
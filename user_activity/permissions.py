@@ -0,0 +1,3 @@
+def is_admin(user):
+    """Who may see the activity pages and profile requests with ?_profile."""
+    return user.is_authenticated and user.is_superuser
@@ -0,0 +1,138 @@
+"""
+Captured request profiles.
+
+``ProfilerMiddleware`` runs a request under cProfile (and tracemalloc when
+asked for memory) and hands the results to :func:`save_profile`, which
+writes the raw stats as ``<id>.prof`` and a JSON summary as ``<id>.json``
+under ``settings.PROFILE_DIR``. The admin profile pages read the summaries.
+"""
+
+import io
+import json
+import pstats
+import re
+import uuid
+from pathlib import Path
+
+from django.conf import settings
+from django.template.base import Template
+from django.utils import timezone
+
+PROFILE_ID = re.compile(r"^[0-9]{8}-[0-9]{6}-[0-9a-f]{6}$")
+TOP_FUNCTIONS = 30
+
+_TEMPLATE_RENDER = Template.render.__code__
+
+
+def profile_dir():
+    path = Path(settings.PROFILE_DIR)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def requested_mode(request):
+    """The profiling mode a request asks for ("cpu" or "memory"), if any."""
+    value = request.GET.get("_profile", request.headers.get("X-Profile"))
+    if value is None:
+        return None
+    return "memory" if value == "memory" else "cpu"
+
+
+def _function_label(key):
+    filename, lineno, name = key
+    if filename == "~":
+        return name  # built-in
+    for marker in ("site-packages/", str(settings.BASE_DIR) + "/"):
+        if marker in filename:
+            filename = filename.split(marker, 1)[1]
+            break
+    return f"{filename}:{lineno}({name})"
+
+
+def top_functions(stats, limit=TOP_FUNCTIONS):
+    rows = []
+    for key, (_, calls, tottime, cumtime, _) in stats.stats.items():
+        rows.append(
+            {
+                "function": _function_label(key),
+                "calls": calls,
+                "tottime_ms": round(tottime * 1000, 2),
+                "cumtime_ms": round(cumtime * 1000, 2),
+            }
+        )
+    rows.sort(key=lambda row: row["cumtime_ms"], reverse=True)
+    return rows[:limit]
+
+
+def template_render_ms(stats):
+    key = (
+        _TEMPLATE_RENDER.co_filename,
+        _TEMPLATE_RENDER.co_firstlineno,
+        _TEMPLATE_RENDER.co_name,
+    )
+    entry = stats.stats.get(key)
+    return round(entry[3] * 1000, 2) if entry else 0.0
+
+
+def save_profile(request, response, profiler, duration, counter, memory=None):
+    """Write a profile and its summary; return the profile id."""
+    profile_id = f"{timezone.now():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:6]}"
+    directory = profile_dir()
+    profiler.dump_stats(directory / f"{profile_id}.prof")
+
+    stats = pstats.Stats(profiler, stream=io.StringIO())
+    match = request.resolver_match
+    summary = {
+        "id": profile_id,
+        "timestamp": timezone.now().isoformat(),
+        "user": request.user.email,
+        "method": request.method,
+        "path": request.get_full_path(),
+        "view": match.view_name if match else "",
+        "status_code": response.status_code,
+        "duration_ms": round(duration * 1000, 2),
+        "query_count": counter.count,
+        "query_time_ms": round(counter.duration * 1000, 2),
+        "template_ms": template_render_ms(stats),
+        "top_functions": top_functions(stats),
+        "memory": memory,
+    }
+    with open(directory / f"{profile_id}.json", "w", encoding="utf-8") as summary_file:
+        json.dump(summary, summary_file, indent=1)
+
+    prune(directory)
+    return profile_id
+
+
+def prune(directory):
+    """Keep only the newest ``settings.PROFILE_MAX_COUNT`` profiles."""
+    summaries = sorted(directory.glob("*.json"), reverse=True)
+    for old in summaries[settings.PROFILE_MAX_COUNT :]:
+        old.unlink(missing_ok=True)
+        old.with_suffix(".prof").unlink(missing_ok=True)
+
+
+def list_profiles():
+    profiles = []
+    for path in sorted(profile_dir().glob("*.json"), reverse=True):
+        with open(path, encoding="utf-8") as summary_file:
+            profiles.append(json.load(summary_file))
+    return profiles
+
+
+def load_profile(profile_id):
+    """The summary for ``profile_id``, or None if it does not exist."""
+    if not PROFILE_ID.match(profile_id):
+        return None
+    path = profile_dir() / f"{profile_id}.json"
+    if not path.exists():
+        return None
+    with open(path, encoding="utf-8") as summary_file:
+        return json.load(summary_file)
+
+
+def profile_stats_path(profile_id):
+    if not PROFILE_ID.match(profile_id):
+        return None
+    path = profile_dir() / f"{profile_id}.prof"
+    return path if path.exists() else None
@@ -0,0 +1,87 @@
+from math import ceil
+
+from django.db.models import Avg, Count, F, Max, Q, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+
+from .actions import action_label
+from .models import UserActivityLog
+
+# Reported percentiles in whole percent; the nearest rank of p among n rows,
+# ceil(n * p / 100), is then exact integer arithmetic in SQL
+PERCENTILES = {"p50": 50, "p95": 95, "p99": 99}
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted, non-empty list."""
+    rank = max(ceil(fraction * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+def latency_report(since, until=None, branch_id=None):
+    """
+    Request latency per action and branch for logs written since ``since``.
+
+    Returns one dict per (action, branch) with the request count, p50/p95/p99
+    and max duration in milliseconds, the average query count and the number
+    of server errors, slowest p95 first.
+
+    Everything but the percentiles is one grouped query. Each percentile is
+    one more, numbering every group's rows by duration and returning only the
+    row at the percentile's nearest rank, so one row per group and percentile
+    leaves the database.
+    """
+    # One upper bound for every query, so logs written meanwhile are left out
+    until = until or timezone.now()
+    logs = UserActivityLog.objects.filter(
+        timestamp__gte=since, timestamp__lt=until, duration_ms__isnull=False
+    ).exclude(action="")
+    if branch_id:
+        logs = logs.filter(branch_id=branch_id)
+
+    groups = (
+        logs.values("action", "branch_id", "branch__name")
+        .annotate(
+            requests=Count("id"),
+            max=Max("duration_ms"),
+            avg_queries=Avg("query_count"),
+            errors=Count("id", filter=Q(status_code__gte=500)),
+        )
+        .order_by()
+    )
+
+    partition = [F("action"), F("branch_id")]
+    ranked = logs.annotate(
+        rank=Window(
+            RowNumber(), partition_by=partition, order_by=F("duration_ms").asc()
+        ),
+        group_size=Window(Count("id"), partition_by=partition),
+    ).order_by()
+    at_rank = {}
+    for name, percent in PERCENTILES.items():
+        for action, group_branch_id, duration in ranked.filter(
+            rank=(F("group_size") * percent + 99) / 100
+        ).values_list("action", "branch_id", "duration_ms"):
+            at_rank[(name, action, group_branch_id)] = duration
+
+    report = []
+    for group in groups:
+        ranks = [
+            at_rank.get((name, group["action"], group["branch_id"]))
+            for name in PERCENTILES
+        ]
+        if None in ranks:
+            continue  # Not in the percentile queries' rows
+        row = {
+            "action": group["action"],
+            "label": action_label(group["action"]),
+            "branch_name": group["branch__name"],
+            "requests": group["requests"],
+            **dict(zip(PERCENTILES, ranks)),
+        }
+        row.update(
+            max=group["max"], avg_queries=group["avg_queries"], errors=group["errors"]
+        )
+        report.append(row)
+    report.sort(key=lambda row: row["p95"], reverse=True)
+    return report
@@ -0,0 +1,114 @@
+"""
+Opt-in slow query log.
+
+When ``SLOW_QUERY_LOG_ENABLED`` is set, every database connection gets an
+``execute_wrapper`` that times each statement. Statements slower than
+``SLOW_QUERY_THRESHOLD_MS`` are appended to a rotating JSONL file together
+with the view or management command that issued them and the project frames
+of the Python stack. Query parameters are not logged, as they can hold
+customer details. ``manage.py slow_query_report`` summarizes the file.
+"""
+
+import json
+import logging
+import re
+import sys
+import time
+import traceback
+from contextvars import ContextVar
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+
+from django.conf import settings
+from django.utils import timezone
+
+# "view:<url name>" while a request is handled; see UserActivityMiddleware
+current_source = ContextVar("slow_query_source", default=None)
+
+MAX_SQL_LENGTH = 4000
+
+_logger = None
+
+
+def default_source():
+    """Attribution for queries issued outside a request."""
+    if len(sys.argv) > 1 and Path(sys.argv[0]).name == "manage.py":
+        return f"command:{sys.argv[1]}"
+    return "unknown"
+
+
+def get_logger():
+    global _logger
+    if _logger is None:
+        path = Path(settings.SLOW_QUERY_LOG_PATH)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        handler = RotatingFileHandler(
+            path,
+            maxBytes=settings.SLOW_QUERY_LOG_MAX_BYTES,
+            backupCount=settings.SLOW_QUERY_LOG_BACKUP_COUNT,
+            encoding="utf-8",
+        )
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger = logging.getLogger("lsm_portal.slow_queries")
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        logger.addHandler(handler)
+        _logger = logger
+    return _logger
+
+
+def project_stack():
+    """The innermost project frames of the current stack, as "file:line in func"."""
+    base_dir = str(settings.BASE_DIR)
+    frames = [
+        frame
+        for frame in traceback.extract_stack()
+        if frame.filename.startswith(base_dir)
+        and "site-packages" not in frame.filename
+        and not frame.filename.endswith("slow_queries.py")
+    ]
+    return [
+        f"{Path(frame.filename).relative_to(base_dir)}:{frame.lineno} in {frame.name}"
+        for frame in frames[-settings.SLOW_QUERY_STACK_DEPTH :]
+    ]
+
+
+def record_slow_queries(execute, sql, params, many, context):
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration_ms = (time.perf_counter() - started) * 1000
+        if duration_ms >= settings.SLOW_QUERY_THRESHOLD_MS:
+            entry = {
+                "timestamp": timezone.now().isoformat(),
+                "duration_ms": round(duration_ms, 2),
+                "database": context["connection"].alias,
+                "source": current_source.get() or default_source(),
+                "many": many,
+                "sql": sql[:MAX_SQL_LENGTH],
+                "stack": project_stack(),
+            }
+            get_logger().info(json.dumps(entry))
+
+
+def install(sender, connection, **kwargs):
+    """``connection_created`` receiver adding the recorder to a new connection."""
+    if record_slow_queries not in connection.execute_wrappers:
+        # Innermost, so wrappers pushed with connection.execute_wrapper()
+        # around a request are still the ones they pop afterwards
+        connection.execute_wrappers.insert(0, record_slow_queries)
+
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*(?:\?|%s)(?:\s*,\s*(?:\?|%s))*\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def fingerprint(sql):
+    """SQL with literals and placeholder lists folded, to group similar queries."""
+    sql = _STRING.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _PLACEHOLDER_LIST.sub("(...)", sql)
+    return _WHITESPACE.sub(" ", sql).strip()
@@ -1,3 +1,292 @@
-from django.test import TestCase
+import tempfile
+from datetime import timedelta
+from io import StringIO
 
-# Create your tests here.
+from django.core.management import call_command
+from django.db import connection
+from django.template import Context, Engine
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import Branch, CustomUser
+from home.testing import QueryBudgetTestCase
+from store.models import Stock
+from user_activity import profiling
+from user_activity.actions import UNRESOLVED_ACTION
+from user_activity.models import UserActivityLog
+from user_activity.nplusone import NPlusOneError, QueryRecorder, report
+from user_activity.reports import latency_report
+
+
+class UserActivityQueryBudgetTests(QueryBudgetTestCase):
+    def setUp(self):
+        super().setUp()
+        self.login("admin")
+
+    def test_log_view(self):
+        self.assertBudget(reverse("user_activity:log_view"), 9)
+
+    def test_log_view_filtered(self):
+        branch = self.data.branches[1]
+        self.assertBudget(
+            reverse("user_activity:log_view")
+            + f"?branch={branch.pk}&user=staff&from_date=2020-01-01&page=2",
+            9,
+        )
+
+    def test_log_view_by_object(self):
+        vehicle = self.data.vehicles[0]
+        self.assertBudget(
+            reverse("user_activity:log_view")
+            + f"?action=home:vehicle_detail&object_id={vehicle.pk}",
+            8,
+        )
+
+    def test_latency_report(self):
+        self.assertBudget(reverse("user_activity:latency_report") + "?days=30", 11)
+
+    def test_latency_report_for_branch(self):
+        branch = self.data.branches[0]
+        self.assertBudget(
+            reverse("user_activity:latency_report") + f"?days=7&branch={branch.pk}",
+            11,
+        )
+
+
+@override_settings(METRICS_ENABLED=False)
+class LatencyReportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.branch = Branch.objects.create(name="LATENCY")
+        cls.other_branch = Branch.objects.create(name="ELSEWHERE")
+
+    def log(self, action, durations, branch=None, **fields):
+        UserActivityLog.objects.bulk_create(
+            UserActivityLog(
+                action=action,
+                branch=branch or self.branch,
+                url="/",
+                method="GET",
+                duration_ms=duration,
+                **fields,
+            )
+            for duration in durations
+        )
+
+    def report(self, **kwargs):
+        since = timezone.now() - timedelta(hours=1)
+        return {
+            (row["action"], row["branch_name"]): row
+            for row in latency_report(since, **kwargs)
+        }
+
+    def test_percentiles_are_nearest_rank(self):
+        # Shuffled so the ranks come from the query's ordering
+        self.log(
+            "store:stock_list", [(n * 37) % 100 + 1 for n in range(100)], query_count=4
+        )
+        self.log(
+            "store:stock_list", [10, 30, 20], branch=self.other_branch, status_code=500
+        )
+        self.log("home:dashboard", [7])
+        self.log("home:dashboard", [None])
+        self.log("", [5000])
+
+        report = self.report()
+
+        self.assertEqual(
+            set(report),
+            {
+                ("store:stock_list", "LATENCY"),
+                ("store:stock_list", "ELSEWHERE"),
+                ("home:dashboard", "LATENCY"),
+            },
+        )
+        stock = report[("store:stock_list", "LATENCY")]
+        self.assertEqual(
+            [stock[name] for name in ("requests", "p50", "p95", "p99", "max")],
+            [100, 50, 95, 99, 100],
+        )
+        self.assertEqual(stock["avg_queries"], 4)
+        self.assertEqual(stock["errors"], 0)
+
+        small = report[("store:stock_list", "ELSEWHERE")]
+        self.assertEqual(
+            [
+                small[name]
+                for name in ("requests", "p50", "p95", "p99", "max", "errors")
+            ],
+            [3, 20, 30, 30, 30, 3],
+        )
+        self.assertIsNone(small["avg_queries"])
+
+        single = report[("home:dashboard", "LATENCY")]
+        self.assertEqual([single["p50"], single["p99"]], [7, 7])
+
+        self.assertEqual(
+            list(self.report(branch_id=self.other_branch.pk)),
+            [("store:stock_list", "ELSEWHERE")],
+        )
+
+    def test_logs_written_during_the_report_are_left_out(self):
+        self.log("store:stock_list", [10, 20])
+        written = []
+
+        def log_new_action(execute, sql, params, many, context):
+            result = execute(sql, params, many, context)
+            # After the first percentile query, as a concurrent request would
+            if "ROW_NUMBER" in sql and not written:
+                written.append(True)
+                self.log("store:sales_list", [30])
+            return result
+
+        with connection.execute_wrapper(log_new_action):
+            report = self.report()
+
+        self.assertTrue(written)
+        self.assertEqual(list(report), [("store:stock_list", "LATENCY")])
+        self.assertEqual(report[("store:stock_list", "LATENCY")]["requests"], 2)
+
+
+@override_settings(
+    METRICS_ENABLED=False,
+    PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"],
+)
+class ProfilerMiddlewareTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        branch = Branch.objects.create(name="PROFILE")
+        cls.superuser = CustomUser.objects.create_superuser(
+            "root@portal.test", "pass", branch=branch
+        )
+        # Admin access level without superuser rights: no access to the profiles
+        cls.admin = CustomUser.objects.create_user(
+            "admin@portal.test", "pass", access_level="admin", branch=branch
+        )
+
+    def setUp(self):
+        profile_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(profile_dir.cleanup)
+        settings_override = override_settings(PROFILE_DIR=profile_dir.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def profile_as(self, user):
+        self.client.force_login(user)
+        can_read = (
+            self.client.get(reverse("user_activity:profile_list")).status_code == 200
+        )
+        response = self.client.get(reverse("home:dashboard") + "?_profile=1")
+        self.assertEqual(response.status_code, 200)
+        return can_read, response
+
+    def test_trigger_without_access_to_profiles_is_ignored(self):
+        can_read, response = self.profile_as(self.admin)
+
+        self.assertFalse(can_read)
+        self.assertNotIn("X-Profile-Id", response)
+        self.assertEqual(profiling.list_profiles(), [])
+
+    def test_admin_trigger_writes_a_profile(self):
+        can_read, response = self.profile_as(self.superuser)
+
+        self.assertTrue(can_read)
+        profile_id = response["X-Profile-Id"]
+        self.assertEqual(profiling.load_profile(profile_id)["id"], profile_id)
+        self.assertEqual(
+            self.client.get(
+                reverse("user_activity:profile_detail", args=[profile_id])
+            ).status_code,
+            200,
+        )
+
+
+@override_settings(NPLUSONE_DETECTION="raise", NPLUSONE_THRESHOLD=5)
+class NPlusOneDetectorTests(TestCase):
+    engine = Engine(
+        loaders=[
+            (
+                "django.template.loaders.locmem.Loader",
+                {
+                    "stock_names.html": (
+                        "<ul>\n"
+                        "{% for stock in stocks %}\n"
+                        "<li>{{ stock }}</li>\n"
+                        "{% endfor %}</ul>\n"
+                    )
+                },
+            )
+        ]
+    )
+
+    @classmethod
+    def setUpTestData(cls):
+        branch = Branch.objects.create(name="NPLUSONE")
+        Stock.objects.bulk_create(
+            Stock(branch=branch, name=f"Filter {n}", quantity=n) for n in range(6)
+        )
+
+    def render(self, stocks):
+        recorder = QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            template = self.engine.get_template("stock_names.html")
+            template.render(Context({"stocks": stocks}))
+        return recorder
+
+    def test_reports_template_line_of_repeated_query(self):
+        # Stock.__str__ reads stock.branch, one query per row without a join
+        recorder = self.render(Stock.objects.all())
+
+        self.assertEqual(recorder.total, 7)
+        with self.assertRaisesMessage(
+            NPlusOneError, "6x at stock_names.html:3: SELECT"
+        ):
+            report("store:stock_list", recorder)
+
+    def test_joined_queryset_passes(self):
+        recorder = self.render(Stock.objects.select_related("branch"))
+
+        self.assertEqual(recorder.total, 1)
+        report("store:stock_list", recorder)
+
+    @override_settings(NPLUSONE_VIEW_BUDGETS={"store:stock_list": 5})
+    def test_view_budget(self):
+        recorder = self.render(Stock.objects.all())
+
+        with self.assertRaisesMessage(
+            NPlusOneError, "7 queries exceed the budget of 5 for this view"
+        ):
+            report("store:stock_list", recorder)
+        with override_settings(NPLUSONE_THRESHOLD=10):
+            report("home:dashboard", recorder)
+
+
+@override_settings(
+    METRICS_ENABLED=False,
+    PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"],
+)
+class BackfillActivityActionsTests(TestCase):
+    def backfill(self):
+        out = StringIO()
+        call_command("backfill_activity_actions", stdout=out)
+        return out.getvalue()
+
+    def test_backfill_converges(self):
+        branch = Branch.objects.create(name="BACKFILL")
+        user = CustomUser.objects.create_user(
+            "backfill@portal.test", "pass", branch=branch
+        )
+        resolved, gone = UserActivityLog.objects.bulk_create(
+            UserActivityLog(user=user, url=url, method="GET")
+            for url in [reverse("home:dashboard"), "/retired-page/"]
+        )
+
+        self.assertIn("Backfilled 2 activity logs", self.backfill())
+        self.assertIn("Backfilled 0 activity logs", self.backfill())
+
+        resolved.refresh_from_db()
+        gone.refresh_from_db()
+        self.assertEqual(resolved.action, "home:dashboard")
+        self.assertEqual(gone.action, UNRESOLVED_ACTION)
+        self.assertEqual([resolved.branch_id, gone.branch_id], [branch.pk] * 2)
@@ -1,8 +1,22 @@
 from django.urls import path
-from .views import log_view
+from .views import (
+    latency_report_view,
+    log_view,
+    profile_detail_view,
+    profile_download_view,
+    profile_list_view,
+)
 
 app_name = "user_activity"
 
 urlpatterns = [
     path("logs/", log_view, name="log_view"),
+    path("latency/", latency_report_view, name="latency_report"),
+    path("profiles/", profile_list_view, name="profile_list"),
+    path("profiles/<str:profile_id>/", profile_detail_view, name="profile_detail"),
+    path(
+        "profiles/<str:profile_id>/download/",
+        profile_download_view,
+        name="profile_download",
+    ),
 ]
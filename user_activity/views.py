@@ -1,7 +1,14 @@
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseForbidden
 from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required, user_passes_test
+from . import metrics, profiling
+from .actions import action_choices
 from .models import UserActivityLog
-from django.core.paginator import Paginator
+from .permissions import is_admin
+from .reports import latency_report
+from home.pagination import CachedCountPaginator
+from lsm_portal.routers import reports_database
 from django.db.models import Q
 from datetime import datetime, timedelta
 from django.utils import timezone
@@ -11,16 +18,13 @@ from accounts.models import (
 )  # Assuming CustomUser and Branch are in accounts.models
 
 
-def is_admin(user):
-    return user.is_authenticated and user.is_superuser
-
-
 @login_required
 @user_passes_test(
     is_admin, login_url="/permission-denied/"
 )  # Redirect to a permission denied page
+@reports_database()
 def log_view(request):
-    logs_queryset = UserActivityLog.objects.all()
+    logs_queryset = UserActivityLog.objects.select_related("user", "branch")
 
     # Filters
     user_filter = request.GET.get("user")
@@ -28,6 +32,8 @@ def log_view(request):
     to_date_str = request.GET.get("to_date")
     url_query = request.GET.get("url_query")
     branch_filter_pk = request.GET.get("branch")  # New branch filter
+    action_filter = request.GET.get("action")
+    object_id_filter = (request.GET.get("object_id") or "").strip()
 
     if user_filter:
         logs_queryset = logs_queryset.filter(user__email__icontains=user_filter)
@@ -57,11 +63,18 @@ def log_view(request):
             Q(url__icontains=url_query) | Q(action_description__icontains=url_query)
         )
 
+    # Exact filters on indexed columns captured when the log was written
+    if action_filter:
+        logs_queryset = logs_queryset.filter(action=action_filter)
+
+    if object_id_filter:
+        logs_queryset = logs_queryset.filter(object_id=object_id_filter)
+
     if branch_filter_pk:
-        logs_queryset = logs_queryset.filter(user__branch__pk=branch_filter_pk)
+        logs_queryset = logs_queryset.filter(branch_id=branch_filter_pk)
 
     # Pagination
-    paginator = Paginator(logs_queryset, 50)  # 50 logs per page
+    paginator = CachedCountPaginator(logs_queryset, 50)  # 50 logs per page
     page_number = request.GET.get("page")
     page_obj = paginator.get_page(page_number)
 
@@ -77,5 +90,74 @@ def log_view(request):
         "url_query": url_query,
         "branches": branches,  # Pass branches to template
         "selected_branch": branch_filter_pk,  # Pass selected branch for dropdown
+        "actions": action_choices(),
+        "selected_action": action_filter,
+        "object_id": object_id_filter,
     }
     return render(request, "user_activity/log.html", context)
+
+
+LATENCY_REPORT_PERIODS = (1, 7, 30)
+
+
+@login_required
+@user_passes_test(is_admin, login_url="/permission-denied/")
+@reports_database()
+def latency_report_view(request):
+    try:
+        days = int(request.GET.get("days", 7))
+    except ValueError:
+        days = 7
+    if days not in LATENCY_REPORT_PERIODS:
+        days = 7
+    branch_filter_pk = request.GET.get("branch")
+
+    since = timezone.now() - timedelta(days=days)
+    context = {
+        "rows": latency_report(since, branch_id=branch_filter_pk),
+        "days": days,
+        "periods": LATENCY_REPORT_PERIODS,
+        "branches": Branch.objects.all().order_by("name"),
+        "selected_branch": branch_filter_pk,
+    }
+    return render(request, "user_activity/latency_report.html", context)
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint, for staff users and allow-listed scrapers."""
+    if not (
+        request.user.is_staff
+        or request.META.get("REMOTE_ADDR") in settings.METRICS_ALLOWED_IPS
+    ):
+        return HttpResponseForbidden()
+    return HttpResponse(
+        metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+@login_required
+@user_passes_test(is_admin, login_url="/permission-denied/")
+def profile_list_view(request):
+    return render(
+        request,
+        "user_activity/profile_list.html",
+        {"profiles": profiling.list_profiles()},
+    )
+
+
+@login_required
+@user_passes_test(is_admin, login_url="/permission-denied/")
+def profile_detail_view(request, profile_id):
+    profile = profiling.load_profile(profile_id)
+    if profile is None:
+        raise Http404("Profile not found")
+    return render(request, "user_activity/profile_detail.html", {"profile": profile})
+
+
+@login_required
+@user_passes_test(is_admin, login_url="/permission-denied/")
+def profile_download_view(request, profile_id):
+    path = profiling.profile_stats_path(profile_id)
+    if path is None:
+        raise Http404("Profile not found")
+    return FileResponse(open(path, "rb"), as_attachment=True, filename=path.name)
@@ -26,7 +26,13 @@ class VehicleAdmin(admin.ModelAdmin):
     )
     list_filter = ("status", "branch", "vehicle_make", "year")
     ordering = ("-date_created",)
-    readonly_fields = ("uuid", "date_created", "date_updated")
+    readonly_fields = (
+        "uuid",
+        "date_created",
+        "date_updated",
+        "latest_visit_at",
+        "visit_count",
+    )
     fieldsets = (
         (None, {"fields": ("uuid", "branch", "customer_name", "address", "phone")}),
         (
@@ -52,6 +58,8 @@ class VehicleAdmin(admin.ModelAdmin):
                     "date_updated",
                     "is_master_record",
                     "master_vehicle",
+                    "visit_count",
+                    "latest_visit_at",
                 ),
                 "classes": ("collapse",),
             },
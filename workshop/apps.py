@@ -1,4 +1,5 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class WorkshopConfig(AppConfig):
@@ -7,3 +8,5 @@ class WorkshopConfig(AppConfig):
 
     def ready(self):
         import workshop.signals  # noqa
+
+        post_migrate.connect(workshop.signals.create_vehicle_search_index, sender=self)
@@ -1,6 +1,7 @@
 import pandas as pd
 from decimal import Decimal, InvalidOperation
 from django.core.management.base import BaseCommand
+from user_activity import metrics
 from lsm_portal import settings
 from workshop.models import Vehicle, InternalEstimate, EstimatePart
 from accounts.models import Branch
@@ -36,6 +37,9 @@ def safe_decimal(value):
 class Command(BaseCommand):
     help = "Import ILORIN Internal Estimates from Excel"
 
+    @metrics.timed(
+        "portal_job_duration_seconds", job="import_ilorin_internal_estimates"
+    )
     def handle(self, *args, **kwargs):
 
         file_path = os.path.join(
@@ -3,6 +3,7 @@ import gc
 from decimal import Decimal, InvalidOperation
 from datetime import datetime
 from django.core.management.base import BaseCommand
+from user_activity import metrics
 from django.db import connection
 from openpyxl import load_workbook
 from workshop.models import Vehicle, InternalEstimate, EstimatePart, Branch
@@ -14,6 +15,7 @@ class Command(BaseCommand):
     def add_arguments(self, parser):
         parser.add_argument("excel_file", type=str, help="Path to Excel file")
 
+    @metrics.timed("portal_job_duration_seconds", job="import_invoices")
     def handle(self, *args, **options):
         file_path = options["excel_file"]
 
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+from workshop import search
+
+
+class Command(BaseCommand):
+    help = "Recreate the workshop vehicle search index from all master vehicle records"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--database", default=DEFAULT_DB_ALIAS, help="Database alias to index"
+        )
+
+    def handle(self, *args, **options):
+        indexed = search.rebuild(using=options["database"])
+        if not search.is_available(options["database"]):
+            self.stdout.write(
+                self.style.WARNING(
+                    "Full-text search is not available on this database; "
+                    "the workshop list will use LIKE matching."
+                )
+            )
+            return
+        self.stdout.write(
+            self.style.SUCCESS(f"Vehicle search index rebuilt ({indexed} vehicles)")
+        )
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from workshop import registry
+
+
+class Command(BaseCommand):
+    help = "Backfill chasis keys and master visit counts/dates for existing vehicles"
+
+    def handle(self, *args, **options):
+        updated = registry.rebuild()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Vehicle registry synced ({updated} master records updated)"
+            )
+        )
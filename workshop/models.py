@@ -4,6 +4,11 @@ import uuid
 from decimal import Decimal  # Import Decimal for precise calculations
 
 
+def normalize_chasis(chasis_no):
+    """Canonical form of a chasis number used for master record lookups."""
+    return (chasis_no or "").strip().upper()
+
+
 class VehicleStatus(models.TextChoices):
     ESTIMATE = "estimate", "Estimate"
     PENDING = "pending", "Pending"
@@ -26,6 +31,10 @@ class Vehicle(models.Model):
     model = models.CharField(max_length=100)
     year = models.PositiveIntegerField()
     chasis_no = models.CharField(max_length=100, db_index=True)
+    # Upper-cased, trimmed copy of chasis_no so master lookups can use an index
+    chasis_key = models.CharField(
+        max_length=100, blank=True, editable=False, db_index=True
+    )
     licence_plate = models.CharField(max_length=20)
     date_of_first_registration = models.DateField()
     mileage = models.CharField(max_length=50, blank=True, null=True)
@@ -43,6 +52,24 @@ class Vehicle(models.Model):
         blank=True,
         related_name="duplicate_vehicles",
     )
+    # Maintained on master records by workshop.registry when a return visit is added
+    latest_visit_at = models.DateTimeField(blank=True, null=True, editable=False)
+    visit_count = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            # Workshop listing order, restricted to master records
+            models.Index(
+                fields=["-latest_visit_at", "-id"],
+                condition=models.Q(is_master_record=True),
+                name="vehicle_master_visit_idx",
+            ),
+            models.Index(
+                fields=["branch", "-latest_visit_at", "-id"],
+                condition=models.Q(is_master_record=True),
+                name="vehicle_branch_visit_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.vehicle_make} {self.model} ({self.licence_plate})"
@@ -50,6 +77,10 @@ class Vehicle(models.Model):
     def save(self, *args, **kwargs):
         if not self.uuid:
             self.uuid = str(uuid.uuid4())[:12]
+        self.chasis_key = normalize_chasis(self.chasis_no)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "chasis_no" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "chasis_key"}
         super().save(*args, **kwargs)
 
 
@@ -0,0 +1,86 @@
+"""
+Vehicle registry: resolves master records and keeps their visit data current.
+
+A vehicle that returns to the workshop is stored as a new ``Vehicle`` row that
+points at its master record. Instead of aggregating over those duplicates on
+every workshop listing, the master carries ``visit_count`` (number of return
+visits) and ``latest_visit_at`` (date of the most recent return visit), which
+are updated here whenever a duplicate is created or deleted.
+"""
+
+from django.db.models import Case, Count, F, Max, Value, When
+
+from .models import Vehicle, normalize_chasis
+
+
+def find_master(chasis_no):
+    """Return the master record for a chasis number, or None if it is new."""
+    chasis_key = normalize_chasis(chasis_no)
+    if not chasis_key:
+        return None
+    return (
+        Vehicle.objects.filter(chasis_key=chasis_key, is_master_record=True)
+        .select_related("branch")
+        .order_by("id")
+        .first()
+    )
+
+
+def attach_to_master(vehicle, master):
+    """Turn an unsaved vehicle into a return visit of ``master``."""
+    vehicle.master_vehicle = master
+    vehicle.is_master_record = False
+    vehicle.branch = master.branch
+    return vehicle
+
+
+def record_visit(vehicle):
+    """Count a newly created return visit against its master record."""
+    if not vehicle.master_vehicle_id:
+        return
+    visited_at = vehicle.date_created
+    Vehicle.objects.filter(pk=vehicle.master_vehicle_id).update(
+        visit_count=F("visit_count") + 1,
+        latest_visit_at=Case(
+            When(latest_visit_at__gte=visited_at, then=F("latest_visit_at")),
+            default=Value(visited_at),
+        ),
+    )
+
+
+def refresh_master(master_id):
+    """Recompute visit data for a master record from its return visits."""
+    stats = Vehicle.objects.filter(master_vehicle_id=master_id).aggregate(
+        visit_count=Count("id"), latest_visit_at=Max("date_created")
+    )
+    Vehicle.objects.filter(pk=master_id).update(**stats)
+
+
+def rebuild():
+    """Backfill chasis keys and visit data of all vehicles; return masters updated."""
+    for vehicle in Vehicle.objects.filter(chasis_key="").only("id", "chasis_no"):
+        Vehicle.objects.filter(pk=vehicle.pk).update(
+            chasis_key=normalize_chasis(vehicle.chasis_no)
+        )
+
+    stats = {
+        row["master_vehicle_id"]: row
+        for row in Vehicle.objects.filter(master_vehicle__isnull=False)
+        .values("master_vehicle_id")
+        .annotate(visit_count=Count("id"), latest_visit_at=Max("date_created"))
+    }
+    updated = 0
+    for master in Vehicle.objects.filter(is_master_record=True).only(
+        "id", "visit_count", "latest_visit_at"
+    ):
+        row = stats.get(master.id, {"visit_count": 0, "latest_visit_at": None})
+        if (master.visit_count, master.latest_visit_at) != (
+            row["visit_count"],
+            row["latest_visit_at"],
+        ):
+            Vehicle.objects.filter(pk=master.pk).update(
+                visit_count=row["visit_count"],
+                latest_visit_at=row["latest_visit_at"],
+            )
+            updated += 1
+    return updated
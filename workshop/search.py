@@ -0,0 +1,238 @@
+"""
+Full-text search index for the workshop vehicle list.
+
+Master vehicle records are mirrored into an SQLite FTS5 table (one row per
+vehicle, rowid = vehicle id) that workshop.signals keeps in sync and
+``manage.py rebuild_vehicle_search`` repopulates. Every search term is
+matched as a prefix; a ``compact`` column holds the plate, chasis number and
+phone with spaces and punctuation removed, so "LND123" finds "LND 123 AB".
+Branch and status are stored unindexed alongside, so the list's filters are
+applied inside the MATCH query rather than to its first ``SEARCH_LIMIT``
+results.
+
+On other database backends, or SQLite builds without FTS5, searches fall
+back to LIKE matching.
+"""
+
+import re
+
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections
+from django.db.models import Case, IntegerField, Q, When
+
+from .models import Vehicle
+
+TABLE = "workshop_vehicle_search"
+SEARCH_LIMIT = 500  # Ranked matches considered per search
+
+_available = set()
+
+
+def is_available(using=DEFAULT_DB_ALIAS):
+    if using in _available:
+        return True
+    connection = connections[using]
+    if connection.vendor != "sqlite":
+        return False
+    exists = _has_status_column(connection)
+    if exists:
+        _available.add(using)
+    return exists
+
+
+def _has_status_column(connection):
+    # False for a missing table and for one created before status was stored
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pragma_table_info(%s) WHERE name = 'status'", [TABLE]
+        )
+        return cursor.fetchone() is not None
+
+
+def ensure_index(using=DEFAULT_DB_ALIAS):
+    """
+    Create the FTS5 table if missing, or rebuild one from an older layout.
+    Returns False if FTS5 is not supported.
+    """
+    connection = connections[using]
+    if connection.vendor != "sqlite":
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [TABLE]
+        )
+        exists = cursor.fetchone() is not None
+    if exists and not _has_status_column(connection):
+        rebuild(using)
+        return is_available(using)
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5("
+                "customer_name, vehicle_make, model, licence_plate, chasis_no, "
+                "phone, compact, branch_id UNINDEXED, status UNINDEXED, "
+                "tokenize = 'unicode61', prefix = '2 3')"
+            )
+    except OperationalError:
+        return False
+    _available.add(using)
+    return True
+
+
+def _compact(value):
+    return re.sub(r"\W+", "", value or "").upper()
+
+
+def _row(vehicle):
+    compact = " ".join(
+        _compact(value)
+        for value in (vehicle.licence_plate, vehicle.chasis_no, vehicle.phone)
+        if value
+    )
+    return [
+        vehicle.pk,
+        vehicle.customer_name,
+        vehicle.vehicle_make,
+        vehicle.model,
+        vehicle.licence_plate,
+        vehicle.chasis_no,
+        vehicle.phone,
+        compact,
+        vehicle.branch_id,
+        vehicle.status,
+    ]
+
+
+_INSERT = (
+    f"INSERT INTO {TABLE} (rowid, customer_name, vehicle_make, model, "
+    "licence_plate, chasis_no, phone, compact, branch_id, status) "
+    "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)"
+)
+
+
+def index_vehicle(vehicle, using=DEFAULT_DB_ALIAS):
+    """Add, refresh or drop a vehicle's row. Only master records are indexed."""
+    if not is_available(using):
+        return
+    with connections[using].cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABLE} WHERE rowid = %s", [vehicle.pk])
+        if vehicle.is_master_record:
+            cursor.execute(_INSERT, _row(vehicle))
+
+
+def remove_vehicle(vehicle_id, using=DEFAULT_DB_ALIAS):
+    if not is_available(using):
+        return
+    with connections[using].cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABLE} WHERE rowid = %s", [vehicle_id])
+
+
+def rebuild(using=DEFAULT_DB_ALIAS, batch_size=1000):
+    """Recreate the index from all master records. Returns the rows indexed."""
+    connection = connections[using]
+    if connection.vendor != "sqlite":
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f"DROP TABLE IF EXISTS {TABLE}")
+    _available.discard(using)
+    if not ensure_index(using):
+        return 0
+
+    indexed = 0
+    batch = []
+    masters = (
+        Vehicle.objects.using(using)
+        .filter(is_master_record=True)
+        .only(
+            "id",
+            "customer_name",
+            "vehicle_make",
+            "model",
+            "licence_plate",
+            "chasis_no",
+            "phone",
+            "branch_id",
+            "status",
+            "is_master_record",
+        )
+    )
+    with connection.cursor() as cursor:
+        for vehicle in masters.iterator(chunk_size=batch_size):
+            batch.append(_row(vehicle))
+            if len(batch) >= batch_size:
+                cursor.executemany(_INSERT, batch)
+                indexed += len(batch)
+                batch = []
+        if batch:
+            cursor.executemany(_INSERT, batch)
+            indexed += len(batch)
+    return indexed
+
+
+def _match_expression(query):
+    terms = re.findall(r"\w+", query)
+    if not terms:
+        return None
+    words = " ".join(f'"{term}" *' for term in terms)
+    compact = _compact(query)
+    return f'({words}) OR (compact : "{compact}" *)' if compact else words
+
+
+def search_ids(
+    query, branch_id=None, status=None, limit=SEARCH_LIMIT, using=DEFAULT_DB_ALIAS
+):
+    """Ids of master vehicles matching ``query``, best match first."""
+    expression = _match_expression(query)
+    if expression is None:
+        return []
+    sql = f"SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s"
+    params = [expression]
+    if branch_id:
+        sql += " AND branch_id = %s"
+        params.append(int(branch_id))
+    if status:
+        sql += " AND status = %s"
+        params.append(status)
+    sql += " ORDER BY rank LIMIT %s"
+    params.append(limit)
+    with connections[using].cursor() as cursor:
+        cursor.execute(sql, params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+def filter_vehicles(vehicles, query, branch_id=None, status=None):
+    """
+    Restrict a vehicle queryset to search matches, ordered by relevance.
+    ``branch_id`` and ``status`` should repeat the queryset's own filters so
+    the index applies them too. Returns ``(vehicles, truncated)``, where
+    ``truncated`` means only the best ``SEARCH_LIMIT`` matches are included.
+
+    Falls back to case-insensitive LIKE matching (keeping the queryset's own
+    ordering) when the index is not available.
+    """
+    if not is_available(vehicles.db):
+        matches = vehicles.filter(
+            Q(customer_name__icontains=query)
+            | Q(vehicle_make__icontains=query)
+            | Q(model__icontains=query)
+            | Q(licence_plate__icontains=query)
+            | Q(chasis_no__icontains=query)
+            | Q(phone__icontains=query)
+        )
+        return matches, False
+
+    ids = search_ids(
+        query,
+        branch_id=branch_id,
+        status=status,
+        limit=SEARCH_LIMIT + 1,
+        using=vehicles.db,
+    )
+    if not ids:
+        return vehicles.none(), False
+    truncated = len(ids) > SEARCH_LIMIT
+    ids = ids[:SEARCH_LIMIT]
+    rank = Case(
+        *[When(pk=pk, then=position) for position, pk in enumerate(ids)],
+        output_field=IntegerField(),
+    )
+    return vehicles.filter(pk__in=ids).order_by(rank), truncated
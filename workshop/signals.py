@@ -1,9 +1,45 @@
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
-from .models import InternalEstimate, EstimatePart
+from .models import Vehicle, InternalEstimate, EstimatePart
+from . import registry, search
+from user_activity import metrics
 from decimal import Decimal  # Import Decimal
 
 
+@receiver(post_save, sender=Vehicle)
+def record_return_visit(sender, instance, created, **kwargs):
+    if kwargs.get("raw") or not created:
+        return
+    registry.record_visit(instance)
+
+
+@receiver(post_delete, sender=Vehicle)
+def forget_return_visit(sender, instance, **kwargs):
+    if instance.master_vehicle_id:
+        registry.refresh_master(instance.master_vehicle_id)
+
+
+@receiver(post_save, sender=Vehicle)
+def update_vehicle_search(sender, instance, **kwargs):
+    search.index_vehicle(instance, using=kwargs.get("using") or "default")
+
+
+@receiver(post_save, sender=Vehicle)
+def count_vehicle(sender, instance, created, **kwargs):
+    if created and not kwargs.get("raw"):
+        metrics.inc("portal_vehicles_created_total", branch=instance.branch.name)
+
+
+@receiver(post_delete, sender=Vehicle)
+def remove_from_vehicle_search(sender, instance, **kwargs):
+    search.remove_vehicle(instance.pk, using=kwargs.get("using") or "default")
+
+
+def create_vehicle_search_index(sender, using, **kwargs):
+    # Connected to post_migrate in WorkshopConfig.ready
+    search.ensure_index(using)
+
+
 @receiver(post_save, sender=InternalEstimate)
 @receiver(post_delete, sender=EstimatePart)
 def update_internal_estimate_totals(sender, instance, **kwargs):
@@ -1,3 +1,243 @@
-from django.test import TestCase
+from datetime import date
+from unittest import mock
 
-# Create your tests here.
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from accounts.models import Branch
+from home.testing import QueryBudgetTestCase
+from workshop import registry, search
+from workshop.models import Vehicle, VehicleStatus
+
+EXPORT_FIELDS = (
+    "?fields_to_export=customer_name&fields_to_export=chasis_no"
+    "&fields_to_export=branch&fields_to_export=status"
+    "&fields_to_export=job_sheet_service_advisor&fields_to_export=estimate_grand_total"
+    "&fields_to_export=estimate_parts_details"
+)
+
+
+class WorkshopQueryBudgetTests(QueryBudgetTestCase):
+    def setUp(self):
+        super().setUp()
+        self.login("admin")
+        self.vehicle = self.data.vehicles[0]
+
+    def test_print_proforma_invoice(self):
+        self.assertBudget(
+            reverse("workshop:print_proforma_invoice", args=[self.vehicle.pk]),
+            15,
+            label="GET /dashboard/vehicle/<pk>/internal_estimate/print/",
+        )
+
+    def test_workshop_export_form(self):
+        self.assertBudget(reverse("workshop:workshop_export"), 10)
+
+    def test_workshop_export_preview(self):
+        self.assertBudget(
+            reverse("workshop:workshop_export") + EXPORT_FIELDS,
+            10,
+            label="GET /dashboard/export/ (preview)",
+        )
+
+    def test_workshop_export_download(self):
+        self.assertBudget(
+            reverse("workshop:workshop_export") + EXPORT_FIELDS + "&export=1",
+            9,
+            max_ms=3000,
+            label="GET /dashboard/export/ (download)",
+        )
+
+
+def make_vehicle(branch, chasis_no, **fields):
+    defaults = {
+        "customer_name": "Test Owner",
+        "address": "1 Test Road",
+        "phone": "08011112222",
+        "vehicle_make": "Toyota",
+        "model": "Camry",
+        "year": 2018,
+        "licence_plate": "TST123AB",
+        "date_of_first_registration": date(2018, 1, 1),
+        "complaint": "Noise from the front",
+    }
+    return Vehicle(branch=branch, chasis_no=chasis_no, **{**defaults, **fields})
+
+
+@override_settings(METRICS_ENABLED=False)
+class VehicleRegistryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.branch = Branch.objects.create(name="REGISTRY")
+        cls.other_branch = Branch.objects.create(name="ELSEWHERE")
+
+    def return_visit(self, chasis_no, branch=None):
+        master = registry.find_master(chasis_no)
+        vehicle = make_vehicle(branch or self.other_branch, chasis_no)
+        if master is not None:
+            registry.attach_to_master(vehicle, master)
+        vehicle.save()
+        return vehicle
+
+    def test_chasis_key_is_normalized_on_save(self):
+        vehicle = make_vehicle(self.branch, "  jt2bf22k1w0123456 ")
+        vehicle.save()
+        self.assertEqual(vehicle.chasis_key, "JT2BF22K1W0123456")
+
+        vehicle.chasis_no = "abc999"
+        vehicle.save(update_fields=["chasis_no"])
+        vehicle.refresh_from_db()
+        self.assertEqual(vehicle.chasis_key, "ABC999")
+
+    def test_return_visit_attaches_to_master_by_normalized_chasis(self):
+        master = make_vehicle(self.branch, "JT2BF22K1W0123456")
+        master.save()
+
+        visit = self.return_visit(" jt2bf22k1w0123456")
+
+        self.assertFalse(visit.is_master_record)
+        self.assertEqual(visit.master_vehicle_id, master.pk)
+        # Return visits are kept with the master's branch
+        self.assertEqual(visit.branch_id, self.branch.pk)
+        master.refresh_from_db()
+        self.assertEqual(master.visit_count, 1)
+        self.assertEqual(master.latest_visit_at, visit.date_created)
+
+    def test_new_chasis_has_no_master(self):
+        self.assertIsNone(registry.find_master("UNKNOWN-CHASIS"))
+        self.assertIsNone(registry.find_master("   "))
+
+    def test_each_visit_increments_count_and_latest_visit(self):
+        master = make_vehicle(self.branch, "CH-1")
+        master.save()
+        first = self.return_visit("ch-1")
+        second = self.return_visit("CH-1 ")
+
+        master.refresh_from_db()
+        self.assertEqual(master.visit_count, 2)
+        self.assertEqual(master.latest_visit_at, second.date_created)
+        self.assertGreaterEqual(second.date_created, first.date_created)
+
+    def test_deleting_a_visit_recomputes_master(self):
+        master = make_vehicle(self.branch, "CH-2")
+        master.save()
+        first = self.return_visit("CH-2")
+        second = self.return_visit("CH-2")
+
+        second.delete()
+        master.refresh_from_db()
+        self.assertEqual(master.visit_count, 1)
+        self.assertEqual(master.latest_visit_at, first.date_created)
+
+        first.delete()
+        master.refresh_from_db()
+        self.assertEqual(master.visit_count, 0)
+        self.assertIsNone(master.latest_visit_at)
+
+    def test_rebuild_repairs_drifted_visit_data(self):
+        master = make_vehicle(self.branch, "CH-3")
+        master.save()
+        visit = self.return_visit("CH-3")
+        Vehicle.objects.filter(pk=master.pk).update(visit_count=7, latest_visit_at=None)
+
+        self.assertEqual(registry.rebuild(), 1)
+        master.refresh_from_db()
+        self.assertEqual(master.visit_count, 1)
+        self.assertEqual(master.latest_visit_at, visit.date_created)
+
+
+@override_settings(METRICS_ENABLED=False)
+class VehicleSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.branch = Branch.objects.create(name="SEARCH")
+        cls.other_branch = Branch.objects.create(name="ELSEWHERE")
+        cls.corolla = make_vehicle(
+            cls.branch,
+            "JTD-BR32E 720056789",
+            customer_name="Adaeze Okafor",
+            model="Corolla",
+            licence_plate="LND 123 AB",
+            phone="0803 555 0101",
+        )
+        cls.corolla.save()
+        cls.hilux = make_vehicle(
+            cls.other_branch,
+            "AHT-FR22G 106045321",
+            customer_name="Bola Tinubu",
+            vehicle_make="Toyota",
+            model="Hilux",
+            licence_plate="ABJ 777 KD",
+            phone="0905 444 2020",
+        )
+        cls.hilux.save()
+
+    def setUp(self):
+        self.assertTrue(search.is_available())
+
+    def search(self, query, **filters):
+        vehicles, _ = search.filter_vehicles(Vehicle.objects.all(), query, **filters)
+        return list(vehicles)
+
+    def test_prefix_matches_plate_chasis_and_phone(self):
+        for query in ["LND", "jtd", "0803", "Adae", "corol"]:
+            with self.subTest(query=query):
+                self.assertEqual(self.search(query), [self.corolla])
+
+    def test_compact_form_ignores_spaces_and_punctuation(self):
+        for query in ["LND123", "JTDBR32E72", "08035550101", "lnd123ab"]:
+            with self.subTest(query=query):
+                self.assertEqual(self.search(query), [self.corolla])
+
+    def test_branch_scoping(self):
+        self.assertEqual(
+            self.search("Toyota", branch_id=self.branch.pk), [self.corolla]
+        )
+        self.assertEqual(
+            self.search("Toyota", branch_id=self.other_branch.pk), [self.hilux]
+        )
+
+    def test_status_is_applied_before_the_limit(self):
+        self.hilux.status = VehicleStatus.COMPLETED
+        self.hilux.save()
+
+        with mock.patch.object(search, "SEARCH_LIMIT", 1):
+            vehicles, truncated = search.filter_vehicles(
+                Vehicle.objects.filter(status=VehicleStatus.COMPLETED),
+                "Toyota",
+                status=VehicleStatus.COMPLETED,
+            )
+            self.assertEqual(list(vehicles), [self.hilux])
+            self.assertFalse(truncated)
+
+            vehicles, truncated = search.filter_vehicles(
+                Vehicle.objects.all(), "Toyota"
+            )
+            self.assertEqual(len(vehicles), 1)
+            self.assertTrue(truncated)
+
+    def test_index_follows_save_and_delete(self):
+        self.corolla.licence_plate = "KJA 900 XY"
+        self.corolla.save()
+        self.assertEqual(self.search("KJA900"), [self.corolla])
+        self.assertEqual(self.search("LND123"), [])
+
+        # Return visits are not indexed
+        visit = registry.attach_to_master(
+            make_vehicle(self.branch, self.corolla.chasis_no, licence_plate="QQQ 1"),
+            self.corolla,
+        )
+        visit.save()
+        self.assertEqual(self.search("QQQ"), [])
+
+        self.corolla.delete()
+        self.assertEqual(search.search_ids("KJA900"), [])
+
+    def test_like_fallback_without_index(self):
+        with mock.patch.object(search, "is_available", return_value=False):
+            vehicles, truncated = search.filter_vehicles(
+                Vehicle.objects.order_by("pk"), "555 0101"
+            )
+            self.assertEqual(list(vehicles), [self.corolla])
+            self.assertFalse(truncated)
+            self.assertEqual(self.search("hilux"), [self.hilux])
@@ -1,14 +1,17 @@
 from django.shortcuts import render, get_object_or_404, redirect
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
+from django.utils.decorators import method_decorator
 from django.views import View
 from django.http import HttpResponse
 from django.utils import timezone
 from openpyxl import Workbook
 from openpyxl.styles import Font, Border, Side, Alignment
-from .models import Vehicle, InternalEstimate, EstimatePart, JobSheet, VehicleStatus
+from .models import Vehicle, InternalEstimate, JobSheet, VehicleStatus
 from .export_forms import WorkshopExportForm
 from accounts.models import Branch, CustomUser
+from lsm_portal.routers import reports_database
 from django.db.models import Q, Max
 from django.contrib import messages
 from django.forms import inlineformset_factory
@@ -18,6 +21,8 @@ from decimal import Decimal
 import datetime  # Import datetime
 from functools import wraps
 import logging
+import time
+from user_activity import metrics
 
 logger = logging.getLogger(__name__)
 
@@ -45,7 +50,11 @@ def workshop_access_required(view_func):
 @workshop_access_required
 def print_proforma_invoice(request, vehicle_id):
     vehicle = get_object_or_404(Vehicle, id=vehicle_id)
-    internal_estimate = get_object_or_404(InternalEstimate, vehicle=vehicle)
+    # Prefetched parts serve the subtotal, the totals signal on save() and
+    # grand_total in the template without re-querying
+    internal_estimate = get_object_or_404(
+        InternalEstimate.objects.prefetch_related("estimatepart_set"), vehicle=vehicle
+    )
     estimate_parts = internal_estimate.estimatepart_set.all()
 
     # The apply_vat field should be set when the InternalEstimate is created/edited.
@@ -72,6 +81,7 @@ def print_proforma_invoice(request, vehicle_id):
     return render(request, "workshop/proforma_invoice.html", context)
 
 
+@method_decorator(reports_database(), name="get")
 class WorkshopExportView(LoginRequiredMixin, UserPassesTestMixin, View):
     raise_exception = True  # Raise 403 if test_func returns False
 
@@ -80,7 +90,13 @@ class WorkshopExportView(LoginRequiredMixin, UserPassesTestMixin, View):
 
     def get(self, request):
         form = WorkshopExportForm(request.GET)
-        vehicles = Vehicle.objects.all()
+        # Every exported relation is loaded up front rather than per vehicle
+        vehicles = Vehicle.objects.select_related(
+            "branch",
+            "master_vehicle",
+            "job_sheet__service_advisor",
+            "internal_estimate",
+        ).prefetch_related("internal_estimate__estimatepart_set")
 
         if form.is_valid():
             start_date = form.cleaned_data.get("start_date")
@@ -93,6 +109,7 @@ class WorkshopExportView(LoginRequiredMixin, UserPassesTestMixin, View):
                 vehicles = vehicles.filter(date_created__lte=end_date)
 
             if "export" in request.GET:
+                started = time.perf_counter()
                 response = HttpResponse(
                     content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
                 )
@@ -156,7 +173,9 @@ class WorkshopExportView(LoginRequiredMixin, UserPassesTestMixin, View):
                     worksheet.cell(row=1, column=col).alignment = center_aligned_text
 
                 # Write data
-                for vehicle in vehicles:
+                for row, vehicle in enumerate(
+                    vehicles.iterator(chunk_size=settings.EXPORT_CHUNK_SIZE), start=2
+                ):
                     row_data = []
                     for field_name in fields_to_export:
                         if field_name in [
@@ -166,7 +185,7 @@ class WorkshopExportView(LoginRequiredMixin, UserPassesTestMixin, View):
                             "job_sheet_job_description",
                         ]:
                             try:
-                                job_sheet = JobSheet.objects.get(vehicle=vehicle)
+                                job_sheet = vehicle.job_sheet
                                 value = getattr(
                                     job_sheet, field_name.replace("job_sheet_", "")
                                 )
@@ -180,7 +199,7 @@ class WorkshopExportView(LoginRequiredMixin, UserPassesTestMixin, View):
                             "estimate_grand_total",
                         ]:
                             try:
-                                estimate = InternalEstimate.objects.get(vehicle=vehicle)
+                                estimate = vehicle.internal_estimate
                                 if field_name == "estimate_grand_total":
                                     value = estimate.grand_total
                                 else:
@@ -192,8 +211,8 @@ class WorkshopExportView(LoginRequiredMixin, UserPassesTestMixin, View):
                                 row_data.append("")
                         elif field_name == "estimate_parts_details":
                             try:
-                                estimate = InternalEstimate.objects.get(vehicle=vehicle)
-                                parts = EstimatePart.objects.filter(estimate=estimate)
+                                estimate = vehicle.internal_estimate
+                                parts = estimate.estimatepart_set.all()
                                 parts_details = "; ".join(
                                     [
                                         f"{part.name} (x{part.quantity}) - {part.price}"
@@ -228,11 +247,14 @@ class WorkshopExportView(LoginRequiredMixin, UserPassesTestMixin, View):
                                 row_data.append(value)
                     worksheet.append(row_data)
                     for col in range(1, len(row_data) + 1):
-                        worksheet.cell(row=worksheet.max_row, column=col).border = (
-                            thin_border
-                        )
+                        worksheet.cell(row=row, column=col).border = thin_border
 
                 workbook.save(response)
+                metrics.observe(
+                    "portal_job_duration_seconds",
+                    time.perf_counter() - started,
+                    job="workshop_export",
+                )
                 return response
 
         # Prepare headers for template preview
@@ -286,7 +308,7 @@ class WorkshopExportView(LoginRequiredMixin, UserPassesTestMixin, View):
                     "job_sheet_job_description",
                 ]:
                     try:
-                        job_sheet = JobSheet.objects.get(vehicle=vehicle)
+                        job_sheet = vehicle.job_sheet
                         field_suffix = field_name.replace("job_sheet_", "")
                         value = getattr(job_sheet, field_suffix, "")
                         vehicle_row[field_name] = str(value) if value else ""
@@ -299,7 +321,7 @@ class WorkshopExportView(LoginRequiredMixin, UserPassesTestMixin, View):
                     "estimate_grand_total",
                 ]:
                     try:
-                        estimate = InternalEstimate.objects.get(vehicle=vehicle)
+                        estimate = vehicle.internal_estimate
                         field_suffix = field_name.replace("estimate_", "")
                         if field_suffix == "grand_total":
                             value = estimate.grand_total
@@ -310,8 +332,8 @@ class WorkshopExportView(LoginRequiredMixin, UserPassesTestMixin, View):
                         vehicle_row[field_name] = ""
                 elif field_name == "estimate_parts_details":
                     try:
-                        estimate = InternalEstimate.objects.get(vehicle=vehicle)
-                        parts = EstimatePart.objects.filter(estimate=estimate)
+                        estimate = vehicle.internal_estimate
+                        parts = estimate.estimatepart_set.all()
                         parts_details = "; ".join(
                             [
                                 f"{part.name} (x{part.quantity}) - {part.price}"
@@ -335,7 +357,8 @@ class WorkshopExportView(LoginRequiredMixin, UserPassesTestMixin, View):
 
         context = {
             "form": form,
-            "vehicles": vehicles,
+            # A count, so the template never loads every vehicle and its parts
+            "vehicle_count": vehicles.count(),
             "template_headers": template_headers,
             "vehicle_data": vehicle_data,
             "fields_to_export": fields_to_export,